@@ -0,0 +1,233 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+from firebase_admin import firestore_async
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+from main import (
+    CATALOG_HEADERS, _etag, app as flask_app, catalog, choose_encoding, current_user_payload, favorites_payload,
+    favorites_store, get_favorites, has_pro_plan, plan_user, subscription_payload, token_cache, user_cache,
+)
+from favorites import favorites_query, legacy_favorites
+from metrics import ERRORS, FIRESTORE_SECONDS, REQUEST_SECONDS
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:  # hot endpoints only
+    WsgiToAsgi = None
+
+FIRESTORE_CONCURRENCY = 64     # In-flight async Firestore reads per worker, over one shared gRPC channel
+BLOCKING_THREADS = 16          # Threads for work with no async API: token verification misses, catalog reloads
+CHUNK_SIZE = 1 << 16
+
+_MISS = object()
+_db = None
+_firestore_slots = asyncio.Semaphore(FIRESTORE_CONCURRENCY)
+_blocking = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix='asgi-blocking')
+_user_loads = {}  # uid -> in-flight load, so a burst for one user costs one read
+_flask = WsgiToAsgi(flask_app) if WsgiToAsgi is not None else None
+
+
+def _firestore():
+    global _db
+    if _db is None:
+        _db = firestore_async.client()
+    return _db
+
+
+async def run_blocking(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_blocking, func, *args)
+
+
+# --- SHARED STATE, ASYNC ACCESS ---
+# Same caches as the Flask handlers (same process), so a write through Flask
+# invalidates what the async endpoints serve too.
+async def _load_user(uid):
+    async with _firestore_slots:
+        with FIRESTORE_SECONDS.time(op='user_get'):
+            doc = await _firestore().collection('users').document(uid).get()
+    data = doc.to_dict() if doc.exists else None
+    user_cache.set(uid, data)
+    return data
+
+
+async def get_user_data(uid):
+    """Async twin of main.get_user_data: cached users/<uid> dict or None"""
+    data = user_cache.get(uid, _MISS)
+    if data is not _MISS:
+        return data
+    load = _user_loads.get(uid)
+    if load is None:
+        load = _user_loads[uid] = asyncio.ensure_future(_load_user(uid))
+        load.add_done_callback(lambda _: _user_loads.pop(uid, None))
+    return await asyncio.shield(load)
+
+
+async def _load_favorites(uid):
+    async with _firestore_slots, FIRESTORE_SECONDS.time(op='favorites_list'):
+        ids = tuple([doc.id async for doc in favorites_query(_firestore().collection('users').document(uid)).stream()])
+    favorites_store.cache.set(uid, ids)
+    return ids
+
+
+async def get_favorites_async(uid):
+    """Async twin of main.get_favorites"""
+    if legacy_favorites(await get_user_data(uid)) is not None:
+        return await run_blocking(get_favorites, uid)
+    ids = favorites_store.cache.get(uid, _MISS)
+    return ids if ids is not _MISS else await _load_favorites(uid)
+
+
+async def verify_token(token):
+    claims = token_cache.cached(token)
+    if claims is None:
+        claims = await run_blocking(token_cache.verify, token)
+    return claims
+
+
+async def request_uid(headers, cookies):
+    """Same rules as main.login_required: Bearer ID token, else demo cookie"""
+    auth_header = headers.get('authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        try:
+            return (await verify_token(auth_header.split('Bearer ')[1]))['uid']
+        except Exception:
+            pass
+    cookie_token = cookies.get('auth_token')
+    if cookie_token and cookie_token.startswith('demo_'):
+        return cookie_token.replace('demo_', '')
+    return None
+
+
+# --- ASGI PLUMBING ---
+class Request:
+    def __init__(self, scope):
+        self.scope = scope
+        self.headers = {}
+        for name, value in scope['headers']:
+            name, value = name.decode('latin-1').lower(), value.decode('latin-1')
+            self.headers[name] = f'{self.headers[name]}, {value}' if name in self.headers else value
+        self.args = {k: v[0] for k, v in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+        cookie = SimpleCookie()
+        try:
+            cookie.load(self.headers.get('cookie', ''))
+        except Exception:
+            pass
+        self.cookies = {name: morsel.value for name, morsel in cookie.items()}
+
+
+async def send_body(send, status, headers, chunks=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in headers.items()],
+    })
+    for chunk in chunks:
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def send_json(send, payload, status=200):
+    # Same bytes as Flask's jsonify outside debug mode
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n'
+    await send_body(send, status, {'Content-Type': 'application/json', 'Content-Length': len(body)}, [body])
+
+
+# --- HOT ENDPOINTS ---
+async def api_tenders(request, send):
+    try:
+        snapshot = await run_blocking(catalog.current)
+        uid = plan_user(request.cookies.get('auth_token'), request.args.get('userId'))
+        hides = False
+        if uid is not None:
+            hides = not has_pro_plan(await get_user_data(uid))
+        view = snapshot.view('free' if hides else 'pro')
+    except FileNotFoundError:
+        return await send_json(send, {"error": "Tenders data not found"}, 404)
+    except Exception as e:
+        return await send_json(send, {"error": str(e)}, 400)
+
+    status, coding = choose_encoding(view.encodings, view.etag,
+                                     parse_accept_header(request.headers.get('accept-encoding')),
+                                     parse_etags(request.headers.get('if-none-match')))
+    headers = dict(CATALOG_HEADERS, ETag=quote_etag(_etag(view.etag, coding)))
+    if status == 304:
+        return await send_body(send, 304, headers)
+
+    body = view.encodings[coding]
+    headers.update({'Content-Type': 'application/json', 'Content-Length': len(body)})
+    if coding != 'identity':
+        headers['Content-Encoding'] = coding
+    await send_body(send, 200, headers, (bytes(body[i:i + CHUNK_SIZE]) for i in range(0, len(body), CHUNK_SIZE)))
+
+
+async def api_current_user(request, send):
+    uid = await request_uid(request.headers, request.cookies)
+    if uid is None:
+        return await send_json(send, {'error': 'Authentication required'}, 401)
+    await send_json(send, current_user_payload(uid, await get_user_data(uid)))
+
+
+async def subscription_status(request, send):
+    try:
+        auth_header = request.headers.get('authorization')
+        if not auth_header:
+            return await send_json(send, {"isPro": False})
+        decoded = await verify_token(auth_header.split("Bearer ")[1])
+        await send_json(send, subscription_payload(await get_user_data(decoded["uid"])))
+    except Exception as e:
+        flask_app.logger.error(f"STATUS ERROR: {e}")
+        ERRORS.inc(where='subscription_status')
+        await send_json(send, {"isPro": False})
+
+
+async def api_favorites(request, send):
+    uid = await request_uid(request.headers, request.cookies)
+    if uid is None:
+        return await send_json(send, {'error': 'Authentication required'}, 401)
+    await send_json(send, favorites_payload(await get_favorites_async(uid)))
+
+
+# GET only - writes and everything else go through Flask
+HOT_ROUTES = {
+    '/api/tenders': api_tenders,
+    '/api/auth/me': api_current_user,
+    '/api/subscription/status': subscription_status,
+    '/api/favorites': api_favorites,
+}
+
+
+async def app(scope, receive, send):
+    """ASGI entry point: hot GET endpoints natively async, the rest via Flask"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                _blocking.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    handler = HOT_ROUTES.get(scope['path']) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+    if handler is not None:
+        started, status = time.perf_counter(), []
+
+        async def send_recording(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            await send(message)
+        try:
+            return await handler(Request(scope), send_recording)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, method='GET', route=scope['path'],
+                                    status=status[0] if status else 500)
+    if _flask is None:
+        logging.error("asgiref is not installed - only the async endpoints are served")
+        return await send_json(send, {"error": "Not found"}, 404)
+    await _flask(scope, receive, send)
@@ -0,0 +1,346 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from functools import cached_property
+
+from metrics import CATALOG_LOAD_FAILURES, CATALOG_LOAD_SECONDS
+from scrapers.enrich import clean, enrich_catalog
+# The projections and the snapshot writer belong to the scraper, which compiles
+# them on every save; the web side only reads what they produce
+from scrapers.export import (
+    PRO_ONLY_FIELDS, RECORD, SNAPSHOT_CODINGS, SNAPSHOT_FILE, SNAPSHOT_FORMAT, body_etag, compress_body, encode_json,
+    redact, redact_tender, write_snapshot,
+)
+from scrapers.snapshot import MappedFile, RecordView, StringTableView
+from search import TenderIndex, normalized
+
+__all__ = [
+    'PRO_ONLY_FIELDS', 'SNAPSHOT_FILE', 'TENDERS_FILE', 'CatalogSnapshot', 'CatalogView', 'MappedCatalogSnapshot',
+    'TenderCatalog', 'catalog', 'redact', 'redact_tender', 'stamp_mtime', 'tender_keys', 'write_snapshot',
+]
+
+TENDERS_FILE = 'scrapers/tenders_all3.json'
+
+
+def tender_keys(tender):
+    """(Tender ID, Tender Reference Number) of a tender, either may be None.
+    Whitespace-collapsed, so lookups `clean()` the key they're given too."""
+    fields = normalized(tender)
+    return fields['tender_id'], fields['reference']
+
+
+class CatalogView:
+    """The catalog as one plan sees it, encoded (and compressed) once.
+
+    `encodings` maps content-coding -> body bytes; `etag` is shared by all
+    of them. `rows` is the flattened tender list in catalog order, so search
+    results (positions) map straight onto ready-made response items.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.body = encode_json(data)
+        self.etag = body_etag(self.body)
+        self.encodings = compress_body(self.body)
+        self.rows = [
+            {'site': site.get('site'), 'organisation': org.get('organisation'), **tender}
+            for site in data
+            for org in site.get('data', [])
+            for tender in org.get('tenders', [])
+        ]
+
+
+class CatalogSnapshot:
+    """One immutable version of the tenders file.
+
+    Handlers grab a snapshot once and read everything from it, so a reload
+    in another thread can never hand them half of the old data and half of
+    the new data. Tenders saved before the enrichment stage (or by an older
+    version of it) get their `normalized` block here, so every served tender
+    carries the typed fields the browser filters on.
+    """
+
+    def __init__(self, data, version, stamp):
+        enrich_catalog(data)
+        self.data = data
+        self.version = version
+        self.stamp = stamp
+        self.load_seconds = 0.0
+        self.loaded_at = datetime.now()
+        self.views = {
+            'pro': CatalogView(data),
+            'free': CatalogView(redact(data)),
+        }
+        self.index = TenderIndex(self.views['pro'].rows)
+        self.stats = {
+            'total_portals': len(data),
+            'total_orgs': sum(len(site.get('data', [])) for site in data),
+            'total_tenders': self.index.size,
+        }
+        # Single-tender lookups: Tender ID / (portal, reference) -> position
+        self.by_id, self.by_ref = {}, {}
+        for pos, row in enumerate(self.views['pro'].rows):
+            tender_id, ref = tender_keys(row)
+            if tender_id:
+                self.by_id.setdefault(tender_id, pos)
+            if ref:
+                self.by_ref.setdefault((row['site'], ref), pos)
+
+    def view(self, plan):
+        return self.views['pro' if plan == 'pro' else 'free']
+
+    def find(self, tender_id):
+        """Position of the tender with this Tender ID, or None"""
+        return self.by_id.get(clean(tender_id))
+
+    def find_ref(self, portal, ref):
+        """Position of the tender with this reference number on `portal`, or None"""
+        return self.by_ref.get((portal, clean(ref)))
+
+
+class MappedRows:
+    """Flattened rows of one view, decoded from the mapping on access"""
+
+    def __init__(self, snapshot, plan):
+        self.records = snapshot.records
+        self.strings = snapshot.strings
+        self.body = snapshot.file['body.pro']
+        self.free = plan != 'pro'
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, pos):
+        site, org, _, _, length, offset = self.records[pos][:6]
+        row = {'site': self.strings[site], 'organisation': self.strings[org],
+               **json.loads(bytes(self.body[offset:offset + length]))}
+        return redact_tender(row) if self.free else row
+
+
+class MappedView:
+    def __init__(self, snapshot, plan, etag):
+        self.body = snapshot.file[f'body.{plan}']
+        self.etag = etag
+        self.encodings = {
+            coding: snapshot.file[f'{prefix}.{plan}']
+            for coding, prefix in SNAPSHOT_CODINGS.items() if f'{prefix}.{plan}' in snapshot.file.sections
+        }
+        self.rows = MappedRows(snapshot, plan)
+
+
+class MappedCatalogSnapshot:
+    """A CatalogSnapshot read from a mapped snapshot file.
+
+    Opening it is O(1) whatever the catalog size: nothing is parsed up
+    front, the response bodies are served straight from the mapping and
+    rows are decoded only when asked for. `index` is built on first search
+    from the mapped rows, one tender at a time, so the whole body is never
+    parsed into an object tree.
+    """
+
+    def __init__(self, path, version, stamp):
+        self.file = MappedFile(path)
+        self.version = version
+        self.stamp = stamp
+        self.load_seconds = 0.0
+        self.loaded_at = datetime.now()
+        meta = json.loads(bytes(self.file['meta']))
+        if meta.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"{path}: snapshot format {meta.get('format')}, expected {SNAPSHOT_FORMAT}")
+        self.stats = meta['stats']
+        self.strings = StringTableView(self.file['strings'])
+        self.records = RecordView(self.file['records'], RECORD)
+        self.views = {plan: MappedView(self, plan, meta['etags'][plan]) for plan in ('pro', 'free')}
+        self._by_tender_id = self.file['idx.tender_id'].cast('I')
+        self._by_ref = self.file['idx.ref'].cast('I')
+
+    def view(self, plan):
+        return self.views['pro' if plan == 'pro' else 'free']
+
+    @cached_property
+    def index(self):
+        rows = self.views['pro'].rows
+        return TenderIndex(rows[pos] for pos in range(len(rows)))
+
+    def _lookup(self, index, target, key):
+        i = bisect_left(index, target, key=key)
+        if i < len(index) and key(index[i]) == target:
+            return index[i]
+        return None
+
+    def find(self, tender_id):
+        """Position of the tender with this Tender ID, or None (binary search, nothing decoded up front)"""
+        return self._lookup(self._by_tender_id, clean(tender_id), lambda pos: self.strings[self.records[pos][2]])
+
+    def find_ref(self, portal, ref):
+        """Position of the tender with this reference number on `portal`, or None"""
+        key = lambda pos: (self.strings[self.records[pos][0]], self.strings[self.records[pos][3]])
+        return self._lookup(self._by_ref, (portal, clean(ref)), key)
+
+
+def stamp_mtime(stamp):
+    """Epoch mtime of the file a snapshot was loaded from, out of its stamp"""
+    return stamp[-2] / 1e9
+
+
+class TenderCatalog:
+    """Process-wide tender catalog, loaded once and reloaded on file change.
+
+    Prefers the binary snapshot (mapped, shared between workers) when it is
+    at least as new as the JSON file; otherwise parses the JSON. `current()`
+    costs two `os.stat` calls when nothing changed. When a file moves, the
+    new version is loaded and swapped in under a lock; readers keep using
+    the old snapshot until the swap.
+    """
+
+    def __init__(self, path=TENDERS_FILE, snapshot_path=SNAPSHOT_FILE):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._bad_stamp = None
+        self._version = 0
+
+    def _source(self):
+        """('snapshot' | 'json', stamp) of the file to serve from"""
+        try:
+            json_st = os.stat(self.path)
+        except FileNotFoundError:
+            json_st = None
+        try:
+            snap_st = os.stat(self.snapshot_path) if self.snapshot_path else None
+        except FileNotFoundError:
+            snap_st = None
+
+        if snap_st is not None and (json_st is None or snap_st.st_mtime_ns >= json_st.st_mtime_ns):
+            stamp = ('snapshot', snap_st.st_ino, snap_st.st_mtime_ns, snap_st.st_size)
+            if stamp != self._bad_stamp:
+                return stamp
+        if json_st is None:
+            raise FileNotFoundError(self.path)
+        return ('json', json_st.st_mtime_ns, json_st.st_size)
+
+    def peek(self):
+        """The loaded snapshot (None before the first load), without checking the files"""
+        return self._snapshot
+
+    def current(self):
+        """Return the latest snapshot, reloading if the file changed.
+
+        Raises FileNotFoundError if nothing has ever been loaded and neither
+        file exists.
+        """
+        snapshot = self._snapshot
+        try:
+            stamp = self._source()
+        except FileNotFoundError:
+            if snapshot is None:
+                raise
+            return snapshot
+
+        if snapshot is not None and stamp in (snapshot.stamp, self._bad_stamp):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and stamp in (snapshot.stamp, self._bad_stamp):
+                return snapshot
+            return self._load(stamp)
+
+    def _load(self, stamp):
+        started = time.perf_counter()
+        try:
+            if stamp[0] == 'snapshot':
+                snapshot = MappedCatalogSnapshot(self.snapshot_path, self._version + 1, stamp)
+            else:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                snapshot = CatalogSnapshot(data, self._version + 1, stamp)
+        except ValueError as e:
+            self._bad_stamp = stamp
+            CATALOG_LOAD_FAILURES.inc(source=stamp[0])
+            if stamp[0] == 'snapshot':
+                # Unreadable snapshot: fall back to the JSON export
+                logging.warning(f"Catalog snapshot unreadable, using JSON: {e}")
+                stamp = self._source()
+                if self._snapshot is not None and stamp == self._snapshot.stamp:
+                    return self._snapshot
+                return self._load(stamp)
+            # Scraper is mid-write: keep serving what we have
+            if self._snapshot is None:
+                raise
+            logging.warning(f"Catalog reload failed, keeping v{self._snapshot.version}: {e}")
+            return self._snapshot
+
+        self._version += 1
+        snapshot.load_seconds = time.perf_counter() - started
+        CATALOG_LOAD_SECONDS.observe(snapshot.load_seconds, source=stamp[0])
+        self._snapshot = snapshot
+        if self._bad_stamp and self._bad_stamp[0] == stamp[0]:
+            self._bad_stamp = None
+        logging.info(f"Catalog v{snapshot.version} loaded from {stamp[0]} in {snapshot.load_seconds:.3f}s")
+        return snapshot
+
+
+catalog = TenderCatalog()
+
+
+# --- STARTUP BENCHMARK ---
+# python -m catalog [scale ...]
+# Replicates the current catalog 1x/10x/100x (default) and measures a worker
+# starting up on the JSON file vs the mapped snapshot: time to the first
+# served body and row, private (anon) and file-backed (shared) RSS.
+def _rss():
+    rss = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('RssAnon:', 'RssFile:')):
+                name, kb, _ = line.split()
+                rss[name[:-1]] = int(kb) / 1024
+    return rss
+
+if __name__ == '__main__':
+    import subprocess
+    import sys
+    import tempfile
+
+    if sys.argv[1:2] == ['_measure']:
+        path, snapshot_path = sys.argv[2], sys.argv[3] or None
+        before = _rss()
+        started = time.perf_counter()
+        snapshot = TenderCatalog(path, snapshot_path).current()
+        body = snapshot.view('free').encodings['gzip']
+        sum(len(bytes(body[i:i + 65536])) for i in range(0, len(body), 65536))
+        view = snapshot.view('free')
+        view.rows[len(view.rows) - 1]
+        elapsed = time.perf_counter() - started
+        after = _rss()
+        print(json.dumps({'startup_s': elapsed, 'anon_mb': after['RssAnon'] - before['RssAnon'],
+                          'file_mb': after['RssFile'] - before['RssFile']}))
+        sys.exit()
+
+    from scrapers.storage import atomic_write_json
+    from scrapers.tenderdb import _scaled
+
+    scales = [int(arg) for arg in sys.argv[1:]] or [1, 10, 100]
+    with open(TENDERS_FILE, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    workdir = tempfile.mkdtemp(prefix='catalog-bench-')
+    for scale in scales:
+        data = _scaled(base, scale)
+        json_path, snap_path = os.path.join(workdir, f'x{scale}.json'), os.path.join(workdir, f'x{scale}.snap')
+        atomic_write_json(json_path, data)
+        count = write_snapshot(snap_path, data)
+        del data
+        print(f'\n{scale}x: {count} tenders  json {os.path.getsize(json_path) / 2**20:.1f} MB  '
+              f'snapshot {os.path.getsize(snap_path) / 2**20:.1f} MB')
+        for label, snapshot_arg in (('json', ''), ('mmap', snap_path)):
+            out = subprocess.run([sys.executable, '-m', 'catalog', '_measure', json_path, snapshot_arg],
+                                 capture_output=True, text=True, check=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f'  {label:4} startup {result["startup_s"] * 1000:9.1f} ms  '
+                  f'private RSS +{result["anon_mb"]:7.1f} MB  shared file RSS +{result["file_mb"]:6.1f} MB')
@@ -0,0 +1,47 @@
+import random
+
+from firebase_admin import firestore
+
+
+class ShardedCounter:
+    """A set of named counters spread over N shard documents.
+
+    Writers bump one random shard with `firestore.Increment`, so concurrent
+    updates don't contend on a single document; readers sum the shards,
+    which costs N reads however large the counted collection gets.
+    """
+
+    def __init__(self, client, path, num_shards=10):
+        self.client = client
+        self.doc_ref = client.document(path)
+        self.num_shards = num_shards
+
+    def _shard(self, index):
+        return self.doc_ref.collection('shards').document(str(index))
+
+    def increment(self, deltas, transaction=None):
+        """Apply {'name': delta, ...}, inside `transaction` if given"""
+        deltas = {name: firestore.Increment(delta) for name, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        shard = self._shard(random.randrange(self.num_shards))
+        if transaction is not None:
+            transaction.set(shard, deltas, merge=True)
+        else:
+            shard.set(deltas, merge=True)
+
+    def totals(self):
+        """Summed counters, or None if the counter has never been written"""
+        totals = None
+        for shard in self.doc_ref.collection('shards').stream():
+            totals = totals or {}
+            for name, value in shard.to_dict().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def reset(self, values):
+        """Overwrite the counters with exact values (used by reconciliation)"""
+        batch = self.client.batch()
+        for index in range(self.num_shards):
+            batch.set(self._shard(index), values if index == 0 else {name: 0 for name in values})
+        batch.commit()
@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+
+from cache import TTLCache
+from metrics import FIRESTORE_SECONDS
+
+COLLECTION = 'favorites'        # users/<uid>/favorites/<tender_id>
+COUNT_FIELD = 'favorites_count'  # on users/<uid>
+MAX_ID_LENGTH = 200
+BATCH_LIMIT = 100
+
+
+def valid_tender_id(tender_id):
+    """Tender IDs become document ids, so they must be usable as one"""
+    return (isinstance(tender_id, str) and 0 < len(tender_id) <= MAX_ID_LENGTH and '/' not in tender_id
+            and tender_id not in ('.', '..') and not (tender_id.startswith('__') and tender_id.endswith('__')))
+
+
+def favorites_query(user_ref):
+    """A user's favorite ids, oldest first. Works on sync and async refs alike."""
+    return user_ref.collection(COLLECTION).select(['__name__']).order_by('added_at')
+
+
+def legacy_favorites(data):
+    """Tender ids from the old `favorites` array field, or None if there isn't one"""
+    if not data or 'favorites' not in data:
+        return None
+    legacy = data['favorites']
+    if isinstance(legacy, dict):
+        legacy = legacy.get('tenders', [])
+    return [tender_id for tender_id in legacy or [] if valid_tender_id(tender_id)]
+
+
+@firestore.transactional
+def _migrate_txn(transaction, user_ref):
+    snapshot = user_ref.get(transaction=transaction)
+    legacy = legacy_favorites(snapshot.to_dict() if snapshot.exists else None)
+    if legacy is None:
+        return
+    existing = {doc.id for doc in user_ref.collection(COLLECTION).select(['__name__']).stream(transaction=transaction)}
+    for tender_id in dict.fromkeys(legacy):
+        if tender_id not in existing:
+            transaction.set(user_ref.collection(COLLECTION).document(tender_id), {'added_at': firestore.SERVER_TIMESTAMP})
+            existing.add(tender_id)
+    transaction.update(user_ref, {'favorites': firestore.DELETE_FIELD, COUNT_FIELD: len(existing)})
+
+
+class FavoritesStore:
+    """A user's favorite tenders as a set: one document per tender under
+    users/<uid>/favorites, keyed by Tender ID, plus a count on the user doc.
+
+    An add or remove is one write batch, so one round trip: the favorite
+    document with a precondition (`create` fails if it exists, the delete
+    fails if it doesn't) and an `Increment` of the count. A failed
+    precondition sinks the whole batch, so the count only moves when the set
+    does, and concurrent toggles never overwrite each other. The commit
+    returns the incremented count, so callers don't need to read it back.
+    """
+
+    def __init__(self, client, cache=None, max_workers=8):
+        self.client = client
+        self.cache = cache if cache is not None else TTLCache(maxsize=10000, ttl=60)
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='favorites')
+
+    def _user(self, uid):
+        return self.client.collection('users').document(uid)
+
+    def ids(self, uid):
+        """Favorite tender ids (a shared tuple), oldest first"""
+        return self.cache.get_or_load(uid, self._load)
+
+    def _load(self, uid):
+        with FIRESTORE_SECONDS.time(op='favorites_list'):
+            return tuple(doc.id for doc in favorites_query(self._user(uid)).stream())
+
+    def migrate(self, uid):
+        """Move an old `favorites` array field into the subcollection (idempotent)"""
+        with FIRESTORE_SECONDS.time(op='favorites_migrate'):
+            _migrate_txn(self.client.transaction(), self._user(uid))
+        self.cache.invalidate(uid)
+
+    def _write(self, uid, tender_id, add):
+        """(changed, count, update_time); count and time are None if nothing changed"""
+        user_ref = self._user(uid)
+        favorite_ref = user_ref.collection(COLLECTION).document(tender_id)
+        batch = self.client.batch()
+        if add:
+            batch.create(favorite_ref, {'added_at': firestore.SERVER_TIMESTAMP})
+        else:
+            batch.delete(favorite_ref, option=self.client.write_option(exists=True))
+        batch.set(user_ref, {COUNT_FIELD: firestore.Increment(1 if add else -1)}, merge=True)
+        try:
+            with FIRESTORE_SECONDS.time(op='favorites_write'):
+                results = batch.commit()
+        except (AlreadyExists, NotFound):
+            return False, None, None
+        self.cache.invalidate(uid)
+        result = results[-1]
+        return True, result.transform_results[0].integer_value, result.update_time
+
+    def add(self, uid, tender_id):
+        """(added, count); count is None if it was already a favorite"""
+        return self._write(uid, tender_id, True)[:2]
+
+    def remove(self, uid, tender_id):
+        """(removed, count); count is None if it wasn't a favorite"""
+        return self._write(uid, tender_id, False)[:2]
+
+    def apply(self, uid, add=(), remove=()):
+        """Many toggles at once: each its own atomic batch, all in flight together.
+
+        Returns (added, removed, count) with the ids that actually changed;
+        count is the one from the last-committed write, None if none changed.
+        """
+        jobs = [(tender_id, self.pool.submit(self._write, uid, tender_id, True)) for tender_id in add]
+        jobs += [(tender_id, self.pool.submit(self._write, uid, tender_id, False)) for tender_id in remove]
+        added, removed, latest = [], [], None
+        for i, (tender_id, job) in enumerate(jobs):
+            changed, count, update_time = job.result()
+            if not changed:
+                continue
+            (added if i < len(add) else removed).append(tender_id)
+            if latest is None or update_time > latest[0]:
+                latest = (update_time, count)
+        return added, removed, latest[1] if latest else None
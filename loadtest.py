@@ -0,0 +1,114 @@
+"""Closed-loop HTTP load test: python loadtest.py URL [URL ...] [options]
+
+Each of --concurrency clients sends requests back to back for --duration
+seconds; reports RPS and latency percentiles per URL. Run it against the
+dev server (python main.py) and the ASGI server (python serve.py) with the
+same options to compare them, e.g.
+
+    python loadtest.py http://localhost:5000/api/tenders -c 64 -d 20 -H 'Accept-Encoding: br'
+    python loadtest.py http://localhost:5000/api/auth/me -c 64 --demo-users 5000
+
+--demo-users N sends a random demo_<i> auth cookie per request, so user
+lookups spread over N users instead of hitting one cached entry. On a
+small box, run the client niced (nice -n 10 python loadtest.py ...) so it
+doesn't starve the server it is measuring.
+"""
+import argparse
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+REQUEST_TIMEOUT = 30
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+async def read_response(reader):
+    """(status, keep-alive) of one HTTP/1.1 response; the body (Content-Length or chunked) is drained"""
+    status = int((await reader.readline()).split()[1])
+    length, chunked, keep_alive = 0, False, True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+        elif name == 'connection' and 'close' in value.lower():
+            keep_alive = False
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def run(url, concurrency, duration, headers, demo_users):
+    # Raw keep-alive connections: a heavier client would eat the CPU the server needs
+    parts = urlsplit(url)
+    target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    base = f'GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n' + ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            cookie = f'Cookie: auth_token=demo_{random.randrange(demo_users)}\r\n' if demo_users else ''
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+                writer.write(f'{base}{cookie}\r\n'.encode('latin-1'))
+                status, keep_alive = await asyncio.wait_for(read_response(reader), REQUEST_TIMEOUT)
+                if status >= 500:
+                    errors += 1
+                if not keep_alive:  # e.g. Flask's dev server: one request per connection
+                    writer.close()
+                    reader = writer = None
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                errors += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+            latencies.append(time.perf_counter() - started)
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda pct: percentile(latencies, pct) * 1000
+    print(f'{url}\n  {len(latencies)} requests in {elapsed:.1f}s  {len(latencies) / elapsed:8.1f} req/s  '
+          f'p50 {ms(50):7.1f} ms  p90 {ms(90):7.1f} ms  p99 {ms(99):7.1f} ms  max {latencies[-1] * 1000 if latencies else 0:7.1f} ms  '
+          f'errors {errors}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('-c', '--concurrency', type=int, default=32)
+    parser.add_argument('-d', '--duration', type=float, default=15)
+    parser.add_argument('-H', '--header', action='append', default=[], help="'Name: value', repeatable")
+    parser.add_argument('--demo-users', type=int, default=0)
+    args = parser.parse_args()
+
+    headers = dict(h.split(':', 1) for h in args.header)
+    headers = {k.strip(): v.strip() for k, v in headers.items()}
+    for url in args.urls:
+        asyncio.run(run(url, args.concurrency, args.duration, headers, args.demo_users))
@@ -1,10 +1,26 @@
-from flask import Flask, render_template, send_from_directory, jsonify, request, session, redirect, url_for
+from flask import Flask, Response, g, render_template, send_from_directory, jsonify, request, session, redirect, stream_with_context, url_for
+import click
 import json
 import os
+import random
+import threading
+import time
 import firebase_admin
 from firebase_admin import credentials, auth, firestore
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from datetime import datetime, timedelta
+from cache import TTLCache
+from catalog import catalog, redact_tender, stamp_mtime
+from counters import ShardedCounter
+from favorites import BATCH_LIMIT as FAVORITES_BATCH_LIMIT, FavoritesStore, legacy_favorites, valid_tender_id
+import metrics
+from metrics import AUTH_SECONDS, ERRORS, FIRESTORE_SECONDS, REQUEST_SECONDS
+from profiler import SamplingProfiler
+from scrapers.enrich import PORTAL_TZ
+from scrapers.tenderdb import TenderDB
+from search import MAX_LIMIT
+from tokens import VerifiedTokenCache
 
 app = Flask(__name__, static_folder='static', static_url_path='')
 app.secret_key = 'tenderhub-super-secret-key-2026'
@@ -18,23 +34,163 @@ if not firebase_admin._apps:
     })
 db = firestore.client()
 
+# 🔥 Verified ID tokens cached until they expire; signing keys refreshed in the background
+token_cache = VerifiedTokenCache('blink-c30fa')
+token_cache.keys.start()
+
+# 🔥 Tender queries go to the scraper's SQLite store (pooled read-only connections)
+tender_db = TenderDB()
+
+# 🔥 User docs cached per uid - plan checks shouldn't cost a Firestore round trip
+user_cache = TTLCache(maxsize=10000, ttl=60)
+
+# 🔥 Favorites live in users/<uid>/favorites (one doc per tender); id lists cached per uid
+favorites_store = FavoritesStore(db)
+
+metrics.register_cache('users', user_cache)
+metrics.register_cache('tokens', token_cache.cache)
+metrics.register_cache('favorites', favorites_store.cache)
+
+def _load_user(uid):
+    with FIRESTORE_SECONDS.time(op='user_get'):
+        doc = db.collection('users').document(uid).get()
+    return doc.to_dict() if doc.exists else None
+
+def get_user_data(uid):
+    """Cached users/<uid> document as a dict, or None if it doesn't exist.
+    Treat the result as read-only - it's shared with other requests."""
+    return user_cache.get_or_load(uid, _load_user)
+
+# 🔥 User/pro totals kept in a sharded counter instead of scanning users
+user_counter = ShardedCounter(db, 'stats/users')
+STATS_MAINTENANCE_INTERVAL = 3600
+
+def _user_counts(data):
+    """What one user doc contributes to the counters: (total, pro), with pro
+    meaning a live subscription as has_pro_plan judges it right now"""
+    if data is None:
+        return 0, 0
+    return 1, int(has_pro_plan(data))
+
+@firestore.transactional
+def _update_user_txn(transaction, user_ref, fields):
+    snapshot = user_ref.get(transaction=transaction)
+    before = snapshot.to_dict() if snapshot.exists else None
+    after = dict(before or {}, **fields)
+    transaction.set(user_ref, fields, merge=True)
+    (total_before, pro_before), (total_after, pro_after) = _user_counts(before), _user_counts(after)
+    user_counter.increment({'total': total_after - total_before, 'pro': pro_after - pro_before}, transaction)
+
+def update_user(uid, fields):
+    """Merge `fields` into users/<uid>, keeping the user counters exact"""
+    with FIRESTORE_SECONDS.time(op='user_update'):
+        _update_user_txn(db.transaction(), db.collection('users').document(uid), fields)
+    user_cache.invalidate(uid)
+
+def expire_subscriptions():
+    """Flip pro users whose subscription_end has passed back to free"""
+    now = datetime.utcnow().isoformat()
+    expired = 0
+    for doc in db.collection('users').where('subscription_end', '<', now).stream():
+        data = doc.to_dict()
+        if data.get('plan') == 'pro' and data.get('subscription_status') != 'expired':
+            update_user(doc.id, {'plan': 'free', 'isPro': False, 'subscription_status': 'expired'})
+            expired += 1
+    return expired
+
+def reconcile_user_counts():
+    """Recount users from scratch and overwrite the counters if they drifted"""
+    total = pro = 0
+    for doc in db.collection('users').stream():
+        doc_total, doc_pro = _user_counts(doc.to_dict())
+        total += doc_total
+        pro += doc_pro
+    counts = {'total': total, 'pro': pro}
+    if user_counter.totals() != counts:
+        user_counter.reset(counts)
+    return counts
+
+def _stats_maintenance():
+    while True:
+        time.sleep(STATS_MAINTENANCE_INTERVAL)
+        try:
+            expire_subscriptions()
+            reconcile_user_counts()
+        except Exception as e:
+            print("STATS MAINTENANCE ERROR:", e)
+            ERRORS.inc(where='stats_maintenance')
+
+# Not started at import: every web worker would run its own full scan and race
+# the others on the reset. One process runs it - the dev server below, the side
+# process serve.py starts, or cron: flask --app main stats-maintenance
+@app.cli.command('stats-maintenance')
+@click.option('--loop', is_flag=True, help=f'Repeat every {STATS_MAINTENANCE_INTERVAL}s instead of running once')
+def stats_maintenance_command(loop):
+    """Expire lapsed subscriptions and recount users"""
+    if loop:
+        _stats_maintenance()
+    click.echo(json.dumps({'expired': expire_subscriptions(), 'users': reconcile_user_counts()}))
+
 # 🔥 ADMIN AUTHENTICATION - Simple password protection
 ADMIN_PASSWORD = "admin123"  # Change this in production!
 
+def is_admin_request():
+    # Header, or query param for demo
+    return (request.headers.get('Authorization') == f'Basic {ADMIN_PASSWORD}'
+            or request.args.get('admin_key') == ADMIN_PASSWORD)
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if auth_header == f'Basic {ADMIN_PASSWORD}':
-            return f(*args, **kwargs)
-        
-        # Also check query param for demo
-        if request.args.get('admin_key') == ADMIN_PASSWORD:
+        if is_admin_request():
             return f(*args, **kwargs)
-        
         return jsonify({'error': 'Admin access required'}), 403
     return decorated_function
 
+# 🔥 Request metrics + opt-in sampling profiler
+# ?__profile=1 (admins) returns the request's folded stacks instead of its body;
+# PROFILE_SAMPLE_RATE=0.01 profiles 1% of requests into PROFILE_DIR. Folded stacks
+# load straight into speedscope or flamegraph.pl.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+
+@app.before_request
+def _start_request():
+    g.started = time.perf_counter()
+    if request.args.get('__profile') == '1' and is_admin_request():
+        g.profiler, g.profile_inline = SamplingProfiler().start(), True
+    elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        g.profiler, g.profile_inline = SamplingProfiler().start(), False
+
+@app.after_request
+def _finish_request(response):
+    # Time to response headers - a streamed body is sent after this
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('started')
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route,
+                                status=response.status_code)
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.stop()
+    if g.profile_inline:
+        return Response(profiler.folded(), mimetype='text/plain', headers={
+            'X-Profile-Samples': str(sum(profiler.samples.values())), 'X-Profile-Seconds': f'{profiler.elapsed:.4f}'})
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{int(time.time() * 1000)}-{request.method}{route.replace('/', '_')}.folded"
+        with open(os.path.join(PROFILE_DIR, name), 'w') as f:
+            f.write(profiler.folded())
+    except OSError as e:
+        print("PROFILE WRITE ERROR:", e)
+    return response
+
+@app.teardown_request
+def _count_unhandled(exc):
+    if exc is not None:
+        ERRORS.inc(where='unhandled')
+
 # 🔥 Regular user login_required (unchanged)
 def login_required(f):
     @wraps(f)
@@ -44,7 +200,7 @@ def login_required(f):
         if auth_header and auth_header.startswith('Bearer '):
             token = auth_header.split('Bearer ')[1]
             try:
-                decoded_token = auth.verify_id_token(token)
+                decoded_token = token_cache.verify(token)
                 uid = decoded_token['uid']
                 session['uid'] = uid
                 return f(*args, **kwargs, current_user_uid=uid)
@@ -83,12 +239,11 @@ def tenders():
         if token.startswith('demo_'):
             uid = token.replace('demo_', '')
         else:
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = token_cache.verify(token)
             uid = decoded_token['uid']
         
-        user_doc = db.collection('users').document(uid).get()
-        if user_doc.exists:
-            data = user_doc.to_dict()
+        data = get_user_data(uid)
+        if data:
             plan = data.get('plan', 'free')
             expiry = data.get('subscription_end')
             if plan == 'pro' and expiry and datetime.fromisoformat(expiry) > datetime.now():
@@ -141,29 +296,85 @@ def admin_panel():
 
 
 # 🔥 ADMIN APIs - Full access to ALL data
+ADMIN_USERS_PAGE_SIZE = 500
+AUTH_LOOKUP_BATCH = 100  # auth.get_users() limit per call
+auth_lookup_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='auth-lookup')
+
+def _get_auth_users(uids):
+    """One auth.get_users() call for up to 100 uids"""
+    try:
+        with AUTH_SECONDS.time(op='get_users'):
+            return auth.get_users([auth.UidIdentifier(uid) for uid in uids]).users
+    except Exception as e:
+        print("AUTH LOOKUP ERROR:", e)
+        ERRORS.inc(where='auth_lookup')
+        return []
+
+def admin_users_page(cursor=None, limit=ADMIN_USERS_PAGE_SIZE):
+    """One page of users ordered by uid, merged with their Auth records.
+    Returns (users, next_cursor); next_cursor is None on the last page."""
+    doc_id = firestore.FieldPath.document_id()
+    query = db.collection('users').order_by(doc_id).limit(limit)
+    if cursor:
+        query = query.start_after({doc_id: cursor})
+    with FIRESTORE_SECONDS.time(op='users_page'):
+        docs = list(query.stream())
+    
+    uids = [doc.id for doc in docs]
+    batches = [uids[i:i + AUTH_LOOKUP_BATCH] for i in range(0, len(uids), AUTH_LOOKUP_BATCH)]
+    auth_users = {}
+    for found in auth_lookup_pool.map(_get_auth_users, batches):
+        for firebase_user in found:
+            auth_users[firebase_user.uid] = firebase_user
+    
+    user_list = []
+    for doc in docs:
+        user_data = doc.to_dict()
+        user_data['uid'] = doc.id
+        firebase_user = auth_users.get(doc.id)
+        if firebase_user:
+            user_data['email'] = firebase_user.email
+            user_data['displayName'] = firebase_user.display_name or user_data.get('displayName', 'N/A')
+        else:
+            user_data['email'] = user_data.get('email', 'N/A')
+            user_data['displayName'] = user_data.get('displayName', 'N/A')
+        user_list.append(user_data)
+    
+    next_cursor = uids[-1] if len(uids) == limit else None
+    return user_list, next_cursor
+
+def _iter_admin_users(cursor=None, limit=ADMIN_USERS_PAGE_SIZE):
+    while True:
+        users, cursor = admin_users_page(cursor, limit)
+        yield from users
+        if not cursor:
+            break
+
 @app.route('/api/admin/users', methods=['GET'])
 @admin_required
 def admin_get_users():
-    """Get ALL users from Firebase"""
+    """Get ALL users from Firebase
+    ?limit=N[&cursor=uid] -> one page plus next_cursor
+    ?format=ndjson        -> every user, streamed one JSON object per line
+    (no params)           -> every user as a JSON array, also streamed"""
     try:
-        users = db.collection('users').stream()
-        user_list = []
+        cursor = request.args.get('cursor')
+        limit = max(1, min(request.args.get('limit', ADMIN_USERS_PAGE_SIZE, type=int), ADMIN_USERS_PAGE_SIZE))
         
-        for user in users:
-            user_data = user.to_dict()
-            user_data['uid'] = user.id
-            # Add auth user info
-            try:
-                firebase_user = auth.get_user(user.id)
-                user_data['email'] = firebase_user.email
-                user_data['displayName'] = firebase_user.display_name or user_data.get('displayName', 'N/A')
-            except:
-                user_data['email'] = user_data.get('email', 'N/A')
-                user_data['displayName'] = user_data.get('displayName', 'N/A')
-            
-            user_list.append(user_data)
+        if 'limit' in request.args or cursor:
+            users, next_cursor = admin_users_page(cursor, limit)
+            return jsonify({'users': users, 'next_cursor': next_cursor})
+        
+        if request.args.get('format') == 'ndjson' or 'application/x-ndjson' in request.headers.get('Accept', ''):
+            lines = (json.dumps(user, default=str) + '\n' for user in _iter_admin_users(limit=limit))
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
         
-        return jsonify(user_list)
+        def json_array():
+            yield '['
+            for i, user in enumerate(_iter_admin_users(limit=limit)):
+                yield (',' if i else '') + json.dumps(user, default=str)
+            yield ']'
+        return Response(stream_with_context(json_array()), mimetype='application/json')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -173,14 +384,14 @@ def admin_make_pro(uid):
     """Make any user Pro instantly"""
     try:
         expiry = datetime.utcnow() + timedelta(days=365*2)  # 2 years
-        db.collection('users').document(uid).set({
+        update_user(uid, {
             'plan': 'pro',
             'isPro': True,
             'subscription_status': 'active',
             'subscription_start': datetime.utcnow().isoformat(),
             'subscription_end': expiry.isoformat(),
             'isAdminUpgraded': True
-        }, merge=True)
+        })
         
         return jsonify({'success': True, 'message': f'User {uid} upgraded to Pro'})
     except Exception as e:
@@ -191,74 +402,202 @@ def admin_make_pro(uid):
 def admin_stats():
     """Admin dashboard stats"""
     try:
-        # Users stats
-        users = db.collection('users').stream()
-        total_users = 0
-        pro_users = 0
-        
-        for user in users:
-            total_users += 1
-            data = user.to_dict()
-            if data.get('plan') == 'pro' and data.get('subscription_end'):
-                if datetime.fromisoformat(data['subscription_end']) > datetime.now():
-                    pro_users += 1
-        
-        # Tenders stats
-        tenders_stats = {
-            'total_portals': 0,
-            'total_orgs': 0,
-            'total_tenders': 0
-        }
+        # Users stats - summed from the counter shards
+        with FIRESTORE_SECONDS.time(op='user_counter_totals'):
+            users = user_counter.totals()
+        if users is None:
+            users = reconcile_user_counts()
         
-        if os.path.exists('scrapers/tenders_all3.json'):
-            with open('scrapers/tenders_all3.json', 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for site in data:
-                    tenders_stats['total_portals'] += 1
-                    for org in site.get('data', []):
-                        tenders_stats['total_orgs'] += 1
-                        tenders_stats['total_tenders'] += len(org.get('tenders', []))
+        # Tenders stats - COUNT(*) on the tender store, else once per catalog version
+        try:
+            tenders_stats = tender_db.stats() if tender_db.available() else catalog.current().stats
+        except FileNotFoundError:
+            tenders_stats = {'total_portals': 0, 'total_orgs': 0, 'total_tenders': 0}
         
         return jsonify({
             'users': {
-                'total': total_users,
-                'pro': pro_users
+                'total': users.get('total', 0),
+                'pro': users.get('pro', 0)
             },
             'tenders': tenders_stats
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# 🔥 Regular Tenders API (unchanged)
+@app.route('/api/admin/stats/reconcile', methods=['POST'])
+@admin_required
+def admin_reconcile_stats():
+    """Expire lapsed subscriptions and recount users now"""
+    try:
+        expired = expire_subscriptions()
+        return jsonify({'success': True, 'expired': expired, 'users': reconcile_user_counts()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _chunks(body, size=1 << 16):
+    """Body (bytes or a memoryview into the mapped snapshot) as WSGI-friendly bytes chunks"""
+    for start in range(0, len(body), size):
+        yield bytes(body[start:start + size])
+
+def _etag(etag, coding):
+    """Each encoding is its own representation, so it gets its own strong ETag"""
+    return etag if coding == 'identity' else f'{etag}-{coding}'
+
+CATALOG_HEADERS = {'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+
+def choose_encoding(encodings, etag, accept_encodings, if_none_match):
+    """(status, coding) for a precompressed body: 304 if the client's copy is
+    current, else 200 with the best encoding it accepts (br > gzip > identity).
+    Takes werkzeug's parsed Accept-Encoding / If-None-Match, so the ASGI path can share it."""
+    coding = next((c for c in ('br', 'gzip') if c in encodings and accept_encodings[c]), 'identity')
+    # Same content under any encoding - a cached gzip copy is still fresh for a br client
+    if any(if_none_match.contains_weak(_etag(etag, c)) for c in encodings):
+        return 304, coding
+    return 200, coding
+
+def catalog_response(encodings, etag):
+    """Send a precompressed JSON body, streamed, with ETag / conditional GET"""
+    status, coding = choose_encoding(encodings, etag, request.accept_encodings, request.if_none_match)
+    if status == 304:
+        resp = app.response_class(status=304, headers=CATALOG_HEADERS)
+        resp.set_etag(_etag(etag, coding))
+        return resp
+    
+    body = encodings[coding]
+    resp = app.response_class(_chunks(body), mimetype='application/json', headers=CATALOG_HEADERS)
+    if coding != 'identity':
+        resp.headers['Content-Encoding'] = coding
+    resp.headers['Content-Length'] = str(len(body))
+    resp.set_etag(_etag(etag, coding))
+    return resp
+
+def plan_user(token, user_id):
+    """uid whose plan decides the tender view, or None for anonymous (full view)"""
+    if not (token and user_id):
+        return None
+    return token.replace('demo_', '') if token.startswith('demo_') else user_id
+
+def has_pro_plan(data):
+    """A user doc on a live pro subscription: plan 'pro', not marked expired,
+    and subscription_end (when set) still ahead - the hourly expiry job may
+    not have flipped a lapsed one yet"""
+    if not data or data.get('plan', 'free') != 'pro' or data.get('subscription_status') == 'expired':
+        return False
+    end = data.get('subscription_end')
+    return not end or end > datetime.utcnow().isoformat()
+
+def hides_tender_ids():
+    """Free users (logged in, not on a live pro plan) don't get Tender IDs"""
+    uid = plan_user(request.cookies.get('auth_token'), request.args.get('userId'))
+    if uid is None:
+        return False
+    return not has_pro_plan(get_user_data(uid))
+
+# 🔥 Regular Tenders API - served from the in-memory catalog
 @app.route('/api/tenders')
 def api_tenders():
-    token = request.cookies.get('auth_token')
-    user_id = request.args.get('userId')
-    
     try:
-        with open('scrapers/tenders_all3.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        snapshot = catalog.current()
         
-        # Hide Tender ID for free users
-        if token and user_id:
-            uid = token.replace('demo_', '') if token.startswith('demo_') else user_id
-            user_doc = db.collection('users').document(uid).get()
-            if not user_doc.exists or user_doc.to_dict().get('plan', 'free') != 'pro':
-                for site in data:
-                    for org in site['data']:
-                        for tender in org['tenders']:
-                            if 'details' in tender and 'basic_details' in tender['details']:
-                                tender['details']['basic_details'].pop('Tender ID', None)
-        
-        return jsonify(data)
+        # Tender ID & other pro-only fields are stripped from the free view
+        view = snapshot.view('free' if hides_tender_ids() else 'pro')
+        return catalog_response(view.encodings, view.etag)
     except FileNotFoundError:
         return jsonify({"error": "Tenders data not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+def _date_arg(name, end_of_day=False):
+    """Parse a YYYY-MM-DD query arg into epoch seconds (midnight IST, like the portals' dates)"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    ts = datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=PORTAL_TZ).timestamp()
+    return ts + 86399 if end_of_day else ts
+
+# 🔥 Server-side search, filters & pagination
+@app.route('/api/tenders/search')
+def api_tenders_search():
+    args = request.args
+    page = max(1, args.get('page', 1, type=int))
+    limit = max(1, min(args.get('limit', 20, type=int), MAX_LIMIT))
+    try:
+        query = dict(
+            q=args.get('q'),
+            category=args.get('category'),
+            location=args.get('location'),
+            tender_type=args.get('type'),
+            min_value=args.get('min_value', type=float),
+            max_value=args.get('max_value', type=float),
+            closing_from=_date_arg('closing_from'),
+            closing_to=_date_arg('closing_to', end_of_day=True),
+            sort=args.get('sort'),
+            page=page,
+            limit=limit,
+        )
+        
+        if tender_db.available():
+            total, results = tender_db.search(**query)
+            if hides_tender_ids():
+                results = [redact_tender(tender) for tender in results]
+        else:
+            # No tender store yet (JSON-only deploy) - use the in-memory index
+            snapshot = catalog.current()
+            total, positions = snapshot.index.search(**query)
+            view = snapshot.view('free' if hides_tender_ids() else 'pro')
+            results = [view.rows[pos] for pos in positions]
+        
+        return jsonify({
+            'total': total,
+            'page': page,
+            'limit': limit,
+            'results': results
+        })
+    except FileNotFoundError:
+        return jsonify({"error": "Tenders data not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+# 🔥 Single tender - hash-index lookup in the loaded catalog, same redaction as /api/tenders
+@app.route('/api/tenders/<tender_id>')
+def api_tender(tender_id):
+    try:
+        snapshot = catalog.current()
+    except FileNotFoundError:
+        return jsonify({"error": "Tenders data not found"}), 404
+    pos = snapshot.find(tender_id)
+    if pos is None:
+        return jsonify({"error": "Tender not found"}), 404
+    return jsonify(snapshot.view('free' if hides_tender_ids() else 'pro').rows[pos])
+
+@app.route('/api/tenders/by-ref')
+def api_tender_by_ref():
+    portal, ref = request.args.get('portal'), request.args.get('ref')
+    if not (portal and ref):
+        return jsonify({"error": "portal and ref are required"}), 400
+    try:
+        snapshot = catalog.current()
+    except FileNotFoundError:
+        return jsonify({"error": "Tenders data not found"}), 404
+    pos = snapshot.find_ref(portal, ref)
+    if pos is None:
+        return jsonify({"error": "Tender not found"}), 404
+    return jsonify(snapshot.view('free' if hides_tender_ids() else 'pro').rows[pos])
+
+# 🔥 Raw scraper exports - only the JSON files (not the DBs, logs or code next to them)
 @app.route('/scrapers/<path:filename>')
 def serve_scrapers(filename):
-    return send_from_directory('scrapers', filename)
+    if not filename.endswith('.json'):
+        return jsonify({"error": "Not found"}), 404
+    if filename == os.path.basename(catalog.path):
+        # Same bytes as the file, precompressed & validated once per catalog version
+        try:
+            view = catalog.current().view('pro')
+        except FileNotFoundError:
+            return jsonify({"error": "Tenders data not found"}), 404
+        return catalog_response(view.encodings, view.etag)
+    # Streamed from disk with mtime/size ETag and If-None-Match handling
+    return send_from_directory('scrapers', filename, conditional=True, etag=True)
 
 # 🔥 Subscription APIs (unchanged)
 @app.route("/api/subscription/status")
@@ -269,23 +608,24 @@ def subscription_status():
             return jsonify({"isPro": False})
 
         token = auth_header.split("Bearer ")[1]
-        decoded = auth.verify_id_token(token)
+        decoded = token_cache.verify(token)
         uid = decoded["uid"]
 
-        doc = db.collection("users").document(uid).get()
-        if not doc.exists:
-            return jsonify({"isPro": False})
-
-        data = doc.to_dict()
-        return jsonify({
-            "isPro": data.get("isPro", False),
-            "plan": data.get("plan", "free"),
-            "expiryDate": data.get("subscription_end")
-        })
+        return jsonify(subscription_payload(get_user_data(uid)))
     except Exception as e:
         print("STATUS ERROR:", e)
+        ERRORS.inc(where='subscription_status')
         return jsonify({"isPro": False})
 
+def subscription_payload(data):
+    if not data:
+        return {"isPro": False}
+    return {
+        "isPro": data.get("isPro", False),
+        "plan": data.get("plan", "free"),
+        "expiryDate": data.get("subscription_end")
+    }
+
 @app.route("/api/subscription/create", methods=["POST"])
 def create_subscription():
     try:
@@ -294,7 +634,7 @@ def create_subscription():
             return jsonify({"error": "Authentication required"}), 401
 
         token = auth_header.split("Bearer ")[1]
-        decoded = auth.verify_id_token(token)
+        decoded = token_cache.verify(token)
         uid = decoded["uid"]
 
         data = request.json or {}
@@ -305,14 +645,14 @@ def create_subscription():
         else:
             expiry = datetime.utcnow() + timedelta(days=30)
 
-        db.collection("users").document(uid).set({
+        update_user(uid, {
             "uid": uid,
             "plan": "pro",
             "isPro": True,
             "subscription_status": "active",
             "subscription_start": datetime.utcnow().isoformat(),
             "subscription_end": expiry.isoformat()
-        }, merge=True)
+        })
 
         return jsonify({
             "success": True,
@@ -320,6 +660,7 @@ def create_subscription():
         })
     except Exception as e:
         print("CREATE ERROR:", e)
+        ERRORS.inc(where='subscription_create')
         return jsonify({"error": str(e)}), 500
 
 # 🔥 Authentication APIs (unchanged)
@@ -360,76 +701,162 @@ def api_logout(current_user_uid):
 @app.route('/api/auth/me', methods=['GET'])
 @login_required
 def api_current_user(current_user_uid):
-    db = firestore.client()
-    user_doc = db.collection('users').document(current_user_uid).get()
-    
+    return jsonify(current_user_payload(current_user_uid, get_user_data(current_user_uid)))
+
+def current_user_payload(uid, data):
     plan = 'free'
     is_pro = False
     expiry = None
     
-    if user_doc.exists:
-        data = user_doc.to_dict()
+    if data:
         plan = data.get('plan', 'free')
         expiry = data.get('subscription_end')
         if plan == 'pro' and expiry:
             is_pro = datetime.fromisoformat(expiry) > datetime.now()
     
-    return jsonify({
-        'uid': current_user_uid,
-        'email': f"{current_user_uid}@demo.com",
-        'displayName': current_user_uid.replace('demo_', ''),
+    return {
+        'uid': uid,
+        'email': f"{uid}@demo.com",
+        'displayName': uid.replace('demo_', ''),
         'isPro': is_pro,
         'plan': plan
-    })
+    }
 
 # 🔥 Profile & Favorites APIs (unchanged)
 @app.route('/api/profile', methods=['GET', 'POST'])
 @login_required
 def api_profile(current_user_uid):
-    db = firestore.client()
     if request.method == 'GET':
-        user_doc = db.collection('users').document(current_user_uid).get()
-        if user_doc.exists:
-            data = user_doc.to_dict()
-            data['uid'] = current_user_uid
-            return jsonify(data)
+        data = get_user_data(current_user_uid)
+        if data:
+            return jsonify(dict(data, uid=current_user_uid))
         return jsonify({'uid': current_user_uid, 'plan': 'free'})
     
     data = request.get_json()
-    db.collection('users').document(current_user_uid).set(data, merge=True)
+    update_user(current_user_uid, data)
     return jsonify({'success': True})
 
+def migrate_favorites(uid):
+    """Move an old `favorites` array field over to the favorites subcollection, once"""
+    if legacy_favorites(get_user_data(uid)) is not None:
+        favorites_store.migrate(uid)
+        user_cache.invalidate(uid)
+
+def get_favorites(uid):
+    migrate_favorites(uid)
+    return favorites_store.ids(uid)
+
+def favorites_payload(favorites):
+    return {'favorites': list(favorites), 'count': len(favorites)}
+
+# 🔥 Favorites are a set: each add/remove is one atomic write, safe under concurrent toggles
 @app.route('/api/favorites', methods=['GET', 'POST', 'DELETE'])
 @login_required
 def api_favorites(current_user_uid):
-    db = firestore.client()
-    user_ref = db.collection('users').document(current_user_uid)
-    
     if request.method == 'GET':
-        user_doc = user_ref.get()
-        favorites = user_doc.to_dict().get('favorites', {}).get('tenders', []) if user_doc.exists else []
-        return jsonify({'favorites': favorites, 'count': len(favorites)})
+        return jsonify(favorites_payload(get_favorites(current_user_uid)))
     
-    data = request.get_json()
-    tender_id = data.get('tender_id')
-    user_doc = user_ref.get()
-    
-    favorites = user_doc.to_dict().get('favorites', {'tenders': [], 'count': 0}) if user_doc.exists else {'tenders': [], 'count': 0}
+    tender_id = (request.get_json(silent=True) or {}).get('tender_id')
+    if not valid_tender_id(tender_id):
+        return jsonify({'error': 'Invalid tender_id'}), 400
     
+    migrate_favorites(current_user_uid)
     if request.method == 'POST':
-        if tender_id not in favorites['tenders']:
-            favorites['tenders'].append(tender_id)
-            favorites['count'] += 1
-    elif request.method == 'DELETE' and tender_id in favorites['tenders']:
-        favorites['tenders'].remove(tender_id)
-        favorites['count'] -= 1
+        changed, count = favorites_store.add(current_user_uid, tender_id)
+    else:
+        changed, count = favorites_store.remove(current_user_uid, tender_id)
+    if changed:
+        user_cache.invalidate(current_user_uid)
+    else:
+        count = len(favorites_store.ids(current_user_uid))
+    return jsonify({'success': True, 'changed': changed, 'count': count})
+
+# 🔥 Many toggles in one call: {"add": [...], "remove": [...]}
+@app.route('/api/favorites/batch', methods=['POST'])
+@login_required
+def api_favorites_batch(current_user_uid):
+    data = request.get_json(silent=True) or {}
+    add, remove = data.get('add', []), data.get('remove', [])
+    if not isinstance(add, list) or not isinstance(remove, list):
+        return jsonify({'error': 'add and remove must be lists of tender ids'}), 400
+    if not all(valid_tender_id(tender_id) for tender_id in add + remove):
+        return jsonify({'error': 'Invalid tender_id'}), 400
+    add, remove = list(dict.fromkeys(add)), list(dict.fromkeys(remove))
+    if set(add) & set(remove):
+        return jsonify({'error': 'A tender can\'t be both added and removed'}), 400
+    if len(add) + len(remove) > FAVORITES_BATCH_LIMIT:
+        return jsonify({'error': f'At most {FAVORITES_BATCH_LIMIT} changes per batch'}), 400
+    
+    migrate_favorites(current_user_uid)
+    added, removed, count = favorites_store.apply(current_user_uid, add, remove)
+    if added or removed:
+        user_cache.invalidate(current_user_uid)
+    if count is None:
+        count = len(favorites_store.ids(current_user_uid))
+    return jsonify({'success': True, 'added': added, 'removed': removed, 'count': count})
+
+# 🔥 A user's favorites resolved to full tenders in one call (null if no longer listed)
+@app.route('/api/favorites/tenders', methods=['GET'])
+@login_required
+def api_favorite_tenders(current_user_uid):
+    favorites = get_favorites(current_user_uid)
+    try:
+        snapshot = catalog.current()
+    except FileNotFoundError:
+        return jsonify({"error": "Tenders data not found"}), 404
     
-    user_ref.set({'favorites': favorites}, merge=True)
-    return jsonify({'success': True, 'count': favorites['count']})
+    view = snapshot.view('pro' if has_pro_plan(get_user_data(current_user_uid)) else 'free')
+    results = []
+    for tender_id in favorites:
+        pos = snapshot.find(tender_id)
+        results.append({'tender_id': tender_id, 'tender': view.rows[pos] if pos is not None else None})
+    return jsonify({'favorites': results, 'count': len(favorites)})
+
+def catalog_health(snapshot):
+    return {
+        'version': snapshot.version,
+        'source': snapshot.stamp[0],
+        'loaded_at': snapshot.loaded_at.isoformat(),
+        'load_seconds': round(snapshot.load_seconds, 4),
+        'age_seconds': round(time.time() - stamp_mtime(snapshot.stamp), 1),
+    }
 
 @app.route('/health')
 def health():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    try:
+        tenders = catalog_health(catalog.current())
+    except Exception as e:
+        tenders = {'error': str(e)}
+    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat(), 'catalog': tenders})
+
+def _catalog_gauge(field):
+    def collect():
+        snapshot = catalog.peek()
+        return {(): catalog_health(snapshot)[field]} if snapshot is not None else {}
+    return collect
+
+metrics.registry.collector('catalog_version', 'Loaded catalog version (bumps on every reload)', [],
+                           _catalog_gauge('version'))
+metrics.registry.collector('catalog_age_seconds', 'Seconds since the loaded catalog file was written', [],
+                           _catalog_gauge('age_seconds'))
+metrics.registry.collector('catalog_last_load_seconds', 'How long the current catalog took to load', [],
+                           _catalog_gauge('load_seconds'))
+
+# 🔥 Prometheus scrape target: "Authorization: Bearer <METRICS_TOKEN>" if that's set,
+# else admins and scrapers on this host only
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+LOCAL_ADDRS = ('127.0.0.1', '::1')
+
+def metrics_allowed():
+    if METRICS_TOKEN:
+        return request.headers.get('Authorization') == f'Bearer {METRICS_TOKEN}'
+    return is_admin_request() or request.remote_addr in LOCAL_ADDRS
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics_allowed():
+        return jsonify({'error': 'Forbidden'}), 403
+    return Response(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 
@@ -469,5 +896,7 @@ def blog():
 
 
 
+# 🔥 Dev server only (FLASK_DEBUG=1 for the debugger) - production: python serve.py
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
+    threading.Thread(target=_stats_maintenance, name='stats-maintenance', daemon=True).start()
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000, threaded=True)
@@ -0,0 +1,192 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds: sub-millisecond cache hits up to multi-second catalog loads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._lines(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count per label set"""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _lines(self, key, value):
+        return [f'{self.name}{_labels(self.labelnames, key)} {_number(value)}']
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set, Prometheus style"""
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _lines(self, key, value):
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_labels(self.labelnames, key, [("le", _number(bound))])} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}')
+        lines.append(f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class Collector(_Metric):
+    """Values read at scrape time: `collect()` returns {label values tuple: value}.
+
+    For state that is already counted elsewhere (cache stats, the catalog
+    version), so the hot path pays nothing extra.
+    """
+
+    def __init__(self, name, help, labelnames, collect, type='gauge'):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+        self.type = type
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for key, value in sorted(self.collect().items()):
+            lines.append(f'{self.name}{_labels(self.labelnames, key)} {_number(value)}')
+        return lines
+
+
+class Registry:
+    """Named metrics of one process, rendered in the Prometheus text format.
+
+    Each worker process keeps its own registry, so with several workers
+    every scrape sees one of them - scrape workers individually (or run one)
+    when exact totals matter.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'metric {metric.name} already registered')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, name, help, labelnames, collect, type='gauge'):
+        return self._add(Collector(name, help, labelnames, collect, type))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:  # one broken collector shouldn't blank the page
+                lines.append(f'# {metric.name} unavailable: {_escape(e)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# --- SHARED INSTRUMENTS ---
+# Used by main, asgi, catalog, tokens and favorites alike.
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Request latency by route', ['method', 'route', 'status'])
+FIRESTORE_SECONDS = registry.histogram(
+    'firestore_call_duration_seconds', 'Firestore round trips by operation', ['op'])
+AUTH_SECONDS = registry.histogram(
+    'auth_call_duration_seconds', 'Token verification and Firebase Auth calls by operation', ['op'])
+CATALOG_LOAD_SECONDS = registry.histogram(
+    'catalog_load_duration_seconds', 'Catalog loads and reloads by source file', ['source'],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+CATALOG_LOAD_FAILURES = registry.counter(
+    'catalog_load_failures_total', 'Catalog loads that failed and kept or fell back', ['source'])
+ERRORS = registry.counter('app_errors_total', 'Errors caught and logged by handlers', ['where'])
+
+
+_caches = {}
+
+
+def register_cache(name, cache):
+    """Expose a TTLCache's size and hit/miss counts under cache=<name>"""
+    _caches[name] = cache
+
+
+def _cache_stats(field):
+    return lambda: {(name,): cache.stats()[field] for name, cache in list(_caches.items())}
+
+
+registry.collector('cache_hits_total', 'Cache hits', ['cache'], _cache_stats('hits'), type='counter')
+registry.collector('cache_misses_total', 'Cache misses', ['cache'], _cache_stats('misses'), type='counter')
+registry.collector('cache_entries', 'Entries currently cached', ['cache'], _cache_stats('size'))
@@ -0,0 +1,58 @@
+import os
+
+# --- CONCURRENCY & POLITENESS ---
+MAX_CONCURRENT_SITES = 8       # All portals run side by side, one browser context each
+MAX_CONCURRENT_PAGES = 12      # Global budget of in-flight page loads across all sites
+HOST_MAX_CONCURRENCY = 3       # In-flight page loads per portal host
+HOST_MIN_INTERVAL = 1.5        # Seconds between request starts on one host
+
+# --- ADAPTIVE HOST THROTTLING ---
+HOST_INTERVAL_FLOOR = 0.5      # Fastest we ever go on one host (seconds between starts)
+HOST_INTERVAL_CEILING = 30.0   # Slowest we back off to
+HOST_INTERVAL_STEP = 0.1       # Speed-up per healthy response
+HOST_SLOW_RESPONSE = 8.0       # A response slower than this counts as the host straining
+
+# --- PER-SITE PIPELINE ---
+ORG_WORKERS_PER_SITE = 2       # Workers fetching org listings in each site's context
+DETAIL_WORKERS_PER_SITE = 3    # Workers fetching tender detail pages in each site's context
+
+# --- CRAWL BUDGET ---
+CRAWL_REQUEST_BUDGET = 6000    # Page fetches per run across all sites (listing + detail pages); 0 = no cap
+CRAWL_TIME_BUDGET = 1800       # Seconds per run before the frontier stops handing out work; 0 = no cap
+MAX_LISTING_PAGES = 50         # Listing pages followed per org - a guard against a pager that never ends
+
+# --- FETCH PATH ---
+HTTP_FIRST = True              # Try a plain pooled HTTP GET before spinning up a browser page
+HTTP_TIMEOUT = 30.0            # Seconds per HTTP attempt before falling back to the browser
+HTTP_MAX_CONNECTIONS = 6       # Keep-alive pool size per site client
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# --- BROWSER PAGES ---
+PAGES_PER_CONTEXT = 4          # Warm pages reused per site context on the browser path
+PAGE_MAX_NAVIGATIONS = 50      # Recycle a page after this many loads - renderer memory only grows
+
+# --- DISTRIBUTED MODE (python -m scrapers.distributed) ---
+WORK_QUEUE_URL = os.environ.get("SCRAPER_QUEUE_URL", "sqlite:///scrapers/work_queue.db")  # Shared by coordinator and workers
+WORKER_TASKS = 6               # Work items one worker process has in flight
+WORKER_SITES = 2               # Portals one worker holds at once - all of a portal's items run on its session
+LEASE_SECONDS = 120            # A claimed item (or host slot) goes back to the queue if not renewed within this
+HEARTBEAT_INTERVAL = 30        # Seconds between a worker's lease renewals
+MAX_ATTEMPTS = 3               # Claims per item before it's failed for good
+QUEUE_POLL_INTERVAL = 0.5      # Seconds between queue polls when there's nothing to do
+
+# --- RECORD / REPLAY ---
+RECORD_DIR = os.environ.get("SCRAPER_RECORD_DIR")  # Save every fetched page here for `python -m scrapers.replay`; unset = off
+
+# --- PARSING ---
+PARSER_BACKEND = "lxml"        # "lxml" (fast, single pass) or "bs4" (html.parser reference)
+PARSER_PROCESSES = 2           # Parse pages in a process pool off the event loop; 0 = inline
+
+# --- INCREMENTAL RUNS ---
+FINGERPRINT_DB = "scrapers/fingerprints.db"    # What each tender looked like last run
+DELTA_FILE = "scrapers/tenders_delta.json"     # Added/changed/removed tenders of the latest run
+FINGERPRINT_RETENTION_DAYS = 7                 # Forget tenders unseen for this long
+
+# --- STORAGE ---
+SCRAPE_LOG = "scrapers/scrape_log.ndjson"      # Append-only per-org log; lets a crashed run resume
+TENDER_DB = "scrapers/tenders.db"              # Normalized SQLite + FTS5 copy of the catalog (JSON kept as export)
+TENDER_DB_POOL = 4                             # Read-only connections kept open per API process
@@ -0,0 +1,343 @@
+"""Coordinator/worker mode: the crawl of scraper.run_full_scraper spread over
+worker processes - on this machine or others - that share a durable work
+queue (WORK_QUEUE_URL, or SCRAPER_QUEUE_URL in the environment).
+
+    python -m scrapers.distributed run [--workers N] [--http-only]   coordinator + N local workers
+    python -m scrapers.distributed coordinate                        coordinator only
+    python -m scrapers.distributed worker [--http-only]              one worker; start as many as you like
+
+Work items are a portal's org list ("site"), one org's listing pages
+("org") and one tender's detail page ("detail"). Workers keep no crawl
+state: they claim items under a lease, fetch and parse, and push the result
+back. GePNIC's `session=T` links only work under the session that listed
+them, so a worker that takes a site's org list holds the whole site (see
+SQLiteWorkQueue) and every result says which worker's session it came from.
+The coordinator owns everything with state - fingerprints, the crawl
+budget, the scrape log and the catalog - and merges results exactly the
+way process_site does (both go through scraper.SiteCrawl). Per-host
+politeness lives in the queue too, so N workers together stay within
+HOST_MAX_CONCURRENCY / HOST_MIN_INTERVAL per portal.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from scrapers.config import (
+    HEARTBEAT_INTERVAL, QUEUE_POLL_INTERVAL, USER_AGENT, WORK_QUEUE_URL, WORKER_TASKS,
+)
+from scrapers.fetcher import SiteFetcher
+from scrapers.frontier import CrawlBudget, detail_priority, org_priority
+from scrapers.parsing import parse_off_loop, parse_org_rows, shutdown_pool
+from scrapers.scraper import (
+    LIST_TABLE, TENDER_SITES, SiteCrawl, collected_data, crawl_org_listing, finish_run, resume_finished_site,
+    save_data, scrape_single_tender, scrape_status, site_results, start_run,
+)
+from scrapers.throttle import throttle
+from scrapers.workqueue import open_queue
+
+
+# --- WORKER ---
+class Worker:
+    """Claims items from `queue` and runs WORKER_TASKS of them at a time.
+
+    One SiteFetcher (and browser context, with a browser) per portal,
+    opened on first use and kept for the run, so session cookies and the
+    HTTP keep-alive pool carry over between items of the same portal.
+    Org and detail links are only good on the session that listed them; if
+    a site comes to this worker from another one (its lease ran out), orgs
+    are looked up again by name on our own session and the other session's
+    detail links fail. Exits once the coordinator closes the run.
+    """
+
+    def __init__(self, queue, browser=None, name=None, tasks=WORKER_TASKS):
+        self.queue = queue
+        self.browser = browser
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.tasks = tasks
+        self.stats = Counter()
+        self._sites = {}  # site name -> future of (fetcher, paging lock, context)
+        self._org_links = {}  # site name -> {org name: href} on our session, for sites taken over
+
+    async def _open_site(self, site):
+        context = None
+        if self.browser is not None:
+            context = await self.browser.new_context(user_agent=USER_AGENT, viewport={'width': 1366, 'height': 768})
+        return SiteFetcher(context, site["base_url"]), asyncio.Lock(), context
+
+    async def _site(self, site):
+        if site["name"] not in self._sites:
+            self._sites[site["name"]] = asyncio.ensure_future(self._open_site(site))
+        return await self._sites[site["name"]]
+
+    async def _org_list(self, fetcher, site, budget):
+        budget.take()
+        html = await fetcher.fetch(site["org_url"], expect=LIST_TABLE, timeout=45000)
+        return await parse_off_loop(parse_org_rows, html)
+
+    async def _org_url(self, fetcher, site, payload, budget):
+        """The org's listing link, valid on this worker's session"""
+        if payload["session"] == self.name:
+            return payload["url"]
+        if site["name"] not in self._org_links:
+            self._org_links[site["name"]] = dict(await self._org_list(fetcher, site, budget))
+        href = self._org_links[site["name"]].get(payload["org"])
+        if not href:
+            raise RuntimeError(f"{payload['org']} not listed on this session")
+        return site["base_url"] + href
+
+    async def handle(self, kind, payload):
+        """Fetch and parse one item; the result the coordinator merges"""
+        site = payload["site"]
+        fetcher, paging, _ = await self._site(site)
+        budget = CrawlBudget(requests=0, seconds=0)  # Only counts - the coordinator enforces the run's budget
+        if kind == "site":
+            orgs = await self._org_list(fetcher, site, budget)
+            return {"orgs": orgs, "pages": budget.used, "session": self.name}
+        if kind == "org":
+            url = await self._org_url(fetcher, site, payload, budget)
+            async with paging:  # NIC keeps a table's pager in the session - one org's pages at a time
+                rows, complete, _ = await crawl_org_listing(fetcher, url, site["base_url"], budget)
+            return {"rows": rows, "complete": complete, "pages": budget.used, "session": self.name}
+        if payload["session"] != self.name:
+            raise RuntimeError(f"detail link is from {payload['session']}'s session")
+        details = await scrape_single_tender(fetcher, payload["url"], budget)
+        return {"details": details, "pages": budget.used}
+
+    async def _task(self):
+        while True:
+            claimed = self.queue.claim(self.name)
+            if claimed is None:
+                if self.queue.closed():
+                    return
+                await asyncio.sleep(QUEUE_POLL_INTERVAL)
+                continue
+            item_id, kind, payload = claimed
+            try:
+                result = await self.handle(kind, payload)
+            except Exception as e:
+                logging.warning(f"⚠️ {kind} item {item_id} failed: {str(e)[:80]}")
+                self.queue.fail(item_id, self.name, e)
+                self.stats["failed"] += 1
+                continue
+            if not self.queue.complete(item_id, self.name, result):
+                logging.warning(f"⚠️ Lease on {kind} item {item_id} lost - result dropped")
+            self.stats[kind] += 1
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            self.queue.heartbeat(self.name)
+
+    async def run(self):
+        throttle.reset()
+        throttle.share(self.queue, self.name)
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            await asyncio.gather(*(self._task() for _ in range(self.tasks)))
+        finally:
+            heartbeat.cancel()
+            for name, opening in self._sites.items():
+                if not opening.done() or opening.exception():
+                    continue
+                fetcher, _, context = opening.result()
+                logging.info(f"📶 {name} fetch paths: {fetcher.report.summary(fetcher.pages.stats)}")
+                await fetcher.close()
+                if context: await context.close()
+            logging.info(f"✅ Worker {self.name} done: {dict(self.stats)}")
+
+
+async def run_worker(queue_url=WORK_QUEUE_URL, http_only=False):
+    queue = open_queue(queue_url)
+    try:
+        if http_only:
+            await Worker(queue).run()
+            return
+        from playwright.async_api import async_playwright
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(
+                headless=True,
+                args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
+            )
+            await Worker(queue, browser).run()
+            await browser.close()
+    finally:
+        shutdown_pool()
+        queue.close()
+
+
+# --- COORDINATOR ---
+class Coordinator:
+    """Seeds the queue with every site's org list and merges results as
+    they come back, queueing each site's orgs and each org's changed
+    tenders in frontier order (org_priority / detail_priority).
+
+    A site is done when none of its items are outstanding: its orgs are
+    saved to site_results, the log and the snapshot, as run_site does, and
+    its worker is let go of it. Org and detail items carry the session
+    (worker) their link came from.
+    The request budget is charged with the pages each result reports, so
+    a run can overshoot it by what's in flight when it runs out; from
+    then on unclaimed items are dropped and merged as budget cuts.
+    """
+
+    def __init__(self, queue, sites, fingerprints, log, resumed, budget, previous):
+        self.queue = queue
+        self.sites = sites
+        self.fingerprints = fingerprints
+        self.log = log
+        self.resumed = resumed
+        self.budget = budget
+        self.previous = previous
+        self.crawls = {}     # site name -> SiteCrawl
+        self.open = {}       # site name -> items outstanding
+        self.waiting = {}    # item id -> (kind, site name, what to merge the result into)
+
+    def _put(self, kind, site, key, payload, priority, target):
+        item_id = self.queue.put(kind, site["name"], key, dict(payload, site=site), priority)
+        if item_id is None:
+            # Already queued this run (e.g. two rows of one org sharing a detail link):
+            # nothing will come back for it, so settle its target as never fetched
+            logging.warning(f"⚠️ {kind} item {key!r} of {site['name']} already queued - skipped")
+            getattr(self, f"_merge_{kind}")(site["name"], target, "dropped", None)
+            return
+        self.waiting[item_id] = (kind, site["name"], target)
+        self.open[site["name"]] += 1
+
+    def seed(self):
+        for site in self.sites:
+            resumed = self.resumed.get(site["name"], {})
+            if resumed.get("done"):
+                resume_finished_site(site["name"], resumed, self.fingerprints)
+                continue
+            self.open[site["name"]] = 0
+            self._put("site", site, "", {}, (0.0, 0.0), site)
+            scrape_status["active_sites"].append(site["name"])
+            logging.info(f"🚀 QUEUED {site['name']}")
+
+    def merge(self, item_id, state, result):
+        kind, name, target = self.waiting.pop(item_id)
+        pages = result.get("pages", 0) if state == "done" else 0
+        self.budget.spend(pages)
+        getattr(self, f"_merge_{kind}")(name, target, state, result)
+        self.open[name] -= 1
+        if self.open[name] == 0:
+            self._site_done(name)
+
+    def _merge_site(self, name, site, state, result):
+        crawl = self.crawls[name] = SiteCrawl(site, self.fingerprints, self.log, self.previous.get(name, {}))
+        if state != "done":
+            logging.error(f"❌ Site {name} CRASHED: {result or 'out of budget'}")
+            return
+        org_rows = result["orgs"]
+        logging.info(f"📍 {name}: Found {len(org_rows)} orgs")
+        resumed_orgs = self.resumed.get(name, {}).get("orgs") or {}
+        org_stats = self.fingerprints.org_stats(name)
+        for idx, (org_name, href) in enumerate(org_rows, 1):
+            if org_name in resumed_orgs:
+                crawl.resume(idx, resumed_orgs[org_name])
+                continue
+            if not href: continue
+            self._put("org", site, str(idx),
+                      {"url": site["base_url"] + href, "org": org_name, "session": result["session"]},
+                      org_priority(org_stats.get(org_name)), (idx, org_name))
+
+    def _merge_org(self, name, target, state, result):
+        idx, org_name = target
+        crawl = self.crawls[name]
+        if state == "done":
+            scrape_status["orgs_scraped"] += 1
+            crawled, complete, cut = result["rows"], result["complete"], False
+            session = result["session"]
+        elif state == "failed":
+            logging.error(f"  ⚠️ ERROR {org_name}: {str(result)[:60]}")
+            crawled, complete, cut, session = [], False, False, None
+        else:
+            crawled, complete, cut, session = [], False, True, None
+        for tender, stale in crawl.listed(idx, org_name, crawled, complete, cut):
+            self._put("detail", crawl.site, f"{idx}:{tender['title_link']}",
+                      {"url": tender["title_link"], "session": session},
+                      detail_priority(tender), (idx, tender, stale))
+
+    def _merge_detail(self, name, target, state, result):
+        idx, tender, stale = target
+        if state == "done":
+            details = result["details"]
+        elif state == "failed":
+            details = {"error": str(result)[:100], "status": "failed"}
+        else:
+            details = None
+        self.crawls[name].detailed(idx, tender, details, stale)
+
+    def _site_done(self, name):
+        crawl = self.crawls.get(name)
+        site_results[name] = crawl.data() if crawl else []
+        scrape_status["active_sites"].remove(name)
+        scrape_status["sites_completed"] += 1
+        self.log.site_done(name)
+        self.queue.release_site(name)
+        # ✅ COMPACT THE SNAPSHOT AFTER EACH SITE FINISHES
+        save_data(collected_data())
+        logging.info(f"💾 PROGRESS SAVED: {name} done ({scrape_status['sites_completed']}/{len(self.sites)} sites)")
+
+    def run(self):
+        """Merge results until no item is outstanding"""
+        dropped = 0
+        while self.waiting:
+            if self.budget.exhausted:
+                dropped += self.queue.drop_pending()
+            results = self.queue.results()
+            for item_id, state, result in results:
+                self.merge(item_id, state, result)
+            if not results:
+                time.sleep(QUEUE_POLL_INTERVAL)
+        if dropped:
+            logging.info(f"💰 Budget ran out: {dropped} queued items dropped")
+
+
+def run_coordinator(queue_url=WORK_QUEUE_URL, local_workers=0, worker_args=(), sites=None):
+    """One distributed run: the run_full_scraper of coordinator/worker mode.
+    `local_workers` worker processes are started here; more can join from
+    anywhere that reaches the queue."""
+    queue = open_queue(queue_url)
+    queue.reset()
+    fingerprints, budget, previous, log, resumed = start_run()
+    workers = [
+        subprocess.Popen([sys.executable, "-m", "scrapers.distributed", "worker", "--queue", queue_url, *worker_args])
+        for _ in range(local_workers)
+    ]
+    completed = False
+    try:
+        coordinator = Coordinator(queue, sites or TENDER_SITES, fingerprints, log, resumed, budget, previous)
+        coordinator.seed()
+        coordinator.run()
+        completed = True
+    except Exception as e:
+        logging.error(f"❌ COORDINATOR FAILED: {e}")
+    finally:
+        queue.close_run()
+        for worker in workers:
+            worker.wait()
+        logging.info(f"📦 QUEUE {queue.counts()}")
+        queue.close()
+        finish_run(fingerprints, budget, log, completed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m scrapers.distributed", description="Coordinator/worker scraping")
+    parser.add_argument("command", choices=["run", "coordinate", "worker"])
+    parser.add_argument("--queue", default=WORK_QUEUE_URL, help=f"work queue URL (default {WORK_QUEUE_URL})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="local worker processes for `run`")
+    parser.add_argument("--http-only", action="store_true", help="workers fetch over HTTP only, no browser")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        asyncio.run(run_worker(args.queue, args.http_only))
+    else:
+        run_coordinator(args.queue, args.workers if args.command == "run" else 0,
+                        ["--http-only"] if args.http_only else [])
@@ -0,0 +1,173 @@
+import re
+from datetime import datetime, timedelta, timezone
+
+# Every NIC portal shows Indian Standard Time, whatever the server's zone
+PORTAL_TZ = timezone(timedelta(hours=5, minutes=30), 'IST')
+DATE_FORMAT = '%d-%b-%Y %I:%M %p'
+ENRICH_VERSION = 2
+
+SPACE_RE = re.compile(r'\s+')
+SPACE_BEFORE_PUNCT_RE = re.compile(r'\s+([,.;:])')
+TRAILING_BRACKET_RE = re.compile(r'\[([^\[\]]*)\]\s*$')
+PINCODE_RE = re.compile(r'\b[1-9]\d{5}\b')
+CURRENCY_RE = re.compile(r'\b(?:Rs|INR)\b\.?|₹', re.I)
+MISSING = {'', 'na', 'n/a', 'nil', 'none', 'null', '-', '--', 'not applicable'}
+CATEGORIES = ('works', 'goods', 'services')
+TENDER_TYPES = (('expression', 'eoi'), ('eoi', 'eoi'), ('limited', 'limited'), ('global', 'global'),
+                ('single', 'single'), ('auction', 'auction'), ('open', 'open'))
+
+# (field, section, key prefix) - the first filled one wins. EMD and fee live in
+# their own sections on NIC pages; some portals print them under Work Item Details.
+AMOUNTS = {
+    'value': (('work_details', 'Tender Value'),),
+    'emd': (('work_details', 'EMD Amount'), ('emd_details', 'EMD Amount')),
+    'fee': (('work_details', 'Tender Fee in'), ('fee_details', 'Tender Fee in')),
+}
+DATES = {
+    'published': (('listing', 'published_date'), ('critical_dates', 'Published Date')),
+    'closing': (('listing', 'closing_date'), ('critical_dates', 'Bid Submission End Date')),
+    'opening': (('critical_dates', 'Bid Opening Date'),),
+}
+
+
+def clean(value):
+    """Whitespace-collapsed text, None for blanks and NIC's 'NA' placeholders"""
+    if not isinstance(value, str):
+        return None
+    value = SPACE_RE.sub(' ', value).strip()
+    return None if value.lower() in MISSING else value
+
+
+def parse_tender_date(value):
+    """'21-Mar-2026 09:00 AM' (IST) -> epoch seconds, or None"""
+    try:
+        return datetime.strptime((value or '').strip(), DATE_FORMAT).replace(tzinfo=PORTAL_TZ).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_amount(value):
+    """'19,75,26,451' or 'Rs. 1,000' -> float, or None for 'NA' and friends.
+    The currency goes first, so the dot of 'Rs.' isn't read as a decimal point."""
+    digits = re.sub(r'[^\d.]', '', CURRENCY_RE.sub('', value or ''))
+    try:
+        return float(digits) if digits else None
+    except ValueError:
+        return None
+
+
+def iso_date(ts):
+    return datetime.fromtimestamp(ts, PORTAL_TZ).isoformat() if ts is not None else None
+
+
+def split_title_and_ref(text):
+    """'[title]\\n\\t\\t[ref][2026_ETF_286826_1]' -> (title, reference, tender ID).
+
+    The listing packs all three in one cell, each in brackets; the title may
+    contain brackets of its own, so the last two groups are peeled off the end.
+    """
+    text = clean(text)
+    if not text:
+        return None, None, None
+    groups = []
+    while len(groups) < 2 and (match := TRAILING_BRACKET_RE.search(text)):
+        groups.insert(0, clean(match.group(1)))
+        text = text[:match.start()].rstrip()
+    if text.startswith('[') and text.endswith(']'):
+        text = text[1:-1]
+    title = clean(text)
+    if title is None and groups:
+        title = groups.pop(0)
+    reference, tender_id = ([None, None] + groups)[-2:]
+    return title, reference, tender_id
+
+
+def _section_value(sections, section, prefix):
+    for key, value in (sections.get(section) or {}).items():
+        if key.startswith(prefix):
+            return value
+    return None
+
+
+def tender_type(value):
+    """'Open Tender' -> 'open', 'Expression of Interest' -> 'eoi', ..."""
+    value = (clean(value) or '').lower()
+    for needle, kind in TENDER_TYPES:
+        if needle in value:
+            return kind
+    return value or None
+
+
+def category(value):
+    """NIC's Tender Category as 'works' / 'goods' / 'services' (else cleaned, lower case)"""
+    value = (clean(value) or '').lower()
+    return next((name for name in CATEGORIES if name.rstrip('s') in value), value or None)
+
+
+def enrich_tender(tender):
+    """Typed, normalized copy of a tender's raw fields (which are left alone)"""
+    details = tender.get('details')
+    sections = dict(details) if isinstance(details, dict) else {}
+    sections['listing'] = tender
+    basic = sections.get('basic_details') or {}
+    work = sections.get('work_details') or {}
+
+    title, reference, tender_id = split_title_and_ref(tender.get('title_and_ref'))
+    fields = {
+        'v': ENRICH_VERSION,
+        'title': clean(work.get('Title')) or title,
+        'reference': clean(basic.get('Tender Reference Number')) or reference,
+        'tender_id': clean(basic.get('Tender ID')) or tender_id,
+    }
+    for name, sources in DATES.items():
+        ts = next((ts for ts in (parse_tender_date(_section_value(sections, *source)) for source in sources)
+                   if ts is not None), None)
+        fields[name] = iso_date(ts)
+        fields[f'{name}_ts'] = ts
+    for name, sources in AMOUNTS.items():
+        fields[name] = next((amount for amount in (parse_amount(clean(_section_value(sections, *source)))
+                                                   for source in sources) if amount is not None), None)
+
+    location = clean(work.get('Location'))
+    if location:
+        location = SPACE_BEFORE_PUNCT_RE.sub(r'\1', location)
+    pincode = clean(work.get('Pincode'))
+    match = PINCODE_RE.search(pincode or location or '')
+    fields.update({
+        'category': category(basic.get('Tender Category')),
+        'product_category': clean(work.get('Product Category')),
+        'sub_category': clean(work.get('Sub category')),
+        'tender_type': tender_type(basic.get('Tender Type')),
+        'location': location,
+        'pincode': match.group(0) if match else None,
+    })
+    return fields
+
+
+def normalized(tender):
+    """A tender's typed fields: the block the enrichment stage stored, or
+    computed now for tenders saved before it (or by an older version)"""
+    fields = tender.get('normalized')
+    if isinstance(fields, dict) and fields.get('v') == ENRICH_VERSION:
+        return fields
+    return enrich_tender(tender)
+
+
+def enrich_catalog(data):
+    """Add (or refresh) `normalized` on every tender of a catalog, in place.
+
+    Run by the scraper right before its output is saved, so every consumer -
+    tenderdb, the snapshot, the search index, the browser - reads typed
+    values instead of re-parsing strings. Current blocks are kept as-is:
+    finished orgs don't change, so repeated saves in a run only pay for
+    what's new.
+    """
+    count = 0
+    for site in data:
+        for org in site.get('data', []):
+            for tender in org.get('tenders', []):
+                fields = tender.get('normalized')
+                if not (isinstance(fields, dict) and fields.get('v') == ENRICH_VERSION):
+                    tender['normalized'] = enrich_tender(tender)
+                    count += 1
+    return count
@@ -0,0 +1,181 @@
+"""What the scraper hands the web app besides the JSON export: the free /
+pro projections of the catalog and the binary snapshot workers mmap.
+
+Compiled here, on every save, so the scraper never has to import the web
+modules; catalog.py reads what this writes.
+"""
+import gzip
+import hashlib
+import json
+import math
+import struct
+
+from scrapers.enrich import enrich_catalog, normalized
+from scrapers.snapshot import StringTable, write_sections
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+SNAPSHOT_FILE = 'scrapers/tenders_all3.snap'
+
+# Fields only pro users get to see, as key paths inside each tender.
+# Add a path here to hide another field from the free view.
+PRO_ONLY_FIELDS = [
+    ('details', 'basic_details', 'Tender ID'),
+    ('normalized', 'tender_id'),
+]
+
+
+def encode_json(data):
+    """Compact UTF-8 JSON, the same bytes every worker would send."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def body_etag(body):
+    """Strong validator from the bytes themselves, so every worker agrees"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def compress_body(body):
+    """{'identity': body, 'gzip': ..., 'br': ...} - precompressed once per version"""
+    encodings = {'identity': body, 'gzip': gzip.compress(body, compresslevel=6)}
+    if brotli is not None:
+        encodings['br'] = brotli.compress(body, quality=9)
+    return encodings
+
+
+def _without(node, path):
+    """Copy of `node` with `path` removed, sharing every untouched branch"""
+    if not isinstance(node, dict) or path[0] not in node:
+        return node
+    result = dict(node)
+    if len(path) == 1:
+        del result[path[0]]
+    else:
+        result[path[0]] = _without(node[path[0]], path[1:])
+    return result
+
+
+def redact_tender(tender, fields=PRO_ONLY_FIELDS):
+    """Free-plan projection of one tender"""
+    for path in fields:
+        tender = _without(tender, path)
+    return tender
+
+
+def redact(data, fields=PRO_ONLY_FIELDS):
+    """Free-plan projection of the catalog; `data` itself is left alone"""
+    sites = []
+    for site in data:
+        orgs = []
+        for org in site.get('data', []):
+            tenders = [redact_tender(tender, fields) for tender in org.get('tenders', [])]
+            orgs.append(dict(org, tenders=tenders))
+        sites.append(dict(site, data=orgs))
+    return sites
+
+
+# --- BINARY SNAPSHOT ---
+# Written by the scraper after each compaction, next to the JSON export.
+# Sections: 'meta' (JSON: stats, ETags), 'strings' (interned site /
+# organisation / Tender ID strings), 'records' (one RECORD per tender,
+# catalog order), the pre-encoded /api/tenders bodies ('body.<plan>',
+# 'gzip.<plan>', 'br.<plan>' when brotli is installed), and 'idx.tender_id'
+# (positions sorted by Tender ID), 'idx.ref' (positions sorted by portal,
+# reference number). Readers reject any other SNAPSHOT_FORMAT. Each record points at its tender's bytes inside
+# 'body.pro', so rows are decoded from the body itself. Keys, dates and values come from the tenders'
+# `normalized` fields (format 3: keys whitespace-collapsed, dates in IST).
+SNAPSHOT_FORMAT = 3
+SNAPSHOT_CODINGS = {'identity': 'body', 'gzip': 'gzip', 'br': 'br'}  # content-coding -> section prefix
+RECORD = struct.Struct('<IIIIIQddd')  # site, org, tender id, reference (string ids), tender length + offset
+                                      # in body.pro, closing, published, value (NaN when missing)
+
+
+def _encode_body(data):
+    """encode_json(data), plus the (offset, length) of every tender in it, in catalog order"""
+    parts, spans = [], []
+    size = 0
+
+    def emit(chunk):
+        nonlocal size
+        parts.append(chunk)
+        size += len(chunk)
+
+    def node(value):
+        if isinstance(value, dict):
+            emit(b'{')
+            for i, (key, item) in enumerate(value.items()):
+                emit((b',' if i else b'') + encode_json(key) + b':')
+                if key == 'tenders' and isinstance(item, list):
+                    emit(b'[')
+                    for j, tender in enumerate(item):
+                        if j: emit(b',')
+                        chunk = encode_json(tender)
+                        spans.append((size, len(chunk)))
+                        emit(chunk)
+                    emit(b']')
+                else:
+                    node(item)
+            emit(b'}')
+        elif isinstance(value, list):
+            emit(b'[')
+            for i, item in enumerate(value):
+                if i: emit(b',')
+                node(item)
+            emit(b']')
+        else:
+            emit(encode_json(value))
+
+    node(data)
+    return b''.join(parts), spans
+
+
+def write_snapshot(path, data):
+    """Compile the catalog into a snapshot file workers can mmap (enriching
+    `data` in place first, as CatalogSnapshot does)"""
+    enrich_catalog(data)
+    pro_body, spans = _encode_body(data)
+    free_body = encode_json(redact(data))
+    strings = StringTable()
+    records, tender_ids, refs = [], [], []
+    for site in data:
+        for org in site.get('data', []):
+            for tender in org.get('tenders', []):
+                offset, length = spans[len(records)]
+                fields = normalized(tender)
+                tender_id, ref = fields['tender_id'], fields['reference']
+                if tender_id:
+                    tender_ids.append((tender_id, len(records)))
+                if ref:
+                    refs.append((str(site.get('site')), ref, len(records)))
+                closing, published, value = fields['closing_ts'], fields['published_ts'], fields['value']
+                records.append(RECORD.pack(
+                    strings.intern(site.get('site')), strings.intern(org.get('organisation')),
+                    strings.intern(tender_id), strings.intern(ref), length, offset,
+                    math.nan if closing is None else closing,
+                    math.nan if published is None else published,
+                    math.nan if value is None else value,
+                ))
+
+    stats = {
+        'total_portals': len(data),
+        'total_orgs': sum(len(site.get('data', [])) for site in data),
+        'total_tenders': len(records),
+    }
+    tender_ids.sort()
+    refs.sort()
+    sections = {
+        'meta': encode_json({'format': SNAPSHOT_FORMAT, 'stats': stats,
+                             'etags': {'pro': body_etag(pro_body), 'free': body_etag(free_body)}}),
+        'strings': strings.encode(),
+        'records': b''.join(records),
+        'idx.tender_id': struct.pack(f'<{len(tender_ids)}I', *(pos for _, pos in tender_ids)),
+        'idx.ref': struct.pack(f'<{len(refs)}I', *(pos for _, _, pos in refs)),
+    }
+    for plan, body in (('pro', pro_body), ('free', free_body)):
+        for coding, encoded in compress_body(body).items():
+            sections[f'{SNAPSHOT_CODINGS[coding]}.{plan}'] = encoded
+    write_sections(path, sections)
+    return len(records)
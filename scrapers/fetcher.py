@@ -0,0 +1,393 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from playwright.async_api import BrowserContext, Page, TimeoutError as PlaywrightTimeoutError
+
+from scrapers.config import (
+    HTTP_FIRST, HTTP_MAX_CONNECTIONS, HTTP_TIMEOUT, PAGE_MAX_NAVIGATIONS, PAGES_PER_CONTEXT, USER_AGENT,
+)
+from scrapers.throttle import throttle
+
+try:
+    import httpx
+except ImportError:  # Browser-only mode
+    httpx = None
+
+# httpx only negotiates HTTP/2 when h2 is installed
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Pages a plain GET can't use: captcha forms and NIC's expired-session screens
+NEEDS_BROWSER_RE = re.compile(r'''(?:id|name)=["']?captcha|StaleSession|session has timed out''', re.I)
+BLOCKED_RESOURCES = "**/*.{png,jpg,jpeg,gif,svg,ico,css,woff,woff2,ttf,mp4,webm}"
+TRACKER_RE = re.compile(
+    r"^https?://([^/]*\.)?(google-analytics\.com|googletagmanager\.com|doubleclick\.net|googlesyndication\.com"
+    r"|facebook\.net|hotjar\.com|clarity\.ms|addthis\.com|sharethis\.com)[/:]"
+)
+
+
+def third_party_script_re(first_party_url):
+    """Scripts served from any host other than the portal's own"""
+    host = re.escape(urlsplit(first_party_url).hostname or "")
+    return re.compile(rf"^https?://(?!([^/]*\.)?{host}[/:])[^/?#]+/[^?#]*\.js([?#]|$)")
+
+
+async def new_blocking_page(context: BrowserContext) -> Page:
+    """A fresh page with its own asset blocker - what every fetch used to pay for.
+    (Kept for the benchmark; the scraper uses PagePool.)"""
+    page = await context.new_page()
+    await page.route(BLOCKED_RESOURCES, lambda route: route.abort())
+    return page
+
+
+async def block_resources(context: BrowserContext, first_party_url: str, stats: dict = None):
+    """Install request blocking once for every page of `context`: images, fonts,
+    media and CSS, third-party scripts and known analytics hosts.
+
+    Glob/regex routes (not Python callables) so the browser only hands us
+    the requests we abort - everything else never leaves Chromium.
+    """
+    async def abort(route):
+        if stats is not None:
+            stats["blocked"] = stats.get("blocked", 0) + 1
+        await route.abort()
+
+    for pattern in (BLOCKED_RESOURCES, TRACKER_RE, third_party_script_re(first_party_url)):
+        await context.route(pattern, abort)
+
+
+def chromium_rss_mb():
+    """Memory of every browser process under this one (Linux): proportional
+    set size where readable, so shared pages aren't counted per renderer.
+    None if /proc isn't there."""
+    try:
+        parents = {}
+        for pid in os.listdir("/proc"):
+            if pid.isdigit():
+                try:
+                    with open(f"/proc/{pid}/stat") as f:
+                        parents[int(pid)] = int(f.read().rsplit(")", 1)[1].split()[1])
+                except (OSError, IndexError, ValueError):
+                    pass
+    except OSError:
+        return None
+    children = {}
+    for pid, ppid in parents.items():
+        children.setdefault(ppid, []).append(pid)
+    total_kb, stack = 0, list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        for path, field in ((f"/proc/{pid}/smaps_rollup", "Pss:"), (f"/proc/{pid}/status", "VmRSS:")):
+            try:
+                with open(path) as f:
+                    line = next((line for line in f if line.startswith(field)), None)
+            except OSError:
+                continue
+            if line:
+                total_kb += int(line.split()[1])
+                break
+    return round(total_kb / 1024, 1)
+
+
+class PagePool:
+    """Warm browser pages for one context, reused across fetches.
+
+    Blocking lives on the context (`block_resources`, installed with the
+    first page), so a page costs one `new_page()` the first time and
+    nothing after. At most `size` pages are in use at once; a page goes back
+    to the pool after each load and is closed after `max_navigations` loads
+    (renderer memory only grows) or a failed one (it may be stuck mid-
+    navigation). Replacements are opened on demand.
+    """
+
+    def __init__(self, context: BrowserContext, first_party_url: str, size: int = PAGES_PER_CONTEXT,
+                 max_navigations: int = PAGE_MAX_NAVIGATIONS):
+        self.context = context
+        self.first_party_url = first_party_url
+        self.max_navigations = max_navigations
+        self.stats = {"created": 0, "navigations": 0, "recycled": 0, "discarded": 0, "blocked": 0}
+        self._slots = asyncio.Semaphore(size)
+        self._size = size
+        self._idle = []          # [(page, loads so far)]
+        self._routed = None
+
+    async def _new_page(self):
+        if self._routed is None:
+            self._routed = asyncio.ensure_future(block_resources(self.context, self.first_party_url, self.stats))
+        await self._routed
+        page = await self.context.new_page()
+        self.stats["created"] += 1
+        return page
+
+    async def warm(self, count: int = None):
+        """Open pages ahead of the first browser fetch."""
+        pages = await asyncio.gather(*(self._new_page() for _ in range(count or self._size)))
+        self._idle.extend((page, 0) for page in pages)
+
+    @asynccontextmanager
+    async def page(self):
+        async with self._slots:
+            page, loads = self._idle.pop() if self._idle else (await self._new_page(), 0)
+            ok = False
+            try:
+                yield page
+                ok = True
+            finally:
+                loads += 1
+                self.stats["navigations"] += 1
+                if ok and loads < self.max_navigations and not page.is_closed():
+                    self._idle.append((page, loads))
+                else:
+                    self.stats["recycled" if ok else "discarded"] += 1
+                    await self._close(page)
+
+    @staticmethod
+    async def _close(page):
+        try:
+            await page.close()
+        except Exception:
+            pass  # Context already gone
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for page, _ in idle:
+            await self._close(page)
+
+
+class FetchReport:
+    """How often each fetch path was used for one portal, and how fast."""
+
+    def __init__(self):
+        self.paths = {}
+        self.fallbacks = 0
+
+    def record(self, path, seconds, ok=True):
+        stats = self.paths.setdefault(path, {"ok": 0, "failed": 0, "seconds": 0.0})
+        stats["ok" if ok else "failed"] += 1
+        stats["seconds"] += seconds
+
+    def summary(self, pages=None):
+        summary = {"fallbacks": self.fallbacks}
+        if pages is not None:
+            summary["pages"] = dict(pages)
+        for path, stats in self.paths.items():
+            count = stats["ok"] + stats["failed"]
+            summary[path] = {
+                "ok": stats["ok"],
+                "failed": stats["failed"],
+                "avg_ms": round(stats["seconds"] * 1000 / count) if count else 0,
+            }
+        return summary
+
+
+class SiteFetcher:
+    """Fetches pages for one portal: pooled HTTP first, Playwright as fallback.
+
+    NIC GePNIC pages are server-rendered, so most of them come back complete
+    from a keep-alive HTTP GET. The client keeps the portal's session cookie
+    so `session=T` DirectLinks resolve. Cookies are copied between the HTTP
+    jar and the browser context whenever we switch paths, so links found on
+    one path keep working on the other.
+
+    With `context=None` there is no fallback: a page the HTTP path can't
+    use raises (offline replay runs this way). A `recorder` (storage.
+    PageRecorder) gets a copy of every page returned.
+    """
+
+    def __init__(self, context: BrowserContext, first_party_url: str = "", http_first: bool = HTTP_FIRST,
+                 recorder=None):
+        self.context = context
+        self.pages = PagePool(context, first_party_url)
+        self.report = FetchReport()
+        self.recorder = recorder
+        self.http = None
+        if http_first and httpx is not None:
+            self.http = httpx.AsyncClient(
+                http2=HTTP2,
+                follow_redirects=True,
+                timeout=HTTP_TIMEOUT,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                    max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+            )
+
+    async def fetch(self, url: str, expect: str = None, page: Page = None, timeout: int = 30000) -> str:
+        """HTML of `url`. `expect` is a snippet a complete page must contain;
+        without it (or on captcha/session screens) we go to the browser."""
+        if self.http is not None:
+            html = await self._http_get(url, expect)
+            if html is not None:
+                return self._record(url, html)
+            if self.context is None:
+                raise RuntimeError(f"HTTP fetch unusable and no browser to fall back to: {url}")
+            self.report.fallbacks += 1
+            await self._cookies_to_browser()
+        elif self.context is None:
+            raise RuntimeError("No fetch path: HTTP is off and there is no browser")
+
+        if page is None:
+            async with self.pages.page() as page:
+                html = await self.browser_get(page, url, timeout)
+        else:
+            html = await self.browser_get(page, url, timeout)
+        if self.http is not None:
+            await self._cookies_to_http()
+        return self._record(url, html)
+
+    def _record(self, url, html):
+        if self.recorder is not None:
+            self.recorder.save(url, html)
+        return html
+
+    async def _http_get(self, url, expect):
+        async with throttle.slot(url) as slot:
+            started = time.monotonic()
+            try:
+                resp = await self.http.get(url)
+            except httpx.HTTPError as e:
+                slot.host.record(ok=False)
+                self.report.record("http", time.monotonic() - started, ok=False)
+                logging.debug(f"HTTP fetch failed for {url}: {e}")
+                return None
+            latency = time.monotonic() - started
+            slot.host.record(ok=resp.status_code < 500, latency=latency)
+
+        html = resp.text
+        ok = resp.status_code == 200 and not NEEDS_BROWSER_RE.search(html) and (expect is None or expect in html)
+        self.report.record("http", latency, ok=ok)
+        return html if ok else None
+
+    async def browser_get(self, page: Page, url: str, timeout: int = 30000) -> str:
+        """Load `url` in `page` under the host throttle and return its HTML."""
+        async with throttle.slot(url) as slot:
+            started = time.monotonic()
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+                try:
+                    await page.wait_for_load_state("networkidle", timeout=10000)
+                except PlaywrightTimeoutError:
+                    pass  # Late trackers/keep-alives - the tables are already there
+                html = await page.content()
+            except Exception:
+                slot.host.record(ok=False)
+                self.report.record("browser", time.monotonic() - started, ok=False)
+                raise
+            latency = time.monotonic() - started
+            slot.host.record(ok=True, latency=latency)
+            self.report.record("browser", latency)
+            return html
+
+    async def _cookies_to_browser(self):
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path or "/"}
+            for c in self.http.cookies.jar
+        ]
+        if cookies:
+            await self.context.add_cookies(cookies)
+
+    async def _cookies_to_http(self):
+        for c in await self.context.cookies():
+            self.http.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"])
+
+    async def close(self):
+        await self.pages.close()
+        if self.http is not None:
+            await self.http.aclose()
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+# --- BENCHMARK ---
+# python -m scrapers.fetcher [loads] [concurrency]
+# Serves a NIC-like page (stylesheets, images, a font, a first-party and a
+# third-party script) from a local server and loads it `loads` times on the
+# browser path: a fresh page + per-page route per load (the old path) vs
+# PagePool with context-level blocking. Each mode gets its own browser;
+# reports pages/sec, Chromium memory afterwards and the sub-requests that
+# still reached the server. (Loads stop at domcontentloaded - the networkidle
+# wait the scraper adds is the same fixed cost on both paths.)
+if __name__ == "__main__":
+    import sys
+    import threading
+    from collections import Counter
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from playwright.async_api import async_playwright
+
+    loads = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else PAGES_PER_CONTEXT
+    hits = Counter()
+
+    class Portal(BaseHTTPRequestHandler):
+        def do_GET(self):
+            kind = "page" if self.path.startswith("/page") else self.path.rsplit(".", 1)[-1]
+            hits[kind if self.headers.get("Host", "").startswith("127.") else f"3rd-party {kind}"] += 1
+            body = PAGE if kind == "page" else b"/* asset */" + b" " * 20000
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html" if kind == "page" else "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Portal)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    first_party = f"http://127.0.0.1:{server.server_address[1]}"
+    third_party = f"http://localhost:{server.server_address[1]}"
+    rows = "".join(f"<tr><td>{i}</td><td>01-Jan-2026 10:00 AM</td><td>[Tender {i}][REF/{i}][2026_X_{i}]</td></tr>"
+                   for i in range(40))
+    PAGE = (
+        "<html><head>"
+        + "".join(f'<link rel="stylesheet" href="/style{i}.css">' for i in range(3))
+        + '<link rel="preload" as="font" href="/font.woff2"><script src="/app.js"></script>'
+        + f'<script src="{third_party}/analytics.js"></script></head><body>'
+        + "".join(f'<img src="/logo{i}.png">' for i in range(8))
+        + f'<table id="table">{rows}</table></body></html>'
+    ).encode()
+
+    async def run(mode):
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-dev-shm-usage'])
+            context = await browser.new_context(user_agent=USER_AGENT)
+            pool = PagePool(context, first_party, size=concurrency)
+            slots = asyncio.Semaphore(concurrency)
+
+            async def load(i):
+                url = f"{first_party}/page?n={i}"
+                async with slots:
+                    if mode == "per-fetch":
+                        page = await new_blocking_page(context)
+                        try:
+                            await page.goto(url, wait_until="domcontentloaded")
+                            await page.content()
+                        finally:
+                            await page.close()
+                    else:
+                        async with pool.page() as page:
+                            await page.goto(url, wait_until="domcontentloaded")
+                            await page.content()
+
+            hits.clear()
+            started = time.perf_counter()
+            await asyncio.gather(*(load(i) for i in range(loads)))
+            elapsed = time.perf_counter() - started
+            rss = chromium_rss_mb()
+            await pool.close()
+            await browser.close()
+        served = {kind: count for kind, count in hits.items() if kind != "page"}
+        print(f"{mode:9} {loads / elapsed:7.1f} pages/s   chromium {rss} MB   sub-requests served {served}")
+        if mode == "pooled":
+            print(f"{'':9} pool {pool.stats}")
+
+    print(f"{loads} loads, {concurrency} at a time")
+    for mode in ("per-fetch", "pooled"):
+        asyncio.run(run(mode))
+    server.shutdown()
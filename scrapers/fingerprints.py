@@ -0,0 +1,160 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+
+from scrapers.config import FINGERPRINT_RETENTION_DAYS
+from scrapers.enrich import parse_tender_date
+
+TENDER_ID_RE = re.compile(r"\[([^\[\]]+)\]\s*$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    portal TEXT NOT NULL,
+    tender_key TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    published_date TEXT,
+    closing_date TEXT,
+    closing_ts REAL,
+    details TEXT,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (portal, tender_key)
+);
+CREATE TABLE IF NOT EXISTS runs (started REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS orgs (
+    portal TEXT NOT NULL,
+    organisation TEXT NOT NULL,
+    changes INTEGER NOT NULL,
+    last_crawled REAL NOT NULL,
+    PRIMARY KEY (portal, organisation)
+);
+"""
+
+
+def tender_key(tender):
+    """Stable identity of a listing row: the Tender ID at the end of
+    title_and_ref ('[title][ref][2026_ETF_286826_1]'), else the link."""
+    match = TENDER_ID_RE.search(tender.get("title_and_ref") or "")
+    return match.group(1).strip() if match else tender.get("title_link")
+
+
+def row_hash(tender):
+    """What we can see of a tender without opening its detail page."""
+    raw = "\x1f".join(tender.get(k) or "" for k in ("published_date", "closing_date", "title_and_ref"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def listing_timestamp(value):
+    """Epoch seconds of a listing date ('21-Mar-2026 09:00 AM', IST), or None"""
+    return parse_tender_date(value)
+
+
+class FingerprintStore:
+    """What we saw of every tender last time, so unchanged ones can skip
+    their detail page.
+
+    Each run calls `check()` per listing row, which classifies it as added,
+    changed or unchanged (reusing the stored details), then `finish()` to
+    work out what disappeared and build the run's delta.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.run_started = time.time()
+        self.previous_run = self.db.execute("SELECT MAX(started) FROM runs").fetchone()[0] or 0
+        self.delta = {"added": [], "changed": [], "removed": []}
+
+    def check(self, portal, tender):
+        """Return stored details if this row is unchanged, else None.
+        Rows with a new or different hash are recorded in the delta; every
+        row already known is marked seen this run."""
+        key = tender_key(tender)
+        if not key:
+            return None
+        digest = row_hash(tender)
+        row = self.db.execute(
+            "SELECT hash, details FROM fingerprints WHERE portal = ? AND tender_key = ?", (portal, key)
+        ).fetchone()
+
+        if row:
+            # Still listed, whatever becomes of its detail page this run -
+            # only the hash waits for a successful `record()`
+            self.db.execute(
+                "UPDATE fingerprints SET last_seen = ? WHERE portal = ? AND tender_key = ?",
+                (self.run_started, portal, key),
+            )
+        if row and row[0] == digest and row[1]:
+            return json.loads(row[1])
+
+        self.delta["changed" if row else "added"].append({"portal": portal, "tender_key": key})
+        return None
+
+    def record(self, portal, tender):
+        """Remember a freshly scraped tender (failed detail fetches aren't
+        stored, so they're retried next run)."""
+        key = tender_key(tender)
+        details = tender.get("details")
+        if not key or not isinstance(details, dict) or "error" in details:
+            return
+        self.db.execute(
+            "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (portal, key, row_hash(tender), tender.get("published_date"), tender.get("closing_date"),
+             listing_timestamp(tender.get("closing_date")), json.dumps(details, ensure_ascii=False), self.run_started),
+        )
+
+    def touch(self, portal, tender):
+        """Keep a tender carried over from the last catalog (its org wasn't
+        fully crawled this run) from being reported as removed."""
+        key = tender_key(tender)
+        if key:
+            self.db.execute(
+                "UPDATE fingerprints SET last_seen = ? WHERE portal = ? AND tender_key = ?",
+                (self.run_started, portal, key),
+            )
+
+    def org_stats(self, portal):
+        """{organisation: (changes, last_crawled)} from previous full crawls of each org"""
+        return {
+            org: (changes, last_crawled)
+            for org, changes, last_crawled in self.db.execute(
+                "SELECT organisation, changes, last_crawled FROM orgs WHERE portal = ?", (portal,)
+            )
+        }
+
+    def record_org(self, portal, organisation, changes):
+        """An org's listing was crawled to the end; `changes` rows were new or changed"""
+        self.db.execute(
+            "INSERT OR REPLACE INTO orgs VALUES (?, ?, ?, ?)", (portal, organisation, changes, self.run_started)
+        )
+
+    def flush(self):
+        self.db.commit()
+
+    def finish(self, portals):
+        """Close the run for `portals`: tenders seen last run but not this
+        one are reported as removed; expired ones, or ones unseen for
+        FINGERPRINT_RETENTION_DAYS, are aged out of the store."""
+        if portals:
+            marks = ",".join("?" * len(portals))
+            self.delta["removed"] = [
+                {"portal": portal, "tender_key": key}
+                for portal, key in self.db.execute(
+                    f"SELECT portal, tender_key FROM fingerprints "
+                    f"WHERE last_seen >= ? AND last_seen < ? AND portal IN ({marks})",
+                    (self.previous_run, self.run_started, *portals),
+                )
+            ]
+
+        cutoff = self.run_started - FINGERPRINT_RETENTION_DAYS * 86400
+        self.db.execute(
+            "DELETE FROM fingerprints WHERE (closing_ts IS NOT NULL AND closing_ts < ?) OR last_seen < ?",
+            (self.run_started, cutoff),
+        )
+        self.db.execute("INSERT INTO runs VALUES (?)", (self.run_started,))
+        self.db.commit()
+        return self.delta
+
+    def close(self):
+        self.db.close()
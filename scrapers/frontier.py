@@ -0,0 +1,112 @@
+import asyncio
+import itertools
+import math
+import time
+
+from scrapers.config import CRAWL_REQUEST_BUDGET, CRAWL_TIME_BUDGET
+from scrapers.fingerprints import listing_timestamp, tender_key
+
+
+class CrawlBudget:
+    """What one run may spend on page fetches, across every site: a request
+    count and a wall-clock deadline (0 disables either).
+
+    Workers call `take()` before each fetch; once it says no, the frontier
+    stops handing out work and the run wraps up with what it has. Whatever
+    didn't fit is first in line next run, so coverage grows over runs
+    instead of each run getting longer.
+    """
+
+    def __init__(self, requests=CRAWL_REQUEST_BUDGET, seconds=CRAWL_TIME_BUDGET, clock=time.monotonic):
+        self.requests = requests
+        self.seconds = seconds
+        self.clock = clock
+        self.started = clock()
+        self.used = 0
+        self.denied = 0
+
+    @property
+    def exhausted(self):
+        if self.requests and self.used >= self.requests:
+            return True
+        return bool(self.seconds) and self.clock() - self.started >= self.seconds
+
+    def take(self):
+        """Spend one request; False once the budget is gone."""
+        if self.exhausted:
+            self.denied += 1
+            return False
+        self.used += 1
+        return True
+
+    def spend(self, count):
+        """Count requests made elsewhere (distributed workers report theirs)"""
+        self.used += count
+
+    def summary(self):
+        return {
+            "requests_used": self.used,
+            "request_budget": self.requests,
+            "seconds_used": round(self.clock() - self.started, 1),
+            "time_budget": self.seconds,
+            "denied": self.denied,
+        }
+
+
+class Frontier:
+    """Crawl work for one site, lowest priority key first (FIFO among equals).
+
+    `close(n)` queues n stop markers behind all the work, one per worker.
+    """
+
+    def __init__(self):
+        self._queue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+
+    def put(self, priority, item):
+        self._queue.put_nowait((0, priority, next(self._seq), item))
+
+    def close(self, workers):
+        for _ in range(workers):
+            self._queue.put_nowait((1, (), next(self._seq), None))
+
+    async def get(self):
+        return (await self._queue.get())[3]
+
+    def __len__(self):
+        return self._queue.qsize()
+
+
+def org_priority(stats, now=None):
+    """Frontier key of an org from its `(changes, last_crawled)` stats.
+
+    Orgs never crawled to the end come first; the rest by (changes + 1) x
+    (hours since that crawl + 1), highest first - busy orgs come round
+    often, quiet ones still get their turn as they go stale.
+    """
+    if stats is None:
+        return (0, 0.0)
+    changes, last_crawled = stats
+    hours = max(0.0, ((now or time.time()) - last_crawled) / 3600)
+    return (1, -(changes + 1) * (hours + 1))
+
+
+def detail_priority(tender):
+    """Frontier key of a detail page: soonest closing first, then newest published"""
+    closing = listing_timestamp(tender.get("closing_date"))
+    published = listing_timestamp(tender.get("published_date"))
+    return (closing if closing is not None else math.inf, -(published or 0))
+
+
+def carry_over(previous, crawled, now=None):
+    """Tenders from the last catalog's entry for an org to keep next to this
+    run's `crawled` rows, when the org's listing wasn't crawled to the end:
+    the ones not seen this run that haven't closed yet."""
+    seen = {tender_key(tender) for tender in crawled}
+    now = now or time.time()
+    kept = []
+    for tender in (previous or {}).get("tenders", []):
+        closing = listing_timestamp(tender.get("closing_date"))
+        if tender_key(tender) not in seen and (closing is None or closing >= now):
+            kept.append(tender)
+    return kept
@@ -0,0 +1,308 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from scrapers.config import PARSER_BACKEND, PARSER_PROCESSES
+
+try:
+    import lxml.html
+except ImportError:  # bs4 + html.parser only
+    lxml = None
+
+DETAIL_SECTIONS = {
+    "Basic Details": "basic_details",
+    "Work Item Details": "work_details",
+    "Critical Dates": "critical_dates",
+    "Tender Fee Details": "fee_details",
+    "EMD Fee Details": "emd_details",
+}
+COVERS_HEADER = "Covers Information"
+NEXT_PAGE_ID = "linkFwd"   # GePNIC table pager's "next" link
+PAGEHEADER_XPATH = "//td[contains(concat(' ', normalize-space(@class), ' '), ' pageheader ')]"
+# Org rows are the body rows of the org table. The pre-HTTP scraper anchored on
+# `tbody`, which only browser-serialized pages reliably have; instead, header
+# and footer rows (thead / tfoot, or tbody rows styled list_header) are excluded
+# explicitly, so raw and browser-rendered pages parse alike.
+ORG_ROWS_CSS = "table#table tr[id^='informal']:not(.list_header):not(thead tr):not(tfoot tr)"
+ORG_ROWS_XPATH = (".//tr[starts-with(@id, 'informal')"
+                  " and not(contains(concat(' ', normalize-space(@class), ' '), ' list_header '))"
+                  " and not(ancestor::thead or ancestor::tfoot)]")
+
+
+# --- BS4 BACKEND (reference implementation) ---
+def _extract_section_table(soup, header_name):
+    header = soup.find(lambda tag: tag.name == "td" and "pageheader" in tag.get("class", []) and header_name in tag.get_text())
+    if not header: return {}
+    try:
+        tbody = header.find_parent("tr").find_next_sibling("tr")
+        table = tbody.find("table")
+        data = {}
+        for row in table.find_all("tr"):
+            cols = row.find_all("td")
+            for i in range(0, len(cols), 2):
+                if i + 1 < len(cols):
+                    key = cols[i].get_text(strip=True).replace(":", "").strip()
+                    value = cols[i + 1].get_text(strip=True).strip()
+                    if key: data[key] = value
+        return data
+    except: return {}
+
+def _extract_covers(soup):
+    header = soup.find(lambda tag: tag.name == "td" and "pageheader" in tag.get("class", []) and COVERS_HEADER in tag.get_text())
+    if not header: return []
+    try:
+        tbody = header.find_parent("tr").find_next_sibling("tr")
+        packet_table = tbody.find("table", id="packetTableView")
+        if not packet_table: return []
+        rows = packet_table.find_all("tr")[1:]
+        return [{"cover_no": r.find_all("td")[0].text.strip(), "description": r.find_all("td")[2].text.strip()} for r in rows if len(r.find_all("td")) >= 3]
+    except: return []
+
+def _bs4_details(html):
+    soup = BeautifulSoup(html, "html.parser")
+    details = {key: _extract_section_table(soup, name) for name, key in DETAIL_SECTIONS.items()}
+    details["covers"] = _extract_covers(soup)
+    return details
+
+def _row_slice(limit):
+    return slice(1, None if limit is None else limit + 1)
+
+def _bs4_listing(html, base_url, limit):
+    return _bs4_listing_soup(BeautifulSoup(html, "html.parser"), base_url, limit)
+
+def _bs4_listing_soup(soup, base_url, limit):
+    table = soup.find("table", id="table")
+    if not table: return []
+    rows = table.find("tbody").find_all("tr")[_row_slice(limit)] if table.find("tbody") else table.find_all("tr")[_row_slice(limit)]
+    tenders = []
+    for idx, row in enumerate(rows, start=1):
+        cols = row.find_all("td")
+        if len(cols) < 6: continue
+        title_tag = cols[4].find("a")
+        tenders.append({
+            "s_no": idx,
+            "published_date": cols[1].text.strip(),
+            "closing_date": cols[2].text.strip(),
+            "title_link": base_url + title_tag["href"] if title_tag else None,
+            "title_and_ref": cols[4].text.strip(),
+        })
+    return tenders
+
+def _bs4_listing_page(html, base_url, limit):
+    soup = BeautifulSoup(html, "html.parser")
+    link = soup.find("a", id=NEXT_PAGE_ID)
+    return _bs4_listing_soup(soup, base_url, limit), base_url + link["href"] if link and link.get("href") else None
+
+def _bs4_org_rows(html, limit):
+    soup = BeautifulSoup(html, "html.parser")
+    orgs = []
+    for row in soup.select(ORG_ROWS_CSS)[:limit]:
+        cols = row.find_all("td")
+        if len(cols) < 3: continue
+        a_tag = cols[2].find("a")
+        orgs.append((cols[1].text.strip()[:60], a_tag.get("href") if a_tag else None))
+    return orgs
+
+
+# --- LXML BACKEND ---
+# Mirrors the bs4 functions above; get_text(strip=True) is the join of the
+# stripped text pieces, .text.strip() the stripped concatenation.
+def _text(el):
+    return "".join(el.itertext()).strip()
+
+def _text_stripped(el):
+    return "".join(piece.strip() for piece in el.itertext())
+
+def _lxml_section_table(header):
+    try:
+        tbody = next(header.getparent().itersiblings("tr"))
+        table = next(tbody.iter("table"))
+    except StopIteration:
+        return {}
+    data = {}
+    for row in table.iter("tr"):
+        cols = list(row.iter("td"))
+        for i in range(0, len(cols) - 1, 2):
+            key = _text_stripped(cols[i]).replace(":", "").strip()
+            if key: data[key] = _text_stripped(cols[i + 1]).strip()
+    return data
+
+def _lxml_covers(header):
+    try:
+        tbody = next(header.getparent().itersiblings("tr"))
+    except StopIteration:
+        return []
+    packet_table = next((t for t in tbody.iter("table") if t.get("id") == "packetTableView"), None)
+    if packet_table is None: return []
+    covers = []
+    for row in list(packet_table.iter("tr"))[1:]:
+        cols = list(row.iter("td"))
+        if len(cols) >= 3:
+            covers.append({"cover_no": _text(cols[0]), "description": _text(cols[2])})
+    return covers
+
+def _lxml_details(html):
+    """One parse, one walk over the pageheader cells for every section."""
+    details = {key: {} for key in DETAIL_SECTIONS.values()}
+    details["covers"] = []
+    if not html.strip(): return details
+    seen = set()
+    for header in lxml.html.fromstring(html).xpath(PAGEHEADER_XPATH):
+        text = "".join(header.itertext())
+        for name, key in DETAIL_SECTIONS.items():
+            if key not in seen and name in text:
+                seen.add(key)
+                details[key] = _lxml_section_table(header)
+        if "covers" not in seen and COVERS_HEADER in text:
+            seen.add("covers")
+            details["covers"] = _lxml_covers(header)
+        if len(seen) == len(DETAIL_SECTIONS) + 1:
+            break
+    return details
+
+def _lxml_table(html):
+    if not html.strip(): return None
+    return _lxml_root_table(lxml.html.fromstring(html))
+
+def _lxml_root_table(root):
+    return next(iter(root.xpath("//table[@id='table']")), None)
+
+def _lxml_listing(html, base_url, limit):
+    return _lxml_listing_table(_lxml_table(html), base_url, limit)
+
+def _lxml_listing_table(table, base_url, limit):
+    if table is None: return []
+    tbody = next(table.iter("tbody"), None)
+    rows = list((tbody if tbody is not None else table).iter("tr"))[_row_slice(limit)]
+    tenders = []
+    for idx, row in enumerate(rows, start=1):
+        cols = list(row.iter("td"))
+        if len(cols) < 6: continue
+        title_tag = next(cols[4].iter("a"), None)
+        tenders.append({
+            "s_no": idx,
+            "published_date": _text(cols[1]),
+            "closing_date": _text(cols[2]),
+            "title_link": base_url + title_tag.get("href") if title_tag is not None and title_tag.get("href") is not None else None,
+            "title_and_ref": _text(cols[4]),
+        })
+    return tenders
+
+def _lxml_listing_page(html, base_url, limit):
+    if not html.strip(): return [], None
+    root = lxml.html.fromstring(html)
+    link = next(iter(root.xpath(f"//a[@id='{NEXT_PAGE_ID}'][@href]")), None)
+    return _lxml_listing_table(_lxml_root_table(root), base_url, limit), base_url + link.get("href") if link is not None else None
+
+def _lxml_org_rows(html, limit):
+    table = _lxml_table(html)
+    if table is None: return []
+    orgs = []
+    for row in table.xpath(ORG_ROWS_XPATH)[:limit]:
+        cols = list(row.iter("td"))
+        if len(cols) < 3: continue
+        a_tag = next(cols[2].iter("a"), None)
+        orgs.append((_text(cols[1])[:60], a_tag.get("href") if a_tag is not None else None))
+    return orgs
+
+
+BACKENDS = {
+    "bs4": (_bs4_details, _bs4_listing, _bs4_org_rows, _bs4_listing_page),
+    "lxml": (_lxml_details, _lxml_listing, _lxml_org_rows, _lxml_listing_page),
+}
+
+def _backend(name=None):
+    name = name or PARSER_BACKEND
+    if name == "lxml" and lxml is None:
+        name = "bs4"
+    return BACKENDS[name]
+
+
+# --- PUBLIC API ---
+def extract_details(html, backend=None):
+    """basic_details / work_details / critical_dates / fee_details / emd_details / covers of a tender page"""
+    return _backend(backend)[0](html)
+
+def parse_tender_rows(html, base_url, limit=None, backend=None):
+    """Tender rows of an org listing page (first `limit` rows, all if None)"""
+    return _backend(backend)[1](html, base_url, limit)
+
+def parse_listing_page(html, base_url, limit=None, backend=None):
+    """(tender rows, next page URL or None) of one page of an org listing"""
+    return _backend(backend)[3](html, base_url, limit)
+
+def parse_org_rows(html, limit=None, backend=None):
+    """[(org name, href or None), ...] from a portal's org list page (all if limit is None)"""
+    return _backend(backend)[2](html, limit)
+
+
+_pool = None
+parse_stats = {"pages": 0, "cpu_seconds": 0.0}  # Calls through parse_off_loop and the CPU they burned, wherever they ran
+
+def _timed(func, *args):
+    started = time.process_time()
+    result = func(*args)
+    return result, time.process_time() - started
+
+async def parse_off_loop(func, *args):
+    """Run a parse function in the parser process pool (or inline if disabled),
+    so big pages don't stall the event loop that drives the fetches."""
+    global _pool
+    if PARSER_PROCESSES <= 0:
+        result, cpu = _timed(func, *args)
+    else:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PARSER_PROCESSES)
+        result, cpu = await asyncio.get_running_loop().run_in_executor(_pool, _timed, func, *args)
+    parse_stats["pages"] += 1
+    parse_stats["cpu_seconds"] += cpu
+    return result
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+# --- BENCHMARK / EQUIVALENCE CHECK ---
+# python -m scrapers.parsing <dir of saved .html pages>
+# Parses every page with each backend, reports the time per page and
+# fails if any backend disagrees with the bs4 reference output.
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    pages = sorted(Path(sys.argv[1] if len(sys.argv) > 1 else "scrapers/fixtures").rglob("*.html"))
+    if not pages:
+        sys.exit("No .html fixtures found")
+
+    def run_all(backend):
+        outputs = []
+        for path in pages:
+            html = path.read_text(encoding="utf-8", errors="replace")
+            if "pageheader" in html:
+                outputs.append(extract_details(html, backend))
+            else:
+                outputs.append((parse_org_rows(html, None, backend), parse_listing_page(html, "", None, backend)))
+        return outputs
+
+    reference = None
+    mismatches = 0
+    for backend in BACKENDS:
+        if backend == "lxml" and lxml is None:
+            continue
+        started = time.perf_counter()
+        outputs = run_all(backend)
+        elapsed = time.perf_counter() - started
+        print(f"{backend:5} {len(pages)} pages  {elapsed * 1000 / len(pages):8.2f} ms/page")
+        if reference is None:
+            reference = outputs
+            continue
+        for path, expected, got in zip(pages, reference, outputs):
+            if expected != got:
+                mismatches += 1
+                print(f"  ✗ {backend} differs from bs4 on {path}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,340 @@
+"""Offline replay of recorded portal pages, and the scraper benchmark on top of it.
+
+Record a run (every org list, listing and detail page fetched is saved):
+
+    SCRAPER_RECORD_DIR=scrapers/recordings python -m scrapers.scraper
+
+Then, without touching the real portals:
+
+    python -m scrapers.replay serve DIR [options]   mock portals only, until Ctrl-C
+    python -m scrapers.replay bench DIR [options]   full process_site pipeline against them
+    python -m scrapers.replay golden DIR            freeze today's detail-page parse as DIR/golden.json
+    python -m scrapers.replay check DIR             re-parse, exit 1 on any change from golden.json
+
+Options shape the mock portals: --latency/--jitter (seconds per response),
+--error-rate (share of 500s), --max-inflight and --rate (requests in
+flight / started per second before the portal answers 503), --sessions
+(`session=T` links only work under the session cookie that was served them).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import re
+import resource
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scrapers.parsing import BACKENDS, extract_details, lxml
+from scrapers.storage import atomic_write_json, load_recording, page_path
+
+GOLDEN_FILE = "golden.json"
+STALE_SESSION_PAGE = b"<html><head><title>StaleSession</title></head><body>Your session has timed out.</body></html>"
+SESSION_LINK_RE = re.compile(rb"""(session=T[^"'\s>]*)""")
+SID_PARAM_RE = re.compile(r"&sid=([^&]*)")
+
+
+def recorded_sites(root):
+    """Site directories of a recording, in name order"""
+    return sorted(
+        os.path.join(root, name) for name in os.listdir(root)
+        if os.path.isfile(os.path.join(root, name, "site.json"))
+    )
+
+
+class ReplayPortal:
+    """A local stand-in for one NIC portal, serving a recording's pages.
+
+    Each response waits `latency` ± `jitter` seconds and `error_rate` of
+    them are 500s. With more than `max_inflight` requests in flight, or
+    more than `rate` started in a second, the portal answers 503 straight
+    away, like an overloaded GePNIC host. Paths not in the recording are
+    404s. `stats` counts responses by status.
+
+    With `sessions`, the portal hands out a JSESSIONID cookie and tags the
+    `session=T` links of every page with it, as GePNIC's DirectLinks are
+    bound to the session that listed them. Following such a link with
+    another session's cookie, or none, gets the StaleSession page
+    (counted as "stale").
+    """
+
+    def __init__(self, site_dir, latency=0.0, jitter=0.0, error_rate=0.0, max_inflight=0, rate=0.0, seed=None,
+                 sessions=False):
+        self.site, self.pages = load_recording(site_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_inflight = max_inflight
+        self.rate = rate
+        self.sessions = sessions
+        self.stats = Counter()
+        self._session_ids = set()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._tokens = rate
+        self._refilled = time.monotonic()
+
+        portal = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, as the pooled client expects
+            disable_nagle_algorithm = True  # Headers and body are separate writes - don't add 40 ms to each
+
+            def do_GET(self):
+                portal._serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _admit(self):
+        """True if this request may go ahead; counts it in flight"""
+        with self._lock:
+            if self.max_inflight and self._inflight >= self.max_inflight:
+                return False
+            if self.rate:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._refilled) * self.rate)
+                self._refilled = now
+                if self._tokens < 1:
+                    return False
+                self._tokens -= 1
+            self._inflight += 1
+            return True
+
+    def _session(self, handler):
+        """(session id of the request's cookie, True if it's a new one)"""
+        cookie = SimpleCookie(handler.headers.get("Cookie", ""))
+        sid = cookie["JSESSIONID"].value if "JSESSIONID" in cookie else None
+        with self._lock:
+            if sid in self._session_ids:
+                return sid, False
+            sid = secrets.token_hex(8)
+            self._session_ids.add(sid)
+            return sid, True
+
+    def _serve(self, handler):
+        body = b""
+        path, sid, fresh, stale = handler.path, None, False, False
+        if self.sessions:
+            sid, fresh = self._session(handler)
+            link_sid = SID_PARAM_RE.search(path)
+            path = SID_PARAM_RE.sub("", path)
+            stale = "session=T" in path and (link_sid is None or link_sid.group(1) != sid)
+        if not self._admit():
+            status = 503
+        else:
+            try:
+                with self._lock:
+                    delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+                    failed = self._random.random() < self.error_rate
+                time.sleep(max(0.0, delay))
+                page = self.pages.get(path)
+                if failed:
+                    status = 500
+                elif stale:
+                    status, body = 200, STALE_SESSION_PAGE
+                elif page is None:
+                    status = 404
+                else:
+                    status = 200
+                    with open(page, "rb") as f:
+                        body = f.read()
+                    if self.sessions:
+                        body = SESSION_LINK_RE.sub(rb"\1&amp;sid=" + sid.encode(), body)
+            finally:
+                with self._lock:
+                    self._inflight -= 1
+        with self._lock:
+            self.stats["stale" if stale and status == 200 else status] += 1
+        handler.send_response(status)
+        if fresh:
+            handler.send_header("Set-Cookie", f"JSESSIONID={sid}; Path=/")
+        handler.send_header("Content-Type", "text/html; charset=utf-8")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def serve(site_dirs, options, conn):
+    """Run one ReplayPortal per site until told to stop (in its own process,
+    so the portals' CPU and memory stay out of the benchmark's numbers).
+    Sends the portal URLs when ready, then their stats on "stop"."""
+    portals = [ReplayPortal(site_dir, **options).start() for site_dir in site_dirs]
+    conn.send([portal.url for portal in portals])
+    conn.recv()
+    for portal in portals:
+        portal.stop()
+    conn.send([dict(portal.stats) for portal in portals])
+
+
+def replayed_site(site_dir, url):
+    """A TENDER_SITES entry for a recorded site, pointed at its mock portal"""
+    site, _ = load_recording(site_dir)
+    return {"name": site["name"], "org_url": url + page_path(site["org_url"]), "base_url": url}
+
+
+# --- GOLDEN PARSE OUTPUT ---
+def detail_pages(root):
+    """(key, path) of every recorded tender detail page - the ones with section headers"""
+    for site_dir in recorded_sites(root):
+        _, pages = load_recording(site_dir)
+        for path in sorted(set(pages.values())):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                if "pageheader" in f.read():
+                    yield f"{os.path.basename(site_dir)}/{os.path.basename(path)}", path
+
+
+def write_golden(root):
+    golden = {}
+    for key, path in detail_pages(root):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            golden[key] = extract_details(f.read(), "bs4")
+    atomic_write_json(os.path.join(root, GOLDEN_FILE), golden)
+    return len(golden)
+
+
+def check_golden(root):
+    """Re-parse every page in golden.json with each backend; returns the
+    number of (page, backend) outputs that changed, printing which sections"""
+    with open(os.path.join(root, GOLDEN_FILE), "r", encoding="utf-8") as f:
+        golden = json.load(f)
+    regressions = 0
+    for key, expected in golden.items():
+        try:
+            with open(os.path.join(root, os.path.dirname(key), "pages", os.path.basename(key)),
+                      "r", encoding="utf-8", errors="replace") as f:
+                html = f.read()
+        except OSError as e:
+            regressions += 1
+            print(f"  ✗ {key}: {e}")
+            continue
+        for backend in BACKENDS:
+            if backend == "lxml" and lxml is None:
+                continue
+            got = extract_details(html, backend)
+            changed = sorted(section for section in set(expected) | set(got) if expected.get(section) != got.get(section))
+            if changed:
+                regressions += 1
+                print(f"  ✗ {backend:4} {key}: {', '.join(changed)}")
+    print(f"golden: {len(golden)} detail pages, {regressions} regressions")
+    return regressions
+
+
+# --- BENCHMARK ---
+def _cpu(usage):
+    return usage.ru_utime + usage.ru_stime
+
+
+def bench(root, options, polite=False):
+    """Crawl every recorded site through process_site over HTTP (no browser)
+    against its mock portal; print throughput, CPU and memory. Returns the
+    golden regressions found afterwards (0 without a golden.json)."""
+    from scrapers import scraper
+    from scrapers.parsing import parse_stats, shutdown_pool
+    from scrapers.throttle import throttle
+
+    site_dirs = recorded_sites(root)
+    if not site_dirs:
+        sys.exit(f"No recorded sites under {root}")
+    conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(site_dirs, options, child_conn), daemon=True)
+    server.start()
+    sites = [replayed_site(site_dir, url) for site_dir, url in zip(site_dirs, conn.recv())]
+
+    scraper.RECORD_DIR = None  # Replaying, not recording
+    if not polite:
+        throttle.host_interval = throttle.host_floor = 0.0
+    logging.getLogger().setLevel(logging.WARNING)
+
+    async def crawl():
+        throttle.reset()
+        return await asyncio.gather(*(scraper.process_site(site, None) for site in sites))
+
+    self_before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    results = asyncio.run(crawl())
+    elapsed = time.perf_counter() - started
+    shutdown_pool()  # Parser workers exit here, so their rusage is in RUSAGE_CHILDREN
+    self_after = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    conn.send("stop")
+    served = conn.recv()
+    server.join()
+
+    orgs = [org for site_data in results for org in site_data or []]
+    tenders = [tender for org in orgs for tender in org["tenders"]]
+    details = [tender["details"] for tender in tenders if "details" in tender]
+    failed = sum(1 for d in details if d.get("status") == "failed")
+    print(f"{len(sites)} sites, {elapsed:.2f}s  (latency {options['latency']}s ±{options['jitter']}, "
+          f"errors {options['error_rate']:.0%}, max in-flight {options['max_inflight'] or '-'}, "
+          f"rate {options['rate'] or '-'}/s, {'polite' if polite else 'no'} host throttle)")
+    print(f"  orgs        {len(orgs):6}  {len(orgs) / elapsed:8.1f}/s")
+    print(f"  tenders     {len(tenders):6}  {len(tenders) / elapsed:8.1f}/s")
+    print(f"  details     {len(details) - failed:6}  {(len(details) - failed) / elapsed:8.1f}/s  ({failed} failed)")
+    print(f"  parse CPU   {parse_stats['cpu_seconds']:8.2f}s over {parse_stats['pages']} pages "
+          f"({parse_stats['cpu_seconds'] * 1000 / max(parse_stats['pages'], 1):.2f} ms/page)")
+    print(f"  loop CPU    {_cpu(self_after) - _cpu(self_before):8.2f}s  (parser workers {_cpu(children):.2f}s)")
+    print(f"  peak RSS    {self_after.ru_maxrss / 1024:8.1f} MB  (largest parser worker {children.ru_maxrss / 1024:.1f} MB)")
+    for site, stats in zip(sites, served):
+        print(f"  {site['name']:24} served {dict(sorted(stats.items()))}  "
+              f"fetch {scraper.scrape_status['fetch_report'].get(site['name'], {}).get('http')}")
+
+    if os.path.exists(os.path.join(root, GOLDEN_FILE)):
+        return check_golden(root)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m scrapers.replay", description="Replay recorded NIC portal pages offline")
+    parser.add_argument("command", choices=["serve", "bench", "golden", "check"])
+    parser.add_argument("dir", help="recording directory (SCRAPER_RECORD_DIR of the recorded run)")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per response (default 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="± seconds of random extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of responses that are 500s")
+    parser.add_argument("--max-inflight", type=int, default=0, help="503 beyond this many concurrent requests per portal")
+    parser.add_argument("--rate", type=float, default=0.0, help="503 beyond this many request starts per second per portal")
+    parser.add_argument("--seed", type=int, default=None, help="seed for latency jitter and errors")
+    parser.add_argument("--sessions", action="store_true", help="bind session=T links to the session cookie that got them")
+    parser.add_argument("--polite", action="store_true", help="keep the scraper's per-host throttle (off by default)")
+    args = parser.parse_args()
+    options = {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+               "max_inflight": args.max_inflight, "rate": args.rate, "seed": args.seed,
+               "sessions": args.sessions}
+
+    if args.command == "serve":
+        portals = [ReplayPortal(site_dir, **options).start() for site_dir in recorded_sites(args.dir)]
+        for portal in portals:
+            print(f"{portal.site['name']:24} {portal.url}{page_path(portal.site['org_url'])}  ({len(portal.pages)} pages)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            for portal in portals:
+                print(f"{portal.site['name']:24} served {dict(portal.stats)}")
+    elif args.command == "bench":
+        sys.exit(1 if bench(args.dir, options, args.polite) else 0)
+    elif args.command == "golden":
+        print(f"✅ {write_golden(args.dir)} detail pages → {os.path.join(args.dir, GOLDEN_FILE)}")
+    else:
+        sys.exit(1 if check_golden(args.dir) else 0)
@@ -1,29 +1,58 @@
+"""The scraper: every NIC portal in TENDER_SITES crawled concurrently into
+scrapers/tenders_all3.json, the tender database and the catalog snapshot
+the web app serves. Run it from the repository root:
+
+    python -m scrapers.scraper      (or python scrapers/scraper.py)
+"""
 import asyncio
 import json
 import logging
 import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict
 import os
-from playwright.async_api import async_playwright, BrowserContext
-from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright
+
+if not __package__:
+    # Run as a file (python scrapers/scraper.py) rather than with -m: the
+    # scrapers package lives one level up
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.config import (
+    DELTA_FILE, DETAIL_WORKERS_PER_SITE, FINGERPRINT_DB, MAX_CONCURRENT_SITES, MAX_LISTING_PAGES, ORG_WORKERS_PER_SITE,
+    RECORD_DIR, SCRAPE_LOG, TENDER_DB, USER_AGENT,
+)
+from scrapers.enrich import enrich_catalog
+from scrapers.export import SNAPSHOT_FILE, write_snapshot
+from scrapers.fetcher import SiteFetcher, chromium_rss_mb
+from scrapers.fingerprints import FingerprintStore, tender_key
+from scrapers.frontier import CrawlBudget, Frontier, carry_over, detail_priority, org_priority
+from scrapers.storage import PageRecorder, ScrapeLog, atomic_write_json
+from scrapers.tenderdb import write_db
+from scrapers.parsing import extract_details, parse_listing_page, parse_off_loop, parse_org_rows, shutdown_pool
+from scrapers.throttle import throttle
 
 # --- UPGRADED CONFIGURATION ---
 JSON_FILE = "scrapers/tenders_all3.json"  # ✅ FIXED: Correct path for dashboard
-MAX_CONCURRENT_TENDERS = 3  # ✅ Increased to 3 for better performance
-MAX_ORGS_PER_SITE = 20      # ✅ More orgs per site
-MAX_TENDERS_PER_ORG = 2     # ✅ EXACTLY 2 tenders per org as requested
-semaphore = asyncio.Semaphore(MAX_CONCURRENT_TENDERS)
+LIST_TABLE = 'id="table"'  # The table every complete org list and listing page carries
+# ✅ Every org and every listing page - how far a run gets is set by CRAWL_REQUEST_BUDGET / CRAWL_TIME_BUDGET
 
 # Global status tracking
 scrape_status = {
     "current_site": "None", 
+    "active_sites": [],
     "last_run": "Never", 
     "status": "Idle", 
     "orgs_scraped": 0,
     "current_org": "",
     "sites_completed": 0,
-    "total_sites": 8
+    "total_sites": 8,
+    "fetch_report": {},
+    "budget": {},
+    "browser_rss_mb": None,
+    "delta": {}
 }
 
 # ✅ ALL 8 WEBSITES - NO LIMIT!
@@ -43,190 +72,375 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 # ✅ FIXED: Create scrapers folder if missing
 os.makedirs("scrapers", exist_ok=True)
 
+# Finished/in-progress data per site name - sites run concurrently
+site_results = {}
+
+# Catalog saves run here, one at a time and in order, so a rebuild never
+# stalls the fetches and lease heartbeats still in flight on the event loop
+save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-save")
+
+def collected_data():
+    """All sites scraped so far, in TENDER_SITES order."""
+    return [
+        {"site": site["name"], "total_orgs": len(site_results[site["name"]]), "data": site_results[site["name"]]}
+        for site in TENDER_SITES if site["name"] in site_results
+    ]
+
+def load_previous_catalog():
+    """{site: {org name: org}} of the catalog the last run left, for carrying
+    over orgs this run's budget doesn't reach."""
+    try:
+        with open(JSON_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {site["site"]: {org["organisation"]: org for org in site.get("data", [])} for site in data}
+
 def save_data(data):
-    """Save ALL data with progress."""
+    """Compact ALL data into the served snapshot (atomic - readers never see a partial file):
+    the tender database the API queries, the JSON export, and the binary
+    snapshot workers mmap (written last, so it's never older than the JSON).
+    Every tender gets its typed `normalized` fields first, so none of them re-parse."""
+    enriched = enrich_catalog(data)
+    logging.info(f"✅ Normalized {enriched} tenders")
+    try:
+        count = write_db(TENDER_DB, data)
+        logging.info(f"✅ SAVED {count} tenders → {TENDER_DB}")
+    except Exception as e:
+        logging.error(f"❌ Tender DB save error: {e}")
     try:
-        # ✅ Ensure scrapers folder exists
-        os.makedirs(os.path.dirname(JSON_FILE), exist_ok=True)
-        with open(JSON_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        atomic_write_json(JSON_FILE, data)
         logging.info(f"✅ SAVED {len(data)} sites → {JSON_FILE}")
     except Exception as e:
         logging.error(f"❌ Save error: {e}")
-
-# --- EXTRACTION FUNCTIONS (IMPROVED) ---
-def _extract_section_table(soup, header_name):
-    header = soup.find(lambda tag: tag.name == "td" and "pageheader" in tag.get("class", []) and header_name in tag.get_text())
-    if not header: return {}
-    try:
-        tbody = header.find_parent("tr").find_next_sibling("tr")
-        table = tbody.find("table")
-        data = {}
-        for row in table.find_all("tr"):
-            cols = row.find_all("td")
-            for i in range(0, len(cols), 2):
-                if i + 1 < len(cols):
-                    key = cols[i].get_text(strip=True).replace(":", "").strip()
-                    value = cols[i + 1].get_text(strip=True).strip()
-                    if key: data[key] = value
-        return data
-    except: return {}
-
-def _extract_covers(soup):
-    header = soup.find(lambda tag: tag.name == "td" and "pageheader" in tag.get("class", []) and "Covers Information" in tag.get_text())
-    if not header: return []
+        return
     try:
-        tbody = header.find_parent("tr").find_next_sibling("tr")
-        packet_table = tbody.find("table", id="packetTableView")
-        if not packet_table: return []
-        rows = packet_table.find_all("tr")[1:]
-        return [{"cover_no": r.find_all("td")[0].text.strip(), "description": r.find_all("td")[2].text.strip()} for r in rows if len(r.find_all("td")) >= 3]
-    except: return []
-
-def _parse_tender_data(html, base_url):
-    soup = BeautifulSoup(html, "html.parser")
-    table = soup.find("table", id="table")
-    if not table: return []
-    rows = table.find("tbody").find_all("tr")[1:MAX_TENDERS_PER_ORG+1] if table.find("tbody") else table.find_all("tr")[1:MAX_TENDERS_PER_ORG+1]
-    tenders = []
-    for idx, row in enumerate(rows, start=1):
-        cols = row.find_all("td")
-        if len(cols) < 6: continue
-        title_tag = cols[4].find("a")
-        tenders.append({
-            "s_no": idx,
-            "published_date": cols[1].text.strip(),
-            "closing_date": cols[2].text.strip(),
-            "title_link": base_url + title_tag["href"] if title_tag else None,
-            "title_and_ref": cols[4].text.strip(),
-        })
-    return tenders
+        write_snapshot(SNAPSHOT_FILE, data)
+    except Exception as e:
+        logging.error(f"❌ Snapshot save error: {e}")
 
 # --- CORE SCRAPING ENGINE (OPTIMIZED) ---
-async def scrape_single_tender(context: BrowserContext, url: str) -> Dict:
-    """✅ Scrapes exactly 1 tender with retry logic."""
-    async with semaphore:
-        page = None
-        for attempt in range(2):
-            try:
-                page = await context.new_page()
-                await page.route("**/*.{png,jpg,jpeg,gif,css,woff,woff2,mp4}", lambda route: route.abort())
-                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                await page.wait_for_load_state("networkidle", timeout=10000)
-                
-                soup = BeautifulSoup(await page.content(), "html.parser")
-                details = {
-                    "basic_details": _extract_section_table(soup, "Basic Details"),
-                    "work_details": _extract_section_table(soup, "Work Item Details"),
-                    "critical_dates": _extract_section_table(soup, "Critical Dates"),
-                    "covers": _extract_covers(soup),
-                    "scraped_at": datetime.now().isoformat()
-                }
-                await page.close()
-                return details
-            except Exception as e:
-                if page:
-                    await page.close()
-                logging.warning(f"⚠️ Tender failed (attempt {attempt+1}): {str(e)[:80]}")
-                if attempt == 1:
-                    return {"error": str(e)[:100], "status": "failed"}
-                await asyncio.sleep(random.uniform(1, 3))
-
-async def process_site(site: Dict, browser):
-    """✅ Processes ALL orgs from 1 site."""
+async def scrape_single_tender(fetcher: SiteFetcher, url: str, budget: CrawlBudget = None) -> Dict:
+    """✅ Scrapes exactly 1 tender with retry logic (None if the budget runs out first)."""
+    for attempt in range(2):
+        if budget is not None and not budget.take():
+            return None
+        try:
+            html = await fetcher.fetch(url, expect="pageheader")
+            details = await parse_off_loop(extract_details, html)
+            details["scraped_at"] = datetime.now().isoformat()
+            return details
+        except Exception as e:
+            logging.warning(f"⚠️ Tender failed (attempt {attempt+1}): {str(e)[:80]}")
+            if attempt == 1:
+                return {"error": str(e)[:100], "status": "failed"}
+            await asyncio.sleep(random.uniform(1, 3))
+
+async def crawl_org_listing(fetcher: SiteFetcher, url: str, base_url: str, budget: CrawlBudget):
+    """Rows of every listing page of one org: (rows, complete, cut_by_budget).
+    A page without the listing table (an error or maintenance page served
+    with a 200) raises rather than reading as an org with no tenders."""
+    rows, seen = [], set()
+    for _ in range(MAX_LISTING_PAGES):
+        if not budget.take():
+            return rows, False, True
+        html = await fetcher.fetch(url, expect=LIST_TABLE)
+        if LIST_TABLE not in html:
+            raise RuntimeError(f"No listing table on {url}")
+        page_rows, next_url = await parse_off_loop(parse_listing_page, html, base_url)
+        for row in page_rows:
+            key = tender_key(row)
+            if key not in seen:
+                seen.add(key)
+                rows.append(row)
+        if not next_url or next_url == url:
+            return rows, True, False
+        url = next_url
+    return rows, False, False
+
+def touch_tenders(fingerprints: FingerprintStore, site_name: str, org: Dict):
+    """Mark an org's tenders seen this run without re-listing it (it came
+    from a crashed run's log), so they aren't reported as removed"""
+    if fingerprints:
+        for tender in org.get("tenders", []):
+            fingerprints.touch(site_name, tender)
+
+def resume_finished_site(site_name: str, resumed: Dict, fingerprints: FingerprintStore = None):
+    """Take a site that finished before the crash from the log, as-is"""
+    site_results[site_name] = list(resumed["orgs"].values())
+    for org in site_results[site_name]:
+        touch_tenders(fingerprints, site_name, org)
+    scrape_status["sites_completed"] += 1
+    logging.info(f"♻️ {site_name} already finished before the crash - skipping")
+
+class SiteCrawl:
+    """✅ What one site's crawl has produced so far, whoever fetches the pages:
+    process_site's workers, or distributed workers reporting back to the
+    coordinator. Orgs are keyed by their position in the org list.
+
+    `listed()` takes an org's listing rows and says which detail pages
+    still need fetching; `detailed()` takes each of those back. An org is
+    finished (fingerprints flushed, appended to `log`, visible in
+    site_results) once its last detail page is in.
+    """
+
+    def __init__(self, site: Dict, fingerprints: FingerprintStore = None, log: ScrapeLog = None,
+                 previous: Dict = None):
+        self.site = site
+        self.name = site["name"]
+        self.fingerprints = fingerprints
+        self.log = log
+        self.previous = previous or {}
+        self.orgs = {}        # idx -> org entry, in flight or done
+        self.pending = {}     # idx -> detail pages still to fetch
+        self.done = set()
+
+    def resume(self, idx, org):
+        """An org recovered from a crashed run's log, taken as-is"""
+        self.orgs[idx] = org
+        self.done.add(idx)
+        touch_tenders(self.fingerprints, self.name, org)
+
+    def finish(self, idx):
+        self.done.add(idx)
+        if self.fingerprints: self.fingerprints.flush()
+        # ✅ LOG PROGRESS AFTER EVERY ORG - one appended line, not a full rewrite
+        if self.log: self.log.org(self.name, self.orgs[idx])
+        site_results[self.name] = self.data()
+
+    def carry(self, org_name, crawled):
+        """Still-open tenders of an org this run couldn't crawl to the end, from the last catalog"""
+        carried = carry_over(self.previous.get(org_name), crawled)
+        if self.fingerprints:
+            for tender in carried:
+                self.fingerprints.touch(self.name, tender)
+        return carried
+
+    def listed(self, idx, org_name, crawled, complete, cut):
+        """Merge one org's listing; returns [(tender, last run's details or None)] to fetch details for"""
+        fingerprints = self.fingerprints
+        carried = [] if complete else self.carry(org_name, crawled)
+
+        if not crawled and not carried:
+            if fingerprints and complete: fingerprints.record_org(self.name, org_name, 0)
+            return []
+        if crawled:
+            logging.info(f"    📋 {len(crawled)} tenders listed" + (f" + {len(carried)} carried over" if carried else ""))
+        tenders = crawled + carried
+        for s_no, tender in enumerate(tenders, 1):
+            tender["s_no"] = s_no
+        self.orgs[idx] = {
+            "organisation": org_name,
+            "tenders": tenders,
+            "total_tenders_found": len(crawled)
+        }
+        stale = {tender_key(t): t.get("details") for t in (self.previous.get(org_name) or {}).get("tenders", [])}
+        linked, changes = [], 0
+        for tender in crawled:
+            if not tender["title_link"]: continue
+            unchanged = fingerprints.check(self.name, tender) if fingerprints else None
+            if unchanged is not None:
+                tender["details"] = unchanged
+            else:
+                changes += 1
+                linked.append(tender)
+        if fingerprints and crawled and not cut:
+            fingerprints.record_org(self.name, org_name, changes)
+        self.pending[idx] = len(linked)
+        if not linked:
+            self.finish(idx)
+        return [(tender, stale.get(tender_key(tender))) for tender in linked]
+
+    def detailed(self, idx, tender, details, stale):
+        """One detail page is in (`details` None: not fetched - out of budget).
+        Either way `listed()` already marked the tender seen in `fingerprints`,
+        so a failed or skipped fetch never reads as a removal."""
+        if details is not None:
+            tender["details"] = details
+            if self.fingerprints: self.fingerprints.record(self.name, tender)
+        elif stale:
+            tender["details"] = stale  # Out of budget: last run's details beat none
+        self.pending[idx] -= 1
+        if self.pending[idx] == 0:
+            self.finish(idx)
+
+    def data(self):
+        return [self.orgs[i] for i in sorted(self.done)]
+
+async def process_site(site: Dict, browser, fingerprints: FingerprintStore = None,
+                       log: ScrapeLog = None, resumed_orgs: Dict = None,
+                       budget: CrawlBudget = None, previous: Dict = None):
+    """✅ Processes the orgs of 1 site, most promising first, as far as the budget goes.
+
+    Pipeline: ORG_WORKERS_PER_SITE workers take orgs off `org_frontier`
+    (never-crawled, busiest and stalest first - see `org_priority`), follow
+    each org's listing pagination and push every tender's detail URL onto
+    `detail_frontier` (soonest closing first), which DETAIL_WORKERS_PER_SITE
+    workers drain at the same time. Every page fetch spends one unit of the
+    run's `budget`; orgs it doesn't cover to the end keep their still-open
+    tenders from `previous` (the last catalog's orgs for this site).
+    With `fingerprints`, tenders whose listing row hasn't changed since the
+    last run reuse their stored details instead of being refetched. Each
+    finished org is appended to `log`; orgs in `resumed_orgs` (recovered
+    from a crashed run's log) are taken as-is. `browser=None` crawls over
+    plain HTTP only; with SCRAPER_RECORD_DIR set, every page fetched is
+    saved for offline replay. Returns the site's orgs, or None if the crawl
+    crashed before finishing.
+    """
     context = None
-    page = None
+    fetcher = None
+    budget = budget or CrawlBudget(requests=0, seconds=0)
     try:
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={'width': 1366, 'height': 768}
-        )
-        page = await context.new_page()
-        await page.route("**/*.{png,jpg,jpeg,gif,css,woff,woff2,mp4,webm}", lambda route: route.abort())
+        if browser is not None:
+            context = await browser.new_context(
+                user_agent=USER_AGENT,
+                viewport={'width': 1366, 'height': 768}
+            )
+        fetcher = SiteFetcher(context, site['base_url'], recorder=PageRecorder(RECORD_DIR, site) if RECORD_DIR else None)
         
-        logging.info(f"🌐 [{scrape_status['sites_completed']+1}/8] {site['name']} - Fetching orgs...")
+        logging.info(f"🌐 {site['name']} - Fetching orgs...")
         scrape_status["current_site"] = site["name"]
         
-        await page.goto(site['org_url'], wait_until="domcontentloaded", timeout=45000)
-        await page.wait_for_load_state("networkidle", timeout=15000)
+        # The org list is always fetched - it's what tells us which orgs still exist
+        html = await fetcher.fetch(site['org_url'], expect=LIST_TABLE, timeout=45000)
         
-        soup = BeautifulSoup(await page.content(), "html.parser")
-        org_rows = soup.select("table#table tbody tr[id^='informal']")[:MAX_ORGS_PER_SITE]
+        org_rows = await parse_off_loop(parse_org_rows, html)
         total_orgs = len(org_rows)
-        logging.info(f"📍 {site['name']}: Found {total_orgs} orgs (max {MAX_ORGS_PER_SITE})")
-
-        site_data = []
-        for idx, row in enumerate(org_rows, 1):
-            try:
-                cols = row.find_all("td")
-                if len(cols) < 3: continue
-                
-                org_name = cols[1].text.strip()[:60]
-                scrape_status["current_org"] = org_name
-                a_tag = cols[2].find("a")
-                if not a_tag or not a_tag.get("href"): continue
-                
-                org_link = site['base_url'] + a_tag["href"]
-                scrape_status["orgs_scraped"] += 1
-                
-                logging.info(f"  [{scrape_status['sites_completed']+1}/8][{idx}/{total_orgs}] {org_name}")
-                
-                # Go to org page
-                await page.goto(org_link, wait_until="domcontentloaded", timeout=30000)
-                await asyncio.sleep(2)
-                
-                html = await page.content()
-                tenders = _parse_tender_data(html, site['base_url'])
-                
-                # ✅ EXACTLY 2 TENDERS PER ORG
-                if tenders:
-                    logging.info(f"    📋 Found {len(tenders)} tenders → Taking first 2")
-                    valid_tasks = []
-                    for i, t in enumerate(tenders[:MAX_TENDERS_PER_ORG]):
-                        if t["title_link"]:
-                            valid_tasks.append(scrape_single_tender(context, t["title_link"]))
-                    
-                    if valid_tasks:
-                        details_list = await asyncio.gather(*valid_tasks, return_exceptions=True)
-                        for i, details in enumerate(details_list):
-                            tenders[i]["details"] = details
-                    
-                    site_data.append({
-                        "organisation": org_name, 
-                        "tenders": tenders[:MAX_TENDERS_PER_ORG],
-                        "total_tenders_found": len(tenders)
-                    })
-                
-                # ✅ SAVE PROGRESS AFTER EVERY ORG
-                progress_data = [{"site": site["name"], "total_orgs": idx, "data": site_data}]
-                save_data(progress_data)
-                
-                await asyncio.sleep(random.uniform(2, 4))  # Rate limiting
-                
-            except asyncio.TimeoutError:
-                logging.error(f"  ⏰ TIMEOUT: {org_name}")
-                continue
-            except Exception as e:
-                logging.error(f"  ⚠️ ERROR {org_name}: {str(e)[:60]}")
+        logging.info(f"📍 {site['name']}: Found {total_orgs} orgs")
+
+        org_frontier = Frontier()
+        detail_frontier = Frontier()
+        paging = asyncio.Lock()  # NIC keeps a table's pager in the session - one org's pages at a time
+        crawl = SiteCrawl(site, fingerprints, log, previous)
+        resumed_orgs = resumed_orgs or {}
+        org_stats = fingerprints.org_stats(site["name"]) if fingerprints else {}
+
+        for idx, (org_name, href) in enumerate(org_rows, 1):
+            if org_name in resumed_orgs:
+                crawl.resume(idx, resumed_orgs[org_name])
                 continue
+            if not href: continue
+            org_frontier.put(org_priority(org_stats.get(org_name)), (idx, org_name, site['base_url'] + href))
+        if resumed_orgs:
+            logging.info(f"♻️ {site['name']}: resumed {len(crawl.done)} orgs from the log")
+
+        async def org_worker():
+            while True:
+                item = await org_frontier.get()
+                if item is None: break
+                idx, org_name, org_link = item
+                scrape_status["current_org"] = org_name
+                if budget.exhausted:
+                    crawled, complete, cut = [], False, True
+                else:
+                    scrape_status["orgs_scraped"] += 1
+                    logging.info(f"  [{site['name']}][{idx}/{total_orgs}] {org_name}")
+                    try:
+                        async with paging:
+                            crawled, complete, cut = await crawl_org_listing(fetcher, org_link, site['base_url'], budget)
+                    except Exception as e:
+                        logging.error(f"  ⚠️ ERROR {org_name}: {str(e)[:60]}")
+                        crawled, complete, cut = [], False, False
+                for tender, stale in crawl.listed(idx, org_name, crawled, complete, cut):
+                    detail_frontier.put(detail_priority(tender), (idx, tender, stale))
+
+        async def detail_worker():
+            while True:
+                item = await detail_frontier.get()
+                if item is None: break
+                idx, tender, stale = item
+                details = await scrape_single_tender(fetcher, tender["title_link"], budget)
+                crawl.detailed(idx, tender, details, stale)
 
+        org_workers = [asyncio.create_task(org_worker()) for _ in range(ORG_WORKERS_PER_SITE)]
+        detail_workers = [asyncio.create_task(detail_worker()) for _ in range(DETAIL_WORKERS_PER_SITE)]
+        org_frontier.close(len(org_workers))
+        await asyncio.gather(*org_workers)
+        detail_frontier.close(len(detail_workers))
+        await asyncio.gather(*detail_workers)
+
+        site_data = crawl.data()
         scrape_status["sites_completed"] += 1
         logging.info(f"✅ {site['name']} COMPLETE: {len(site_data)} orgs")
         return site_data
         
     except Exception as e:
         logging.error(f"❌ Site {site['name']} CRASHED: {e}")
-        return []
+        return None
     finally:
-        if page: await page.close()
+        if fetcher:
+            # Peak browser memory, sampled while this site's pages are still open
+            rss = chromium_rss_mb()
+            if rss is not None:
+                scrape_status["browser_rss_mb"] = max(scrape_status["browser_rss_mb"] or 0, rss)
+            scrape_status["fetch_report"][site["name"]] = fetcher.report.summary(fetcher.pages.stats)
+            logging.info(f"📶 {site['name']} fetch paths: {scrape_status['fetch_report'][site['name']]}")
+            await fetcher.close()
         if context: await context.close()
 
 # --- MAIN EXECUTION - ALL 8 SITES! ---
-async def run_full_scraper():
-    global scrape_status
+async def run_site(site: Dict, browser, site_slots: asyncio.Semaphore, fingerprints: FingerprintStore,
+                   log: ScrapeLog, resumed: Dict, budget: CrawlBudget, previous: Dict):
+    """Scrape one site once a site slot is free; record it when done.
+    Returns False if the crawl crashed: the site isn't marked done in the
+    log, so a resumed run crawls it again on top of the orgs it logged."""
+    if resumed.get("done"):
+        resume_finished_site(site["name"], resumed, fingerprints)
+        return True
+    async with site_slots:
+        scrape_status["active_sites"].append(site["name"])
+        logging.info(f"🚀 STARTING {site['name']}...")
+        try:
+            data = await process_site(site, browser, fingerprints, log, resumed.get("orgs"), budget, previous)
+        finally:
+            scrape_status["active_sites"].remove(site["name"])
+        site_results[site["name"]] = data or []
+        if data is not None:
+            log.site_done(site["name"])
+    
+    # ✅ COMPACT THE SNAPSHOT AFTER EACH SITE FINISHES - off the event loop
+    await asyncio.get_running_loop().run_in_executor(save_executor, save_data, collected_data())
+    if data is None:
+        logging.info(f"💾 PROGRESS SAVED: {site['name']} failed, left for the next run to resume")
+        return False
+    logging.info(f"💾 PROGRESS SAVED: {site['name']} done ({scrape_status['sites_completed']}/{len(TENDER_SITES)} sites)")
+    return True
+
+def start_run():
+    """Fresh status and the state one run carries: (fingerprints, budget, previous catalog, log, resumed sites)"""
     scrape_status["status"] = "Running"
     scrape_status["orgs_scraped"] = 0
     scrape_status["sites_completed"] = 0
+    scrape_status["fetch_report"] = {}
+    scrape_status["browser_rss_mb"] = None
+    site_results.clear()
+    fingerprints = FingerprintStore(FINGERPRINT_DB)
+    budget = CrawlBudget()
+    previous = load_previous_catalog()
+    log = ScrapeLog(SCRAPE_LOG)
+    resumed = log.recover()
+    if resumed is not None:
+        logging.info(f"♻️ Resuming unfinished run: {sum(len(s['orgs']) for s in resumed.values())} orgs in the log")
+    log.open(resume=resumed is not None)
+    return fingerprints, budget, previous, log, resumed or {}
+
+def finish_run(fingerprints: FingerprintStore, budget: CrawlBudget, log: ScrapeLog, completed: bool):
+    """Save the catalog and delta, close the log (marked done only if every site finished)"""
+    scrape_status["status"] = "Completed"
+    scrape_status["budget"] = budget.summary()
+    logging.info(f"💰 CRAWL BUDGET {scrape_status['budget']}")
+    scrape_status["last_run"] = datetime.now().isoformat()
+    save_data(collected_data())
+    if completed:
+        log.run_done()
+    log.close()
+    save_delta(fingerprints.finish([name for name, data in site_results.items() if data]))
+    fingerprints.close()
+
+async def run_full_scraper():
+    throttle.reset()
+    fingerprints, budget, previous, log, resumed = start_run()
+    completed = False
     
     try:
         async with async_playwright() as p:
@@ -234,42 +448,40 @@ async def run_full_scraper():
                 headless=True, 
                 args=['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage']
             )
-            all_final_data = []
-
-            # ✅ SCRAPE ALL 8 WEBSITES!
-            for i, site in enumerate(TENDER_SITES, 1):
-                logging.info(f"\n{'='*80}")
-                logging.info(f"🚀 [{i}/8] STARTING {site['name']}...")
-                logging.info(f"{'='*80}")
-                
-                data = await process_site(site, browser)
-                all_final_data.append({
-                    "site": site["name"], 
-                    "total_orgs": len(data), 
-                    "data": data
-                })
-                
-                # ✅ FINAL SAVE AFTER EACH SITE
-                save_data(all_final_data)
-                logging.info(f"💾 PROGRESS SAVED: {i}/8 sites complete")
-                
-                await asyncio.sleep(5)  # Rest between sites
+
+            # ✅ SCRAPE ALL 8 WEBSITES AT ONCE - each in its own context,
+            # sharing the global page budget and per-host limits in `throttle`
+            site_slots = asyncio.Semaphore(MAX_CONCURRENT_SITES)
+            finished = await asyncio.gather(*(
+                run_site(site, browser, site_slots, fingerprints, log, resumed.get(site["name"], {}),
+                         budget, previous.get(site["name"], {}))
+                for site in TENDER_SITES
+            ))
+            completed = all(finished)
             
             await browser.close()
             
     except Exception as e:
         logging.error(f"❌ SCRAPER FAILED: {e}")
     finally:
-        scrape_status["status"] = "Completed"
-        scrape_status["last_run"] = datetime.now().isoformat()
-        save_data(all_final_data)
+        shutdown_pool()
+        finish_run(fingerprints, budget, log, completed)
+
+def save_delta(delta):
+    """Write what this run added/changed/removed next to the full catalog."""
+    scrape_status["delta"] = {kind: len(keys) for kind, keys in delta.items()}
+    try:
+        atomic_write_json(DELTA_FILE, {"run_at": scrape_status["last_run"], **delta})
+        logging.info(f"🔁 DELTA {scrape_status['delta']} → {DELTA_FILE}")
+    except Exception as e:
+        logging.error(f"❌ Delta save error: {e}")
 
 if __name__ == "__main__":
     print("🚀" + "="*80)
     print("🏛️  PRO TENDER SCRAPER - ALL 8 WEBSITES!")
     print(f"📁 Output: scrapers/tenders_all3.json")
-    print("✅ 2 TENDERS per ORG | 20 ORGS per SITE | ALL 8 SITES")
-    print("⏱️  Expected time: 30-60 minutes")
+    print("✅ ALL ORGS & LISTING PAGES | priority frontier | per-run request/time budget | ALL 8 SITES")
+    print("⏱️  Sites run concurrently - time ≈ the slowest portal")
     print("🚀" + "="*80)
     
     try:
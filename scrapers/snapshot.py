@@ -0,0 +1,134 @@
+import mmap
+import os
+import struct
+import tempfile
+
+MAGIC = b'TNDRSNP1'
+HEADER = struct.Struct('<8sI')          # magic, section count
+SECTION = struct.Struct('<16sQQ')      # name, offset, length
+ALIGN = 8
+NONE_ID = 0xFFFFFFFF                    # String id standing for None
+
+
+def write_sections(path, sections):
+    """Write {name: bytes} as one snapshot file, atomically.
+
+    Layout: header, section table, then each section 8-byte aligned, so
+    fixed-width arrays can be read in place from the mapping.
+    """
+    names = list(sections)
+    offset = HEADER.size + SECTION.size * len(names)
+    table = []
+    for name in names:
+        offset += -offset % ALIGN
+        table.append((name.encode('ascii'), offset, len(sections[name])))
+        offset += len(sections[name])
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.snap', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(names)))
+            for entry in table:
+                f.write(SECTION.pack(*entry))
+            for (_, start, _), name in zip(table, names):
+                f.write(b'\0' * (start - f.tell()))
+                f.write(sections[name])
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class MappedFile:
+    """A snapshot file mapped read-only; `sections` are zero-copy memoryviews.
+
+    Every worker mapping the same file shares its pages through the OS page
+    cache. The file is only ever replaced by rename, so a mapping stays
+    valid (on the old inode) until the last reference to it goes away.
+    Raises ValueError if the file isn't a complete snapshot.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f'{path}: truncated snapshot')
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, count = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: not a tender snapshot')
+        self.sections = {}
+        for i in range(count):
+            name, offset, length = SECTION.unpack_from(view, HEADER.size + i * SECTION.size)
+            if offset + length > size:
+                raise ValueError(f'{path}: truncated snapshot')
+            self.sections[name.rstrip(b'\0').decode('ascii')] = view[offset:offset + length]
+
+    def __getitem__(self, name):
+        return self.sections[name]
+
+
+class StringTable:
+    """Interns strings to ids while writing; `encode()` gives the section"""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, value):
+        if value is None:
+            return NONE_ID
+        value = str(value)
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return sid
+
+    def encode(self):
+        blobs = [s.encode('utf-8') for s in self.strings]
+        offsets = [0]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        return struct.pack(f'<{len(offsets) + 1}Q', len(blobs), *offsets) + b''.join(blobs)
+
+
+class StringTableView:
+    """Read side of a StringTable section; strings are decoded on access.
+    (The offset array is read in place, so this assumes a little-endian host.)"""
+
+    def __init__(self, section):
+        self.count = struct.unpack_from('<Q', section)[0]
+        end = 8 * (self.count + 2)
+        self.offsets = section[8:end].cast('Q')
+        self.blob = section[end:]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, sid):
+        if sid == NONE_ID:
+            return None
+        return str(self.blob[self.offsets[sid]:self.offsets[sid + 1]], 'utf-8')
+
+
+class RecordView:
+    """Fixed-width records of `record` (a struct.Struct) read in place"""
+
+    def __init__(self, section, record):
+        self.section = section
+        self.record = record
+        self.count = len(section) // record.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.record.unpack_from(self.section, index * self.record.size)
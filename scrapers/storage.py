@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+
+def atomic_write_json(path, data):
+    """Write `data` to `path` so readers see either the old file or the new
+    one, never a torn write: temp file in the same dir, fsync, rename."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    if hasattr(os, "O_DIRECTORY"):  # Make the rename itself durable
+        dir_fd = os.open(directory, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class ScrapeLog:
+    """Append-only NDJSON write-ahead log of one scrape run.
+
+    Every finished org is one appended, fsynced line, so progress costs
+    O(org) instead of rewriting the whole catalog. If the process dies,
+    `recover()` replays the log and the next run picks up where this one
+    stopped. Record types:
+
+        {"type": "run", "started": ...}
+        {"type": "org", "site": ..., "org": {...}}
+        {"type": "site_done", "site": ...}
+        {"type": "run_done"}
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def recover(self):
+        """Orgs and finished sites of an unfinished run, or None.
+
+        Returns {site name: {"orgs": {org name: org}, "done": bool}}.
+        A torn last line (crash mid-append) is ignored.
+        """
+        if not os.path.exists(self.path):
+            return None
+        sites = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                kind = record.get("type")
+                if kind == "run":
+                    sites = {}
+                elif sites is None:
+                    continue
+                elif kind == "org":
+                    site = sites.setdefault(record["site"], {"orgs": {}, "done": False})
+                    site["orgs"][record["org"]["organisation"]] = record["org"]
+                elif kind == "site_done":
+                    sites.setdefault(record["site"], {"orgs": {}, "done": False})["done"] = True
+                elif kind == "run_done":
+                    sites = None
+        return sites
+
+    def open(self, resume=False):
+        """Start appending; a fresh run truncates the previous log."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if not resume:
+            self._append({"type": "run", "started": time.time()})
+        return self
+
+    def _append(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def org(self, site_name, org):
+        self._append({"type": "org", "site": site_name, "org": org})
+
+    def site_done(self, site_name):
+        self._append({"type": "site_done", "site": site_name})
+
+    def run_done(self):
+        self._append({"type": "run_done"})
+
+    def close(self):
+        if self._file:
+            try:
+                self._file.close()
+            except OSError as e:
+                logging.error(f"❌ Log close error: {e}")
+            self._file = None
+
+
+def site_slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def page_path(url):
+    """What a recorded page is keyed by: path + query, host dropped"""
+    parts = urlsplit(url)
+    return parts.path + ("?" + parts.query if parts.query else "")
+
+
+class PageRecorder:
+    """Saves every page one portal served during a run, for offline replay
+    (`python -m scrapers.replay`). Layout under `root`:
+
+        <site slug>/site.json         {"name", "org_url", "base_url"}
+        <site slug>/index.ndjson      {"path": ..., "file": ...} per fetch
+        <site slug>/pages/<sha1>.html
+
+    Recording into the same directory again adds to it; a page fetched more
+    than once keeps its latest copy.
+    """
+
+    def __init__(self, root, site):
+        self.dir = os.path.join(root, site_slug(site["name"]))
+        os.makedirs(os.path.join(self.dir, "pages"), exist_ok=True)
+        atomic_write_json(os.path.join(self.dir, "site.json"),
+                          {key: site[key] for key in ("name", "org_url", "base_url")})
+        self._index = open(os.path.join(self.dir, "index.ndjson"), "a", encoding="utf-8")
+        self.saved = 0
+
+    def save(self, url, html):
+        path = page_path(url)
+        name = hashlib.sha1(path.encode("utf-8")).hexdigest() + ".html"
+        with open(os.path.join(self.dir, "pages", name), "w", encoding="utf-8") as f:
+            f.write(html)
+        self._index.write(json.dumps({"path": path, "file": name}) + "\n")
+        self._index.flush()
+        self.saved += 1
+
+    def close(self):
+        self._index.close()
+
+
+def load_recording(site_dir):
+    """(site.json dict, {path: HTML file}) of one recorded site"""
+    with open(os.path.join(site_dir, "site.json"), "r", encoding="utf-8") as f:
+        site = json.load(f)
+    pages = {}
+    with open(os.path.join(site_dir, "index.ndjson"), "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # Torn last line of an interrupted recording
+            pages[entry["path"]] = os.path.join(site_dir, "pages", entry["file"])
+    return site, pages
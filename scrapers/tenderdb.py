@@ -0,0 +1,383 @@
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import zlib
+from contextlib import contextmanager
+
+from scrapers.config import TENDER_DB, TENDER_DB_POOL
+from search import MAX_LIMIT, SORT_FIELDS, normalized, tokenize
+
+SCHEMA = """
+CREATE TABLE portals (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE organisations (
+    id INTEGER PRIMARY KEY,
+    portal_id INTEGER NOT NULL REFERENCES portals(id),
+    name TEXT NOT NULL,
+    total_tenders_found INTEGER
+);
+CREATE TABLE tenders (
+    id INTEGER PRIMARY KEY,
+    portal_id INTEGER NOT NULL REFERENCES portals(id),
+    org_id INTEGER NOT NULL REFERENCES organisations(id),
+    s_no INTEGER,
+    published_date TEXT,
+    closing_date TEXT,
+    published_ts REAL,
+    closing_ts REAL,
+    opening_ts REAL,
+    title_link TEXT,
+    title_and_ref TEXT,
+    tender_id TEXT,
+    tender_type TEXT,
+    category TEXT,
+    value REAL,
+    emd REAL,
+    fee REAL,
+    details BLOB,
+    extra TEXT
+);
+CREATE INDEX tenders_portal ON tenders(portal_id);
+CREATE INDEX tenders_org ON tenders(org_id);
+CREATE INDEX tenders_closing ON tenders(closing_ts);
+CREATE INDEX tenders_published ON tenders(published_ts);
+CREATE INDEX tenders_type ON tenders(tender_type);
+CREATE INDEX tenders_category ON tenders(category);
+CREATE INDEX tenders_value ON tenders(value);
+CREATE VIRTUAL TABLE tenders_fts USING fts5(
+    title, tender_id, organisation, category, location, tender_type,
+    content=''
+);
+"""
+
+# Columns of a tender dict that get their own column; anything else is kept in `extra`.
+# `details` (most of the bytes, only read for the rows of a page) is zlib-compressed JSON.
+# The typed columns (*_ts, tender_id, tender_type, category, value, emd, fee) come from
+# the tender's `normalized` block, which itself rides along in `extra`.
+TENDER_COLUMNS = ('s_no', 'published_date', 'closing_date', 'title_link', 'title_and_ref', 'details')
+# The FTS columns hold the tokens TenderIndex indexes (search.tokenize), so
+# both backends match the same tenders for the same query
+TEXT_COLUMNS = '{title tender_id organisation}'
+
+# Sort and page over narrow rows first, then fetch the wide ones for that page only
+PAGE_SELECT = """
+WITH page AS (SELECT t.id FROM tenders t {where} ORDER BY {order} LIMIT ? OFFSET ?)
+SELECT p.name, o.name, t.s_no, t.published_date, t.closing_date, t.title_link, t.title_and_ref,
+       t.details, t.extra
+FROM page JOIN tenders t ON t.id = page.id
+JOIN organisations o ON o.id = t.org_id JOIN portals p ON p.id = t.portal_id
+ORDER BY {order}
+"""
+
+
+def _terms(*parts):
+    return ' '.join(token for part in parts for token in tokenize(part))
+
+
+def _fts_row(org_name, tender, fields, sections):
+    return (
+        _terms(tender.get('title_and_ref')),
+        _terms(fields['tender_id']),
+        _terms(org_name),
+        _terms(fields['category'], fields['product_category'], fields['sub_category'], fields['title']),
+        _terms(org_name, fields['location'], fields['pincode']),
+        _terms(fields['tender_type'], (sections.get('basic_details') or {}).get('Tender Type')),
+    )
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def write_db(path, data):
+    """Rebuild the tender database from the nested catalog and swap it in.
+
+    The new file is built next to the old one and renamed over it, so API
+    processes reading the old file never see a half-written database.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.db', dir=directory)
+    os.close(fd)
+    try:
+        db = sqlite3.connect(tmp_path)
+        db.execute('PRAGMA journal_mode=OFF')
+        db.execute('PRAGMA synchronous=OFF')
+        db.executescript(SCHEMA)
+        tender_rows, fts_rows = [], []
+        for site in data:
+            portal_id = db.execute('INSERT INTO portals (name) VALUES (?)', (site.get('site'),)).lastrowid
+            for org in site.get('data', []):
+                org_name = org.get('organisation')
+                org_id = db.execute(
+                    'INSERT INTO organisations (portal_id, name, total_tenders_found) VALUES (?, ?, ?)',
+                    (portal_id, org_name, org.get('total_tenders_found')),
+                ).lastrowid
+                for tender in org.get('tenders', []):
+                    details = tender.get('details')
+                    sections = details if isinstance(details, dict) else {}
+                    fields = normalized(tender)
+                    extra = {k: v for k, v in tender.items() if k not in TENDER_COLUMNS}
+                    rowid = len(tender_rows) + 1
+                    tender_rows.append((
+                        rowid, portal_id, org_id, tender.get('s_no'),
+                        tender.get('published_date'), tender.get('closing_date'),
+                        fields['published_ts'], fields['closing_ts'], fields['opening_ts'],
+                        tender.get('title_link'), tender.get('title_and_ref'),
+                        fields['tender_id'], fields['tender_type'], fields['category'],
+                        fields['value'], fields['emd'], fields['fee'],
+                        _pack(details) if 'details' in tender else None,
+                        json.dumps(extra, ensure_ascii=False, separators=(',', ':')) if extra else None,
+                    ))
+                    fts_rows.append((rowid, *_fts_row(org_name, tender, fields, sections)))
+        db.executemany(f'INSERT INTO tenders VALUES ({",".join("?" * 19)})', tender_rows)
+        db.executemany('INSERT INTO tenders_fts (rowid, title, tender_id, organisation, category, location, '
+                       'tender_type) VALUES (?, ?, ?, ?, ?, ?, ?)', fts_rows)
+        db.execute("INSERT INTO tenders_fts (tenders_fts) VALUES ('optimize')")
+        db.commit()
+        db.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(tender_rows)
+
+
+def _match(column, text, prefix_last=False):
+    """FTS5 expression requiring every token of `text` in `column`"""
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    if prefix_last:
+        terms[-1] += '*'
+    return f'{column} : ({" AND ".join(terms)})'
+
+
+def _row(record):
+    site, org, s_no, published, closing, link, title, details, extra = record
+    tender = {'site': site, 'organisation': org, 's_no': s_no, 'published_date': published,
+              'closing_date': closing, 'title_link': link, 'title_and_ref': title}
+    if details is not None:
+        tender['details'] = json.loads(zlib.decompress(details))
+    if extra:
+        tender.update(json.loads(extra))
+    return tender
+
+
+class TenderDB:
+    """Read side of the tender database, for the API processes.
+
+    Keeps up to `pool_size` read-only connections. The scraper replaces the
+    file wholesale, so a connection opened on an older file (different
+    inode/mtime) is dropped and reopened on checkout.
+    """
+
+    def __init__(self, path=TENDER_DB, pool_size=TENDER_DB_POOL):
+        self.path = path
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _stamp(self):
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_mtime_ns)
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def _open(self, stamp):
+        conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+        conn.execute('PRAGMA query_only=1')
+        return conn, stamp
+
+    @contextmanager
+    def connection(self):
+        """Borrow a read-only connection to the current file.
+
+        Raises FileNotFoundError if the database hasn't been built yet.
+        """
+        stamp = self._stamp()
+        try:
+            conn, conn_stamp = self._pool.get_nowait()
+            if conn_stamp != stamp:
+                conn.close()
+                conn, conn_stamp = self._open(stamp)
+        except queue.Empty:
+            conn, conn_stamp = self._open(stamp)
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait((conn, conn_stamp))
+            except queue.Full:
+                conn.close()
+
+    def stats(self):
+        with self.connection() as conn:
+            portals, orgs, tenders = conn.execute(
+                'SELECT (SELECT COUNT(*) FROM portals), (SELECT COUNT(*) FROM organisations), '
+                '(SELECT COUNT(*) FROM tenders)'
+            ).fetchone()
+        return {'total_portals': portals, 'total_orgs': orgs, 'total_tenders': tenders}
+
+    def search(self, q=None, category=None, location=None, tender_type=None,
+               min_value=None, max_value=None, closing_from=None, closing_to=None,
+               sort=None, page=1, limit=20):
+        """Return (total, tender rows) for one page of matches.
+
+        Same parameters, matches and ordering as `TenderIndex.search`; rows come back
+        flattened as {'site', 'organisation', **tender}.
+        """
+        where, params = [], []
+        matches = [_match(TEXT_COLUMNS, q, prefix_last=True) if q else None,
+                   _match('category', category) if category else None,
+                   _match('location', location) if location else None,
+                   _match('tender_type', tender_type) if tender_type else None]
+        given = [text for text in (q, category, location, tender_type) if text]
+        matches = [m for m in matches if m]
+        if len(matches) < len(given):
+            return 0, []  # A filter with no searchable tokens matches nothing
+        if matches:
+            where.append('t.id IN (SELECT rowid FROM tenders_fts WHERE tenders_fts MATCH ?)')
+            params.append(' AND '.join(matches))
+        for column, low, high in (('t.value', min_value, max_value), ('t.closing_ts', closing_from, closing_to)):
+            if low is not None:
+                where.append(f'{column} >= ?')
+                params.append(low)
+            if high is not None:
+                where.append(f'{column} <= ?')
+                params.append(high)
+        where_sql = f'WHERE {" AND ".join(where)}' if where else ''
+
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        offset = (max(1, int(page)) - 1) * limit
+        reverse = bool(sort) and sort.startswith('-')
+        field = sort.lstrip('-') if sort else None
+        if field in SORT_FIELDS:
+            column = {'closing': 't.closing_ts', 'published': 't.published_ts', 'value': 't.value'}[field]
+            # As in TenderIndex: ties in catalog order, tenders without a
+            # parsable key last (DESC already puts NULLs last)
+            order = f'{column} DESC, t.id' if reverse else f'{column} NULLS LAST, t.id'
+        else:
+            order = 't.id'
+
+        with self.connection() as conn:
+            total = conn.execute(f'SELECT COUNT(*) FROM tenders t {where_sql}', params).fetchone()[0]
+            records = conn.execute(PAGE_SELECT.format(where=where_sql, order=order),
+                                   (*params, limit, offset)).fetchall()
+        return total, [_row(record) for record in records]
+
+
+# --- BUILD / BENCHMARK ---
+# python -m scrapers.tenderdb build [tenders json] [db]
+#     Import an existing JSON catalog into the database.
+# python -m scrapers.tenderdb bench [scale ...]
+#     Replicate the current catalog 1x/10x/100x (default) and compare the
+#     in-memory JSON path with SQLite: load time, peak RSS, query latency.
+#     Each backend is measured in its own subprocess so RSS isn't shared.
+BENCH_QUERIES = [
+    {},
+    {'q': 'supply'},
+    {'q': 'construction of ro'},
+    {'category': 'works', 'sort': 'closing'},
+    {'location': 'delhi', 'sort': '-published'},
+    {'min_value': 1000000, 'sort': '-value'},
+    {'tender_type': 'open', 'closing_from': 0, 'page': 5},
+]
+
+def _scaled(data, scale):
+    """`data` repeated `scale` times, each copy with its own tender IDs"""
+    sites = [dict(site, data=[]) for site in data]
+    for copy in range(scale):
+        for site, scaled in zip(data, sites):
+            for org in site.get('data', []):
+                tenders = []
+                for tender in org.get('tenders', []):
+                    tender = dict(tender, title_and_ref=f"{tender.get('title_and_ref')}[copy_{copy}]")
+                    tenders.append(tender)
+                scaled['data'].append(dict(org, organisation=f"{org.get('organisation')} #{copy}", tenders=tenders))
+    return sites
+
+def _peak_rss_kb():
+    """Peak RSS of this process image (ru_maxrss would carry over the parent's across exec)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _measure(backend, path, repeats):
+    import statistics
+    import time
+
+    rss_before = _peak_rss_kb()
+    started = time.perf_counter()
+    if backend == 'json':
+        from catalog import TenderCatalog
+        snapshot = TenderCatalog(path).current()
+        rows = snapshot.view('pro').rows
+
+        def run(query):
+            total, positions = snapshot.index.search(**query)
+            return total, [rows[pos] for pos in positions]
+    else:
+        db = TenderDB(path)
+        db.stats()
+        run = lambda query: db.search(**query)
+    load = time.perf_counter() - started
+
+    latencies = []
+    for query in BENCH_QUERIES:
+        timings = []
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            run(query)
+            timings.append(time.perf_counter() - t0)
+        latencies.append(statistics.median(timings) * 1000)
+    peak = _peak_rss_kb()
+    return {'load_s': load, 'rss_mb': peak / 1024, 'rss_delta_mb': (peak - rss_before) / 1024, 'query_ms': latencies}
+
+if __name__ == '__main__':
+    import subprocess
+    import sys
+
+    from scrapers.storage import atomic_write_json
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'bench'
+    if command == 'build':
+        source = sys.argv[2] if len(sys.argv) > 2 else 'scrapers/tenders_all3.json'
+        target = sys.argv[3] if len(sys.argv) > 3 else TENDER_DB
+        with open(source, 'r', encoding='utf-8') as f:
+            print(f'{write_db(target, json.load(f))} tenders → {target}')
+    elif command == '_measure':
+        print(json.dumps(_measure(sys.argv[2], sys.argv[3], int(sys.argv[4]))))
+    elif command == 'bench':
+        scales = [int(arg) for arg in sys.argv[2:]] or [1, 10, 100]
+        with open('scrapers/tenders_all3.json', 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        workdir = tempfile.mkdtemp(prefix='tenderdb-bench-')
+        print(f'queries: {BENCH_QUERIES}')
+        for scale in scales:
+            data = _scaled(base, scale)
+            json_path, db_path = os.path.join(workdir, f'x{scale}.json'), os.path.join(workdir, f'x{scale}.db')
+            atomic_write_json(json_path, data)
+            count = write_db(db_path, data)
+            del data
+            print(f'\n{scale}x: {count} tenders  json {os.path.getsize(json_path) / 2**20:.1f} MB  '
+                  f'sqlite {os.path.getsize(db_path) / 2**20:.1f} MB')
+            for backend, path in (('json', json_path), ('sqlite', db_path)):
+                out = subprocess.run([sys.executable, '-m', 'scrapers.tenderdb', '_measure', backend, path, '20'],
+                                     capture_output=True, text=True, check=True).stdout
+                result = json.loads(out.strip().splitlines()[-1])
+                queries = ' '.join(f'{ms:7.2f}' for ms in result['query_ms'])
+                print(f'  {backend:6} load {result["load_s"]:6.2f}s  peak RSS {result["rss_mb"]:7.1f} MB '
+                      f'(+{result["rss_delta_mb"]:.1f})  query ms: {queries}')
+    else:
+        sys.exit(f'Unknown command {command!r} (build | bench)')
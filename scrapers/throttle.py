@@ -0,0 +1,164 @@
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from scrapers.config import (
+    HOST_INTERVAL_CEILING, HOST_INTERVAL_FLOOR, HOST_INTERVAL_STEP, HOST_MAX_CONCURRENCY,
+    HOST_MIN_INTERVAL, HOST_SLOW_RESPONSE, MAX_CONCURRENT_PAGES,
+)
+
+
+def adapt_interval(interval, ok, latency=None, floor=HOST_INTERVAL_FLOOR):
+    """Next gap between request starts on a host after one response (AIMD)"""
+    if not ok:
+        interval *= 2
+    elif latency is not None and latency > HOST_SLOW_RESPONSE:
+        interval *= 1.5
+    else:
+        interval -= HOST_INTERVAL_STEP
+    return min(HOST_INTERVAL_CEILING, max(floor, interval))
+
+
+class HostThrottle:
+    """Politeness for one portal host: a cap on in-flight requests plus a
+    minimum gap between request starts.
+
+    The gap adapts to how the host is coping (AIMD): every healthy response
+    shaves HOST_INTERVAL_STEP off it, while an error doubles it and a slow
+    response stretches it by half.
+    """
+
+    def __init__(self, min_interval=HOST_MIN_INTERVAL, concurrency=HOST_MAX_CONCURRENCY, floor=HOST_INTERVAL_FLOOR):
+        self.min_interval = min_interval
+        self.floor = floor
+        self._slots = asyncio.Semaphore(concurrency)
+        self._lock = asyncio.Lock()
+        self._next_start = 0.0
+
+    async def _wait_turn(self):
+        async with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def record(self, ok, latency=None):
+        """Feed back the outcome of one request to this host."""
+        self.min_interval = adapt_interval(self.min_interval, ok, latency, self.floor)
+
+    async def __aenter__(self):
+        await self._slots.acquire()
+        try:
+            await self._wait_turn()
+        except BaseException:
+            self._slots.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self._slots.release()
+
+
+class SharedHostThrottle:
+    """HostThrottle whose state lives in the work queue instead of this
+    process: the in-flight cap, the gap between starts and its adaptation
+    are shared by every worker (on every node) polling the same host, so
+    adding workers adds throughput only up to what the host is allowed.
+    """
+
+    def __init__(self, queue, host, owner, min_interval=HOST_MIN_INTERVAL, concurrency=HOST_MAX_CONCURRENCY,
+                 floor=HOST_INTERVAL_FLOOR):
+        self.queue = queue
+        self.host = host
+        self.owner = owner
+        self.min_interval = min_interval
+        self.concurrency = concurrency
+        self.floor = floor
+        self._slots = []
+
+    def record(self, ok, latency=None):
+        self.queue.adapt_host(self.host, lambda interval: adapt_interval(interval, ok, latency, self.floor))
+
+    async def __aenter__(self):
+        while True:
+            slot, wait = self.queue.acquire_host(self.host, self.owner, self.concurrency, self.min_interval)
+            if slot is not None:
+                break
+            await asyncio.sleep(wait)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                self.queue.release_host(slot)
+                raise
+        self._slots.append(slot)
+        return self
+
+    async def __aexit__(self, *exc):
+        # Slots are interchangeable - only how many are held counts
+        self.queue.release_host(self._slots.pop())
+
+
+class Throttle:
+    """Global page budget shared by every site, plus one HostThrottle per host.
+
+        async with throttle.slot(url):
+            await page.goto(url)
+    """
+
+    def __init__(self, max_pages=MAX_CONCURRENT_PAGES, host_interval=HOST_MIN_INTERVAL,
+                 host_concurrency=HOST_MAX_CONCURRENCY, host_floor=HOST_INTERVAL_FLOOR):
+        self.max_pages = max_pages
+        self.host_interval = host_interval
+        self.host_concurrency = host_concurrency
+        self.host_floor = host_floor
+        self.shared = None
+        self.reset()
+
+    def reset(self):
+        """Fresh budget and host state - asyncio primitives belong to one event loop."""
+        self.budget = asyncio.Semaphore(self.max_pages)
+        self.hosts = {}
+
+    def share(self, queue, owner):
+        """Keep per-host state in `queue` (a work queue) from now on, shared with other workers"""
+        self.shared = (queue, owner)
+        self.hosts = {}
+
+    def host(self, url):
+        netloc = urlsplit(url).netloc
+        if netloc not in self.hosts:
+            if self.shared is not None:
+                self.hosts[netloc] = SharedHostThrottle(*self.shared, netloc, self.host_interval,
+                                                        self.host_concurrency, self.host_floor)
+            else:
+                self.hosts[netloc] = HostThrottle(self.host_interval, self.host_concurrency, self.host_floor)
+        return self.hosts[netloc]
+
+    def slot(self, url):
+        return _Slot(self.budget, self.host(url))
+
+
+class _Slot:
+    def __init__(self, budget, host):
+        self.budget = budget
+        self.host = host
+
+    async def __aenter__(self):
+        # Take the host slot first so a slow host can't hog the global budget
+        await self.host.__aenter__()
+        try:
+            await self.budget.acquire()
+        except BaseException:
+            await self.host.__aexit__(None, None, None)
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.budget.release()
+        await self.host.__aexit__(*exc)
+
+
+# Shared by every site in the process
+throttle = Throttle()
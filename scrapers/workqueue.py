@@ -0,0 +1,249 @@
+import json
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+from scrapers.config import LEASE_SECONDS, MAX_ATTEMPTS, WORKER_SITES
+
+# Claim order: a site's org list unlocks its orgs, and details finish orgs
+# already started before new listings are opened
+STAGES = {"site": 0, "detail": 1, "org": 2}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    site TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    stage INTEGER NOT NULL,
+    rank1 REAL NOT NULL,
+    rank2 REAL NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    merged INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (kind, site, key)
+);
+CREATE INDEX IF NOT EXISTS items_claim ON items (state, stage, rank1, rank2);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    interval REAL NOT NULL,
+    next_start REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS site_leases (
+    site TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS host_slots (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class SQLiteWorkQueue:
+    """Durable crawl work shared by a coordinator and any number of worker
+    processes: one SQLite file in WAL mode, every state change one short
+    IMMEDIATE transaction.
+
+    Items go pending -> leased -> done | failed, or dropped when the
+    coordinator cancels what's left. A claim is a lease: the worker renews
+    it with `heartbeat()` while it works, and an item whose lease runs out
+    (the worker died or hung) is handed to the next claimant, up to
+    MAX_ATTEMPTS claims. Only the lease holder can complete or fail an
+    item, so a worker that lost its lease can't overwrite a retry.
+
+    Items have site affinity. GePNIC's `session=T` links only resolve under
+    the session cookie that produced them, so the worker that claims a
+    site's org list leases the whole site: that site's org and detail items
+    go to it alone, on the same session. The site lease is renewed by the
+    same heartbeat. If it runs out (the worker died), the next claimant
+    takes the site over and has to open a session of its own. A worker
+    holds at most WORKER_SITES sites at once, so sites spread over workers.
+
+    The same file holds the shared per-host politeness state (see
+    throttle.SharedHostThrottle). Another backend - for workers on
+    machines that can't share a SQLite file - implements these same
+    methods and registers its URL scheme in QUEUE_BACKENDS.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def _write(self, func):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            result = func()
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+        return result
+
+    # --- COORDINATOR SIDE ---
+    def reset(self):
+        """Start a new run: forget every item, host slot and pace, and the closed flag"""
+        def reset():
+            self.db.execute("DELETE FROM items")
+            self.db.execute("DELETE FROM hosts")
+            self.db.execute("DELETE FROM host_slots")
+            self.db.execute("DELETE FROM site_leases")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('closed', '0')")
+        self._write(reset)
+
+    def put(self, kind, site, key, payload, priority=(0.0, 0.0)):
+        """Queue one item; the id, or None if (kind, site, key) is already queued this run"""
+        cur = self.db.execute(
+            "INSERT OR IGNORE INTO items (kind, site, key, payload, stage, rank1, rank2) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (kind, site, key, json.dumps(payload, ensure_ascii=False), STAGES[kind], *priority),
+        )
+        return cur.lastrowid if cur.rowcount else None
+
+    def results(self):
+        """[(id, state, result or error)] of items finished since the last call"""
+        def take():
+            rows = self.db.execute(
+                "SELECT id, state, result, error FROM items WHERE merged = 0 AND state IN ('done', 'failed', 'dropped')"
+            ).fetchall()
+            self.db.executemany("UPDATE items SET merged = 1 WHERE id = ?", [(row[0],) for row in rows])
+            return rows
+        return [(item_id, state, json.loads(result) if result else error)
+                for item_id, state, result, error in self._write(take)]
+
+    def drop_pending(self):
+        """Cancel every item not yet claimed; returns how many"""
+        return self.db.execute("UPDATE items SET state = 'dropped' WHERE state = 'pending'").rowcount
+
+    def outstanding(self):
+        """Items pending or leased"""
+        return self.db.execute("SELECT COUNT(*) FROM items WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def counts(self):
+        return dict(self.db.execute("SELECT state, COUNT(*) FROM items GROUP BY state"))
+
+    def release_site(self, site):
+        """A site is finished: its worker may take on another"""
+        self.db.execute("DELETE FROM site_leases WHERE site = ?", (site,))
+
+    def close_run(self):
+        """Tell workers there will be no more work"""
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('closed', '1')")
+
+    # --- WORKER SIDE ---
+    def closed(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'closed'").fetchone()
+        return row is not None and row[0] == "1"
+
+    def claim(self, owner, lease=LEASE_SECONDS, max_sites=WORKER_SITES):
+        """Lease the highest-priority pending item of a site `owner` holds,
+        or of a free site while it holds fewer than `max_sites`:
+        (id, kind, payload), or None"""
+        def claim():
+            now = time.time()
+            self.db.execute(
+                "UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "owner = NULL, error = 'lease expired' WHERE state = 'leased' AND lease_expires < ?",
+                (MAX_ATTEMPTS, now),
+            )
+            self.db.execute("DELETE FROM site_leases WHERE expires < ?", (now,))
+            held = self.db.execute("SELECT COUNT(*) FROM site_leases WHERE owner = ?", (owner,)).fetchone()[0]
+            row = self.db.execute(
+                "SELECT id, kind, site, payload FROM items WHERE state = 'pending' AND ("
+                "site IN (SELECT site FROM site_leases WHERE owner = ?) "
+                "OR (? AND site NOT IN (SELECT site FROM site_leases))"
+                ") ORDER BY stage, rank1, rank2, id LIMIT 1",
+                (owner, held < max_sites),
+            ).fetchone()
+            if row is None:
+                return None
+            self.db.execute(
+                "UPDATE items SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (owner, now + lease, row[0]),
+            )
+            self.db.execute("INSERT OR REPLACE INTO site_leases VALUES (?, ?, ?)", (row[2], owner, now + lease))
+            return row[0], row[1], json.loads(row[3])
+        return self._write(claim)
+
+    def heartbeat(self, owner, lease=LEASE_SECONDS):
+        """Extend every lease (items, sites and host slots) `owner` holds"""
+        expires = time.time() + lease
+        def renew():
+            self.db.execute("UPDATE items SET lease_expires = ? WHERE owner = ? AND state = 'leased'", (expires, owner))
+            self.db.execute("UPDATE host_slots SET expires = ? WHERE owner = ?", (expires, owner))
+            self.db.execute("UPDATE site_leases SET expires = ? WHERE owner = ?", (expires, owner))
+        self._write(renew)
+
+    def complete(self, item_id, owner, result):
+        """False if the lease was lost (the item went to someone else)"""
+        return self.db.execute(
+            "UPDATE items SET state = 'done', result = ?, owner = NULL WHERE id = ? AND owner = ? AND state = 'leased'",
+            (json.dumps(result, ensure_ascii=False), item_id, owner),
+        ).rowcount == 1
+
+    def fail(self, item_id, owner, error):
+        """Give an item back for a retry, or fail it for good after MAX_ATTEMPTS"""
+        return self.db.execute(
+            "UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, owner = NULL, error = ? "
+            "WHERE id = ? AND owner = ? AND state = 'leased'",
+            (MAX_ATTEMPTS, str(error)[:200], item_id, owner),
+        ).rowcount == 1
+
+    # --- SHARED HOST POLITENESS ---
+    def acquire_host(self, host, owner, concurrency, interval, lease=LEASE_SECONDS):
+        """Reserve an in-flight slot on `host` and the next start time.
+
+        Returns (slot id, seconds to wait before starting), or (None, seconds
+        to wait before asking again) when `concurrency` slots are taken.
+        """
+        def acquire():
+            now = time.time()
+            self.db.execute("DELETE FROM host_slots WHERE expires < ?", (now,))
+            self.db.execute("INSERT OR IGNORE INTO hosts VALUES (?, ?, 0)", (host, interval))
+            current, next_start = self.db.execute(
+                "SELECT interval, next_start FROM hosts WHERE host = ?", (host,)).fetchone()
+            busy = self.db.execute("SELECT COUNT(*) FROM host_slots WHERE host = ?", (host,)).fetchone()[0]
+            if busy >= concurrency:
+                return None, max(0.05, min(current, 1.0))
+            start = max(now, next_start)
+            self.db.execute("UPDATE hosts SET next_start = ? WHERE host = ?", (start + current, host))
+            slot = self.db.execute(
+                "INSERT INTO host_slots (host, owner, expires) VALUES (?, ?, ?)", (host, owner, start + lease)).lastrowid
+            return slot, start - now
+        return self._write(acquire)
+
+    def release_host(self, slot):
+        self.db.execute("DELETE FROM host_slots WHERE id = ?", (slot,))
+
+    def adapt_host(self, host, adapt):
+        """Replace `host`'s gap between starts with `adapt(current gap)`"""
+        def update():
+            row = self.db.execute("SELECT interval FROM hosts WHERE host = ?", (host,)).fetchone()
+            if row is not None:
+                self.db.execute("UPDATE hosts SET interval = ? WHERE host = ?", (adapt(row[0]), host))
+        self._write(update)
+
+    def close(self):
+        self.db.close()
+
+
+QUEUE_BACKENDS = {"sqlite": SQLiteWorkQueue}
+
+
+def open_queue(url):
+    """Work queue for a URL: sqlite:///relative/path.db, sqlite:////absolute/path.db"""
+    parts = urlsplit(url)
+    backend = QUEUE_BACKENDS.get(parts.scheme)
+    if backend is None:
+        raise ValueError(f"No work queue backend for {url!r} (have: {', '.join(QUEUE_BACKENDS)})")
+    return backend(parts.path[1:] if parts.path.startswith("/") else parts.path)
@@ -0,0 +1,169 @@
+import re
+from bisect import bisect_left, bisect_right
+
+# Date and amount parsing live with the scraper's enrichment stage; they're
+# re-exported here for callers that parse raw strings themselves
+from scrapers.enrich import normalized, parse_amount, parse_tender_date
+
+__all__ = [
+    'MAX_LIMIT', 'SORT_FIELDS', 'TenderIndex', 'normalized', 'parse_amount', 'parse_tender_date', 'tokenize',
+]
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+SORT_FIELDS = ('closing', 'published', 'value')
+MAX_LIMIT = 200
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def _details(tender):
+    details = tender.get('details')
+    return details if isinstance(details, dict) else {}
+
+
+class TenderIndex:
+    """Precomputed lookup structures over a flattened list of tenders.
+
+    `rows` are {'site', 'organisation', **tender} in catalog order, and each
+    tender's position is its index there. Rows are only read while building,
+    so they can be decoded one at a time. Text filters are answered from
+    inverted indexes (token -> set of positions), date and value ranges by
+    bisecting sorted (key, position) lists, so a query only touches the
+    postings and ranges it needs instead of every tender.
+    """
+
+    def __init__(self, rows):
+        self.size = 0
+        self.text = {}
+        self.category = {}
+        self.location = {}
+        self.tender_type = {}
+        closing, published, value = [], [], []
+
+        for tender in rows:
+            pos = self.size
+            self.size += 1
+            fields = normalized(tender)
+            details = _details(tender)
+
+            self._add(self.text, pos, tender.get('title_and_ref'), tender.get('organisation'), fields['tender_id'])
+            self._add(self.category, pos, fields['category'], fields['product_category'],
+                      fields['sub_category'], fields['title'])
+            self._add(self.location, pos, tender.get('organisation'), fields['location'], fields['pincode'])
+            # Raw type too, so 'open tender' still matches alongside 'open' / 'eoi'
+            self._add(self.tender_type, pos, fields['tender_type'],
+                      (details.get('basic_details') or {}).get('Tender Type'))
+
+            for keys, field in ((closing, 'closing_ts'), (published, 'published_ts'), (value, 'value')):
+                if fields[field] is not None:
+                    keys.append((fields[field], pos))
+
+        self.sorted = {
+            'closing': sorted(closing),
+            'published': sorted(published),
+            'value': sorted(value),
+        }
+        # Descending by key, ties still in catalog order
+        self.descending = {field: sorted(keys, key=lambda item: -item[0]) for field, keys in self.sorted.items()}
+        self.ranks = {field: {pos: key for key, pos in keys} for field, keys in self.sorted.items()}
+        self.unkeyed = {field: [pos for pos in range(self.size) if pos not in rank]
+                        for field, rank in self.ranks.items()}
+        self.vocab = sorted(self.text)
+
+    @staticmethod
+    def _add(index, pos, *fields):
+        for field in fields:
+            for token in tokenize(field):
+                index.setdefault(token, set()).add(pos)
+
+    def _match_tokens(self, index, query, prefix_last=False):
+        tokens = tokenize(query)
+        if not tokens:
+            return set()  # Nothing searchable in the filter, so nothing matches it
+        result = None
+        for i, token in enumerate(tokens):
+            if prefix_last and i == len(tokens) - 1:
+                postings = self._prefix(token)
+            else:
+                postings = index.get(token, set())
+            result = postings if result is None else result & postings
+            if not result:
+                return set()
+        return result
+
+    def _prefix(self, token):
+        """Union of postings for every vocab word starting with `token`"""
+        start = bisect_left(self.vocab, token)
+        postings = set()
+        for word in self.vocab[start:]:
+            if not word.startswith(token):
+                break
+            postings |= self.text[word]
+        return postings
+
+    def _range(self, field, low=None, high=None):
+        keys = self.sorted[field]
+        lo = 0 if low is None else bisect_left(keys, (low, -1))
+        hi = len(keys) if high is None else bisect_right(keys, (high, self.size))
+        return {pos for _, pos in keys[lo:hi]}
+
+    def search(self, q=None, category=None, location=None, tender_type=None,
+               min_value=None, max_value=None, closing_from=None, closing_to=None,
+               sort=None, page=1, limit=20):
+        """Return (total, positions) for one page of matches.
+
+        Results are in catalog order, or by `sort` ('closing', '-value', ...)
+        with ties in catalog order and tenders without that key last.
+        """
+        candidates = []
+        if q:
+            candidates.append(self._match_tokens(self.text, q, prefix_last=True))
+        if category:
+            candidates.append(self._match_tokens(self.category, category))
+        if location:
+            candidates.append(self._match_tokens(self.location, location))
+        if tender_type:
+            candidates.append(self._match_tokens(self.tender_type, tender_type))
+        if min_value is not None or max_value is not None:
+            candidates.append(self._range('value', min_value, max_value))
+        if closing_from is not None or closing_to is not None:
+            candidates.append(self._range('closing', closing_from, closing_to))
+
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        offset = (max(1, int(page)) - 1) * limit
+        reverse = bool(sort) and sort.startswith('-')
+        field = sort.lstrip('-') if sort else None
+        if field not in SORT_FIELDS:
+            field, reverse = None, False
+
+        if not candidates:
+            # Unfiltered: page straight off the sorted index
+            if not field:
+                return self.size, list(range(offset, min(offset + limit, self.size)))
+            keys = (self.descending if reverse else self.sorted)[field]
+            window = keys[offset:offset + limit]
+            positions = [pos for _, pos in window]
+            if len(positions) < limit:
+                skip = max(0, offset - len(keys))
+                positions += self.unkeyed[field][skip:skip + limit - len(positions)]
+            return self.size, positions
+
+        candidates.sort(key=len)
+        matched = set(candidates[0])
+        for other in candidates[1:]:
+            matched &= other
+            if not matched:
+                break
+
+        if field:
+            rank = self.ranks[field]
+            # Stable sort of ascending positions: ties stay in catalog order either way
+            keyed = sorted(pos for pos in matched if pos in rank)
+            ordered = sorted(keyed, key=rank.__getitem__, reverse=reverse)
+            # Tenders without a parsable key go last
+            ordered += sorted(matched.difference(rank))
+        else:
+            ordered = sorted(matched)
+        return len(ordered), ordered[offset:offset + limit]
@@ -0,0 +1,45 @@
+"""Production entry point: python serve.py
+
+Runs asgi:app under uvicorn: the hot read endpoints are served natively
+async, everything else goes through the Flask app. Without uvicorn it falls
+back to Flask's threaded server (debug off). Equivalent under gunicorn:
+
+    gunicorn -k uvicorn.workers.UvicornWorker -w 1 -b 0.0.0.0:5000 asgi:app
+
+One worker by default: the user and favorites caches are per process and
+a write only invalidates its own worker's copy, so with more workers the
+others serve a stale plan or favorites list for up to the cache TTL.
+Raise WEB_CONCURRENCY only once that's acceptable.
+
+The hourly stats maintenance (subscription expiry, user recount) runs in
+one side process started here, never in the web workers. Under gunicorn,
+run it from cron instead: flask --app main stats-maintenance
+
+Environment: HOST (0.0.0.0), PORT (5000), WEB_CONCURRENCY (worker processes, 1).
+"""
+import logging
+import os
+import subprocess
+import sys
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', 5000))
+WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+if __name__ == '__main__':
+    maintenance = subprocess.Popen([sys.executable, '-m', 'flask', '--app', 'main', 'stats-maintenance', '--loop'])
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+
+    try:
+        if uvicorn is not None:
+            uvicorn.run('asgi:app', host=HOST, port=PORT, workers=WORKERS, proxy_headers=True,
+                        timeout_keep_alive=15, access_log=False)
+        else:
+            logging.warning("uvicorn not installed - falling back to Flask's threaded server")
+            from main import app
+            app.run(host=HOST, port=PORT, threaded=True, debug=False)
+    finally:
+        maintenance.terminate()
@@ -0,0 +1,30 @@
+"""Small tender catalogs for the web-side tests"""
+import json
+
+from catalog import TenderCatalog
+
+
+def raw_tender(tender_id, value="NA", tender_type="Open Tender", category="Works", location="Panaji",
+               closing="21-Mar-2026 09:00 AM", title="Road works"):
+    """A tender as scrapers wrote them before the enrichment stage: raw strings, no `normalized`"""
+    return {
+        "s_no": 1,
+        "published_date": "01-Mar-2026 10:00 AM",
+        "closing_date": closing,
+        "title_link": f"https://portal.example/app?tender={tender_id}",
+        "title_and_ref": f"[{title}][REF/{tender_id}][{tender_id}]",
+        "details": {
+            "basic_details": {"Tender ID": tender_id, "Tender Type": tender_type, "Tender Category": category},
+            "work_details": {"Title": title, "Tender Value in ₹": value, "Location": location},
+        },
+    }
+
+
+def catalog_data(tenders, site="Goa", organisation="PWD"):
+    return [{"site": site, "data": [{"organisation": organisation, "tenders": tenders}]}]
+
+
+def write_catalog(path, tenders):
+    """`tenders` saved as a JSON catalog at `path`; a TenderCatalog serving it"""
+    path.write_text(json.dumps(catalog_data(tenders)))
+    return TenderCatalog(str(path), snapshot_path=None)
@@ -0,0 +1,166 @@
+"""An in-process stand-in for the slice of the Firestore client that
+FavoritesStore uses: documents and subcollections, select/order_by/stream,
+write batches with create / delete(exists=True) / set(merge=True)
+preconditions and Increment / SERVER_TIMESTAMP transforms, and
+transactions in the shape `firestore.transactional` drives them.
+
+A batch commit is atomic and serialized, as on the server: every
+precondition is checked first, and one failure sinks the whole batch.
+"""
+import itertools
+import threading
+from types import SimpleNamespace
+
+from firebase_admin import firestore
+from google.api_core.exceptions import AlreadyExists, NotFound
+
+
+class FakeSnapshot:
+    def __init__(self, path, data):
+        self.reference_path = path
+        self.id = path.rsplit('/', 1)[-1]
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self.client, f'{self.path}/{name}')
+
+    def get(self, transaction=None):
+        with self.client.lock:
+            return FakeSnapshot(self.path, self.client.docs.get(self.path))
+
+
+class FakeCollection:
+    def __init__(self, client, path, order=None):
+        self.client = client
+        self.path = path
+        self.order = order
+
+    def document(self, doc_id):
+        return FakeDocument(self.client, f'{self.path}/{doc_id}')
+
+    def select(self, fields):
+        return self
+
+    def order_by(self, field):
+        return FakeCollection(self.client, self.path, order=field)
+
+    def stream(self, transaction=None):
+        prefix = self.path + '/'
+        with self.client.lock:
+            docs = [FakeSnapshot(path, data) for path, data in self.client.docs.items()
+                    if path.startswith(prefix) and '/' not in path[len(prefix):]]
+        if self.order:
+            docs.sort(key=lambda doc: doc.to_dict().get(self.order))
+        return iter(docs)
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def create(self, ref, data):
+        self.writes.append(('create', ref.path, data))
+
+    def delete(self, ref, option=None):
+        self.writes.append(('delete', ref.path, option))
+
+    def set(self, ref, data, merge=False):
+        self.writes.append(('set', ref.path, (data, merge)))
+
+    def commit(self):
+        client = self.client
+        with client.lock:
+            for op, path, arg in self.writes:
+                if op == 'create' and path in client.docs:
+                    raise AlreadyExists(f'Document already exists: {path}')
+                if op == 'delete' and arg is not None and arg.exists and path not in client.docs:
+                    raise NotFound(f'No document to update: {path}')
+            update_time = next(client.clock)
+            results = []
+            for op, path, arg in self.writes:
+                transforms = []
+                if op == 'delete':
+                    client.docs.pop(path, None)
+                elif op == 'create':
+                    client.docs[path] = client.resolve({}, arg, update_time, transforms)
+                else:
+                    data, merge = arg
+                    current = dict(client.docs.get(path) or {}) if merge else {}
+                    client.docs[path] = client.resolve(current, data, update_time, transforms)
+                results.append(SimpleNamespace(update_time=update_time, transform_results=transforms))
+            client.commits += 1
+            return results
+
+
+class FakeTransaction(FakeBatch):
+    """A batch with the hooks `firestore.transactional` calls; one attempt"""
+    _read_only = False
+    _max_attempts = 1
+
+    def __init__(self, client):
+        super().__init__(client)
+        self._id = None
+
+    def _clean_up(self):
+        self.writes = []
+
+    def _begin(self, retry_id=None):
+        self._id = next(self.client.clock)
+
+    def _commit(self):
+        return self.commit()
+
+    def _rollback(self):
+        self.writes = []
+
+
+class FakeFirestore:
+    """Documents keyed by path ('users/u1/favorites/T1') in one dict"""
+
+    def __init__(self):
+        self.docs = {}
+        self.lock = threading.Lock()
+        self.clock = itertools.count(1)
+        self.commits = 0
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def document(self, path):
+        return FakeDocument(self, path)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    def write_option(self, exists=None):
+        return SimpleNamespace(exists=exists)
+
+    @staticmethod
+    def resolve(current, data, update_time, transforms):
+        for field, value in data.items():
+            if isinstance(value, firestore.Increment):
+                current[field] = current.get(field, 0) + value.value
+                transforms.append(SimpleNamespace(integer_value=current[field]))
+            elif value is firestore.SERVER_TIMESTAMP:
+                current[field] = update_time
+            else:
+                current[field] = value
+        return current
@@ -0,0 +1,36 @@
+"""A recording of one small portal built from scrapers/fixtures, for
+ReplayPortal: an org list with three linked orgs, a two-page listing for
+the first and a one-page listing for the others, and a detail page per
+tender.
+"""
+from pathlib import Path
+
+from scrapers.parsing import parse_listing_page, parse_org_rows
+from scrapers.storage import PageRecorder
+
+FIXTURES = Path(__file__).resolve().parent.parent / "scrapers" / "fixtures"
+BASE_URL = "https://eprocure.goa.gov.in"
+SITE = {
+    "name": "Goa",
+    "org_url": f"{BASE_URL}/nicgep/app?page=FrontEndTendersByOrganisation&service=page",
+    "base_url": BASE_URL,
+}
+
+
+def fixture(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def record_fixture_portal(root):
+    """Record the portal under `root`; returns the site directory"""
+    recorder = PageRecorder(str(root), SITE)
+    org_list, first, last = fixture("org_list.html"), fixture("listing_page1.html"), fixture("listing_page2.html")
+    recorder.save(SITE["org_url"], org_list)
+    for n, (_, href) in enumerate(row for row in parse_org_rows(org_list) if row[1]):
+        recorder.save(BASE_URL + href, first if n == 0 else last)
+    rows, next_url = parse_listing_page(first, BASE_URL)
+    recorder.save(next_url, last)
+    for row in rows + parse_listing_page(last, BASE_URL)[0]:
+        recorder.save(row["title_link"], fixture("detail_works.html"))
+    recorder.close()
+    return recorder.dir
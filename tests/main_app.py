@@ -0,0 +1,27 @@
+"""main, imported once against in-process fakes: FakeFirestore for the
+Firestore client, no service-account credentials and no background
+refresh of Firebase's signing keys (tests set `token_cache.keys.certs`).
+"""
+from unittest import mock
+
+import firebase_admin
+from firebase_admin import firestore
+
+import tokens
+from tests.fake_firestore import FakeFirestore
+
+CLIENT = FakeFirestore()
+
+with mock.patch.dict(firebase_admin._apps, {'[DEFAULT]': None}), \
+        mock.patch.object(firestore, 'client', return_value=CLIENT), \
+        mock.patch.object(tokens.PublicKeyRefresher, 'start', lambda self: self):
+    import main
+
+
+def reset():
+    """Empty Firestore and every cache; a test client for the app"""
+    CLIENT.docs.clear()
+    main.user_cache.clear()
+    main.favorites_store.cache.clear()
+    main.token_cache.cache.clear()
+    return main.app.test_client()
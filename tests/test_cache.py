@@ -0,0 +1,78 @@
+import pytest
+
+from cache import TTLCache
+from favorites import COUNT_FIELD
+from tests.main_app import CLIENT, reset
+
+UID = "u1"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = TTLCache(maxsize=10, ttl=60, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=5)
+    clock.now += 5
+    assert cache.get("a") == 1 and cache.get("b") is None
+    clock.now += 55
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 2, "hit_rate": 0.3333}
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TTLCache(maxsize=2, ttl=60, clock=Clock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_get_or_load_loads_once_until_invalidated():
+    cache = TTLCache(maxsize=10, ttl=60, clock=Clock())
+    loads = []
+
+    def load(key):
+        loads.append(key)
+        return len(loads)
+    assert [cache.get_or_load("a", load) for _ in range(3)] == [1, 1, 1]
+    cache.invalidate("a")
+    assert cache.get_or_load("a", load) == 2 and loads == ["a", "a"]
+
+
+@pytest.fixture
+def client():
+    client = reset()
+    client.set_cookie("auth_token", f"demo_{UID}")
+    CLIENT.docs[f"users/{UID}"] = {"plan": "free"}
+    return client
+
+
+def test_user_doc_is_cached_between_requests(client):
+    assert client.get("/api/profile").get_json()["plan"] == "free"
+    CLIENT.docs[f"users/{UID}"] = {"plan": "pro"}  # Written behind the app's back: cached copy stands
+    assert client.get("/api/profile").get_json()["plan"] == "free"
+
+
+def test_profile_write_invalidates_the_cached_user(client):
+    client.get("/api/profile")
+    assert client.post("/api/profile", json={"company": "Acme"}).get_json() == {"success": True}
+    assert client.get("/api/profile").get_json()["company"] == "Acme"
+
+
+def test_favorite_writes_invalidate_the_cached_user(client):
+    client.get("/api/profile")
+    client.post("/api/favorites", json={"tender_id": "T1"})
+    assert client.get("/api/profile").get_json()[COUNT_FIELD] == 1
+    client.post("/api/favorites/batch", json={"add": ["T2", "T3"], "remove": ["T1"]})
+    assert client.get("/api/profile").get_json()[COUNT_FIELD] == 2
+    client.delete("/api/favorites", json={"tender_id": "T2"})
+    assert client.get("/api/profile").get_json()[COUNT_FIELD] == 1
@@ -0,0 +1,115 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import catalog as catalog_module
+from catalog import PRO_ONLY_FIELDS, TenderCatalog, write_snapshot
+from scrapers.tenderdb import TenderDB
+from tests.catalog_data import catalog_data, raw_tender, write_catalog
+from tests.main_app import main, reset
+
+
+def served_tenders(client):
+    return [tender for site in client.get("/api/tenders").get_json() for org in site["data"] for tender in org["tenders"]]
+
+
+def test_unenriched_catalog_is_served_with_typed_fields_the_filters_match(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "catalog", write_catalog(tmp_path / "tenders.json", [
+        raw_tender("T1", "Rs. 5,00,000", "Open Tender", "Works", "Panaji"),
+        raw_tender("T2", "NA", "Limited", "Goods", "Margao"),
+        raw_tender("T3", "25,00,000", "Open Tender", "Services", "Vasco, 403802"),
+    ]))
+    tenders = served_tenders(reset())
+
+    # The predicates of advancedFilterTenders in static/tenders.html, on the served `normalized` blocks
+    typed = {tender["normalized"]["tender_id"]: tender["normalized"] for tender in tenders}
+    assert [tid for tid, n in typed.items() if n["value"] is not None and 100000 <= n["value"] <= 1000000] == ["T1"]
+    assert [tid for tid, n in typed.items() if n["tender_type"] == "open"] == ["T1", "T3"]
+    assert [tid for tid, n in typed.items() if n["category"] == "goods"] == ["T2"]
+    assert [tid for tid, n in typed.items() if "403802" in (n["location"] or "") + (n["pincode"] or "")] == ["T3"]
+    assert all(n["closing_ts"] for n in typed.values())
+
+
+def test_catalog_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "tenders.json"
+    catalog = write_catalog(path, [raw_tender("T1")])
+    first = catalog.current()
+    assert catalog.current() is first and first.stats["total_tenders"] == 1
+
+    write_catalog(path, [raw_tender("T1"), raw_tender("T2")])  # New size
+    second = catalog.current()
+    assert second.version == first.version + 1 and second.stats["total_tenders"] == 2
+
+    write_catalog(path, [raw_tender("T1"), raw_tender("T3")])  # Same size, only the mtime moves
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    third = catalog.current()
+    assert third.version == second.version + 1 and third.find("T3") == 1
+
+
+def test_catalog_keeps_serving_through_a_half_written_file(tmp_path):
+    path = tmp_path / "tenders.json"
+    catalog = write_catalog(path, [raw_tender("T1")])
+    loaded = catalog.current()
+    path.write_text('[{"site": "Goa", "da')
+    assert catalog.current() is loaded
+    write_catalog(path, [raw_tender("T2")])
+    assert catalog.current().find("T2") == 0
+
+
+def pro_only_values(tender):
+    """The values at PRO_ONLY_FIELDS' paths that are present in `tender`"""
+    values = []
+    for path in PRO_ONLY_FIELDS:
+        node = tender
+        for key in path:
+            node = node.get(key) if isinstance(node, dict) else None
+        if node is not None:
+            values.append(node)
+    return values
+
+
+@pytest.mark.parametrize("source", ["json", "snapshot"])
+def test_free_view_drops_every_pro_only_field(tmp_path, source):
+    data = catalog_data([raw_tender("T1"), raw_tender("T2")])
+    json_path, snap_path = tmp_path / "tenders.json", tmp_path / "tenders.snap"
+    json_path.write_text(json.dumps(data))
+    if source == "snapshot":
+        write_snapshot(str(snap_path), catalog_data([raw_tender("T1"), raw_tender("T2")]))
+    snapshot = TenderCatalog(str(json_path), str(snap_path)).current()
+
+    for plan, expected in (("pro", [["T1", "T1"], ["T2", "T2"]]), ("free", [[], []])):
+        view = snapshot.view(plan)
+        body = [tender for site in json.loads(bytes(view.body)) for org in site["data"] for tender in org["tenders"]]
+        assert [pro_only_values(tender) for tender in body] == expected
+        assert [pro_only_values(view.rows[pos]) for pos in range(len(view.rows))] == expected
+        assert json.loads(gzip.decompress(bytes(view.encodings["gzip"]))) == json.loads(bytes(view.body))
+    if source == "json":
+        assert pro_only_values(snapshot.data[0]["data"][0]["tenders"][0]) == ["T1", "T1"]  # Redaction copies
+
+
+def test_mapped_snapshot_search_decodes_one_tender_at_a_time(tmp_path, monkeypatch):
+    tenders = [raw_tender("T1", "5,00,000"), raw_tender("T2", "NA", title="Bridge repair"),
+               raw_tender("T3", "25,00,000")]
+    json_path, snap_path = tmp_path / "tenders.json", tmp_path / "tenders.snap"
+    json_path.write_text(json.dumps(catalog_data(tenders)))
+    write_snapshot(str(snap_path), catalog_data(tenders))
+    monkeypatch.setattr(main, "tender_db", TenderDB(str(tmp_path / "missing.db")))
+    decoded = []
+    loads = json.loads
+    monkeypatch.setattr(catalog_module.json, "loads", lambda s, **kw: decoded.append(len(s)) or loads(s, **kw))
+
+    results = {}
+    for source, snapshot_path in (("json", None), ("snapshot", str(snap_path))):
+        monkeypatch.setattr(main, "catalog", TenderCatalog(str(json_path), snapshot_path))
+        client = reset()
+        decoded.clear()
+        response = client.get("/api/tenders/search?q=road&sort=-value")
+        searched = list(decoded)
+        results[source] = response.get_json()
+    assert results["snapshot"] == results["json"]
+    assert [row["normalized"]["tender_id"] for row in results["snapshot"]["results"]] == ["T3", "T1"]
+    body = main.catalog.current().view("pro").body
+    assert len(searched) > 3 and max(searched) < len(body) / 2  # Per-tender decodes, never the whole body
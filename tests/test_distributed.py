@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright.async_api")
+
+from scrapers import distributed, parsing, scraper
+from scrapers.fingerprints import FingerprintStore
+from scrapers.frontier import CrawlBudget
+from scrapers.replay import ReplayPortal, replayed_site
+from scrapers.storage import ScrapeLog
+from scrapers.throttle import throttle
+from scrapers.workqueue import SQLiteWorkQueue
+from tests.fixture_portal import record_fixture_portal
+
+SITE = {"name": "Goa", "org_url": "https://portal.example/app?page=orgs", "base_url": "https://portal.example"}
+
+
+def listing_row(tender_id, link):
+    return {
+        "title_and_ref": f"[Road works][REF/1][{tender_id}]",
+        "title_link": f"https://portal.example/app?tender={link}",
+        "published_date": "01-Mar-2026 10:00 AM",
+        "closing_date": "21-Mar-2099 09:00 AM",
+    }
+
+
+@pytest.fixture
+def coordinator(tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, "save_data", lambda data: None)
+    scraper.site_results.clear()
+    scraper.scrape_status["active_sites"] = []
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.db"))
+    queue.reset()
+    fingerprints = FingerprintStore(str(tmp_path / "fingerprints.db"))
+    log = ScrapeLog(str(tmp_path / "scrape_log.ndjson")).open()
+    yield distributed.Coordinator(queue, [SITE], fingerprints, log, {}, CrawlBudget(requests=0, seconds=0), {})
+    log.close()
+    fingerprints.close()
+    queue.close()
+    scraper.site_results.clear()
+
+
+def drain(coordinator, results):
+    """Play one worker: complete every claimable item with results[kind](payload), merging as we go"""
+    queue = coordinator.queue
+    for _ in range(1000):
+        if not coordinator.waiting:
+            return
+        claimed = queue.claim("worker-1")
+        if claimed is not None:
+            item_id, kind, payload = claimed
+            assert queue.complete(item_id, "worker-1", dict(results[kind](payload), pages=1))
+        for item_id, state, result in queue.results():
+            coordinator.merge(item_id, state, result)
+    pytest.fail(f"items still outstanding: {coordinator.waiting}")
+
+
+def test_duplicate_detail_link_does_not_hang_the_run(coordinator):
+    rows = [listing_row("T1", "shared"), listing_row("T2", "shared"), listing_row("T3", "own")]
+    coordinator.seed()
+    drain(coordinator, {
+        "site": lambda payload: {"orgs": [["Works Department", "/app?org=1"]], "session": "worker-1"},
+        "org": lambda payload: {"rows": [dict(row) for row in rows], "complete": True, "session": "worker-1"},
+        "detail": lambda payload: {"details": {"basic_details": {"url": payload["url"]}}},
+    })
+
+    assert None not in coordinator.waiting and coordinator.open == {"Goa": 0}
+    [org] = scraper.site_results["Goa"]
+    assert [("details" in tender) for tender in org["tenders"]] == [True, False, True]
+
+
+def test_a_sites_items_stay_with_the_worker_that_listed_its_orgs(coordinator):
+    queue = coordinator.queue
+    coordinator.seed()
+    item_id, kind, _ = queue.claim("worker-1")
+    queue.complete(item_id, "worker-1", {"orgs": [["Works", "/app?org=1"], ["Roads", "/app?org=2"]],
+                                         "session": "worker-1", "pages": 1})
+    for result in queue.results():
+        coordinator.merge(*result)
+
+    assert queue.claim("worker-2") is None
+    claimed = [queue.claim("worker-1") for _ in range(2)]
+    assert [(kind, payload["org"], payload["session"]) for _, kind, payload in claimed] == [
+        ("org", "Works", "worker-1"), ("org", "Roads", "worker-1")]
+
+    queue.release_site(SITE["name"])
+    queue.put("org", SITE["name"], "3", {"url": "/app?org=3"})
+    assert queue.claim("worker-2")[1] == "org"
+
+
+@pytest.fixture
+def replay_portal(tmp_path, coordinator):
+    """A session-bound mock portal; `coordinator` crawls it instead of SITE"""
+    site_dir = record_fixture_portal(tmp_path / "recording")
+    portal = ReplayPortal(site_dir, sessions=True).start()
+    coordinator.sites = [replayed_site(site_dir, portal.url)]
+    yield portal
+    portal.stop()
+
+
+def test_workers_crawl_a_session_bound_portal_without_stale_links(tmp_path, coordinator, replay_portal, monkeypatch):
+    monkeypatch.setattr(parsing, "PARSER_PROCESSES", 0)
+    monkeypatch.setattr(distributed, "QUEUE_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(throttle, "host_interval", 0.0)
+    monkeypatch.setattr(throttle, "host_floor", 0.0)
+    monkeypatch.setattr(throttle, "shared", None)
+    queue = coordinator.queue
+
+    async def run():
+        workers = [distributed.Worker(SQLiteWorkQueue(str(tmp_path / "queue.db")), name=f"worker-{n}", tasks=2) for n in (1, 2)]
+        running = [asyncio.create_task(worker.run()) for worker in workers]
+        coordinator.seed()
+        while coordinator.waiting:
+            for result in queue.results():
+                coordinator.merge(*result)
+            await asyncio.sleep(0.01)
+        queue.close_run()
+        await asyncio.gather(*running)
+        for worker in workers:
+            worker.queue.close()
+
+    asyncio.run(asyncio.wait_for(run(), 30))
+
+    assert replay_portal.stats["stale"] == 0
+    tenders = [tender for org in scraper.site_results["Goa"] for tender in org["tenders"]]
+    assert len(tenders) == 5
+    assert all(tender["details"].get("status") != "failed" for tender in tenders)
+
+
+def test_a_taken_over_site_relists_its_orgs_on_the_new_session(coordinator, replay_portal, monkeypatch):
+    monkeypatch.setattr(parsing, "PARSER_PROCESSES", 0)
+    monkeypatch.setattr(throttle, "host_interval", 0.0)
+    monkeypatch.setattr(throttle, "host_floor", 0.0)
+    [site] = coordinator.sites
+
+    async def run():
+        throttle.reset()
+        first, second = (distributed.Worker(coordinator.queue, name=name) for name in ("worker-1", "worker-2"))
+        listed = await first.handle("site", {"site": site})
+        org_name, href = listed["orgs"][0]
+        crawled = await second.handle("org", {"site": site, "url": site["base_url"] + href,
+                                               "org": org_name, "session": "worker-1"})
+        with pytest.raises(RuntimeError):
+            await second.handle("detail", {"site": site, "url": crawled["rows"][0]["title_link"], "session": "worker-1"})
+        for worker in (first, second):
+            for opening in worker._sites.values():
+                await opening.result()[0].close()
+        return crawled
+
+    crawled = asyncio.run(run())
+    assert crawled["session"] == "worker-2" and crawled["complete"] and len(crawled["rows"]) == 3
+    assert replay_portal.stats["stale"] == 0
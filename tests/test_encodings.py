@@ -0,0 +1,80 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from catalog import MappedCatalogSnapshot, write_snapshot
+from tests.catalog_data import catalog_data, raw_tender, write_catalog
+from tests.main_app import main, reset
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DECODE = {"identity": lambda body: body, "gzip": gzip.decompress}
+if brotli is not None:
+    DECODE["br"] = brotli.decompress
+CODINGS = ["identity", "gzip", pytest.param("br", marks=pytest.mark.skipif(brotli is None, reason="brotli not installed"))]
+
+
+@pytest.fixture(params=["json", "snapshot"])
+def client(request, tmp_path, monkeypatch):
+    """/api/tenders served from a two-tender catalog, parsed from JSON or mapped from a snapshot"""
+    catalog = write_catalog(tmp_path / "tenders.json", [raw_tender("T1", "5,00,000"), raw_tender("T2")])
+    if request.param == "snapshot":
+        catalog.snapshot_path = str(tmp_path / "tenders.snap")
+        write_snapshot(catalog.snapshot_path, catalog_data([raw_tender("T1", "5,00,000"), raw_tender("T2")]))
+    monkeypatch.setattr(main, "catalog", catalog)
+    assert isinstance(catalog.current(), MappedCatalogSnapshot) == (request.param == "snapshot")
+    return reset()
+
+
+def get(client, accept=None, etag=None):
+    headers = {"Accept-Encoding": accept} if accept else {}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get("/api/tenders", headers=headers)
+
+
+@pytest.mark.parametrize("coding", CODINGS)
+def test_precompressed_body_decodes_to_the_identity_body(client, coding):
+    identity = get(client)
+    response = get(client, accept=f"{coding}, identity;q=0.5")
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding", "identity") == coding
+    assert response.headers["Content-Length"] == str(len(response.data))
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert json.loads(DECODE[coding](response.data)) == json.loads(identity.data)
+    expected = identity.headers["ETag"].strip('"') + ("" if coding == "identity" else f"-{coding}")
+    assert response.headers["ETag"] == f'"{expected}"'
+
+
+def test_best_accepted_encoding_wins(client):
+    best = "br" if brotli is not None else "gzip"
+    assert get(client, accept="gzip, br, deflate").headers["Content-Encoding"] == best
+    assert get(client, accept="gzip;q=0, deflate").headers.get("Content-Encoding") is None
+
+
+@pytest.mark.parametrize("coding", CODINGS)
+def test_any_encodings_etag_gets_a_304(client, coding):
+    etags = {c: get(client, accept=c).headers["ETag"] for c in DECODE}
+    for etag in etags.values():
+        response = get(client, accept=coding, etag=etag)
+        assert response.status_code == 304 and response.data == b""
+        assert response.headers["ETag"] == etags[coding]
+    assert get(client, accept=coding, etag='"stale"').status_code == 200
+
+
+def test_changed_catalog_gets_a_new_etag(tmp_path, monkeypatch):
+    path = tmp_path / "tenders.json"
+    monkeypatch.setattr(main, "catalog", write_catalog(path, [raw_tender("T1")]))
+    client = reset()
+    old = get(client, accept="gzip").headers["ETag"]
+    write_catalog(path, [raw_tender("T1"), raw_tender("T2")])
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    response = get(client, accept="gzip", etag=old)
+    assert response.status_code == 200 and response.headers["ETag"] != old
+    assert len(json.loads(gzip.decompress(response.data))[0]["data"][0]["tenders"]) == 2
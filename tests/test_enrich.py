@@ -0,0 +1,19 @@
+import pytest
+
+from scrapers.enrich import parse_amount
+
+
+@pytest.mark.parametrize("value, amount", [
+    ("19,75,26,451", 197526451.0),
+    ("Rs. 1,000", 1000.0),
+    ("Rs.1,000.50", 1000.5),
+    ("rs 750/-", 750.0),
+    ("INR 25,000", 25000.0),
+    ("₹ 5,900", 5900.0),
+    ("₹5,900.00", 5900.0),
+    ("NA", None),
+    ("Rs.", None),
+    (None, None),
+])
+def test_parse_amount(value, amount):
+    assert parse_amount(value) == amount
@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from favorites import COUNT_FIELD, FavoritesStore
+from tests.fake_firestore import FakeFirestore
+
+UID = 'u1'
+
+
+@pytest.fixture
+def client():
+    return FakeFirestore()
+
+
+@pytest.fixture
+def store(client):
+    store = FavoritesStore(client)
+    yield store
+    store.pool.shutdown()
+
+
+def stored_count(client):
+    return client.docs.get(f'users/{UID}', {}).get(COUNT_FIELD, 0)
+
+
+def favorite_docs(client):
+    prefix = f'users/{UID}/favorites/'
+    return sorted(path[len(prefix):] for path in client.docs if path.startswith(prefix))
+
+
+def run_together(*calls):
+    """Start every call at once from its own thread; their results in order"""
+    start = threading.Barrier(len(calls))
+
+    def run(call):
+        start.wait()
+        return call()
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        return list(pool.map(run, calls))
+
+
+def test_add_and_remove_report_changes_and_count(store, client):
+    assert store.add(UID, 'T1') == (True, 1)
+    assert store.add(UID, 'T1') == (False, None)
+    assert store.add(UID, 'T2') == (True, 2)
+    assert store.ids(UID) == ('T1', 'T2')
+    assert store.remove(UID, 'T1') == (True, 1)
+    assert store.remove(UID, 'T1') == (False, None)
+    assert store.ids(UID) == ('T2',)
+    assert stored_count(client) == 1
+
+
+def test_concurrent_adds_of_one_tender_change_it_once(store, client):
+    results = run_together(*[lambda: store.add(UID, 'T1')] * 16)
+    assert sorted(changed for changed, _ in results) == [False] * 15 + [True]
+    assert favorite_docs(client) == ['T1']
+    assert stored_count(client) == 1
+
+
+def test_concurrent_add_and_remove_of_one_tender_keep_count_exact(store, client):
+    store.add(UID, 'T1')
+    for _ in range(20):
+        run_together(*[lambda: store.add(UID, 'T1'), lambda: store.remove(UID, 'T1')] * 4)
+        assert stored_count(client) == len(favorite_docs(client))
+        assert store.ids(UID) == tuple(favorite_docs(client))
+
+
+def test_batch_apply_returns_the_final_count(store, client):
+    store.add(UID, 'T1')
+    added, removed, count = store.apply(UID, add=['T2', 'T3', 'T1', 'T4'], remove=['T5'])
+    assert sorted(added) == ['T2', 'T3', 'T4'] and removed == []
+    assert count == stored_count(client) == 4
+
+    added, removed, count = store.apply(UID, add=['T6'], remove=['T1', 'T2', 'T5'])
+    assert added == ['T6'] and sorted(removed) == ['T1', 'T2']
+    assert count == stored_count(client) == 3
+    assert sorted(store.ids(UID)) == ['T3', 'T4', 'T6']
+
+
+def test_concurrent_batches_keep_favorites_count_total(store, client):
+    batches = [(lambda i=i: store.apply(UID, add=[f'T{j}' for j in range(i, i + 10)])) for i in range(0, 40, 5)]
+    run_together(*batches)
+    assert favorite_docs(client) == sorted(f'T{j}' for j in range(45))
+    assert stored_count(client) == 45
+
+    assert store.apply(UID) == ([], [], None)
@@ -0,0 +1,61 @@
+from scrapers.fingerprints import FingerprintStore
+
+
+def listing_row(tender_id, closing="21-Mar-2099 09:00 AM"):
+    return {
+        "title_and_ref": f"[Road works][REF/1][{tender_id}]",
+        "title_link": f"https://portal.example/app?tender={tender_id}",
+        "published_date": "01-Mar-2026 10:00 AM",
+        "closing_date": closing,
+    }
+
+
+def open_run(path, started):
+    store = FingerprintStore(str(path))
+    store.run_started = started
+    return store
+
+
+def first_run(path, *tender_ids):
+    store = open_run(path, 1000.0)
+    for tender_id in tender_ids:
+        tender = listing_row(tender_id)
+        assert store.check("Goa", tender) is None
+        tender["details"] = {"basic_details": {"Tender ID": tender_id}}
+        store.record("Goa", tender)
+    store.finish(["Goa"])
+    store.close()
+
+
+def keys(delta, kind):
+    return sorted(entry["tender_key"] for entry in delta[kind])
+
+
+def test_unchanged_row_reuses_stored_details(tmp_path):
+    path = tmp_path / "fingerprints.db"
+    first_run(path, "T1")
+
+    store = open_run(path, 2000.0)
+    assert store.check("Goa", listing_row("T1")) == {"basic_details": {"Tender ID": "T1"}}
+    delta = store.finish(["Goa"])
+    assert delta == {"added": [], "changed": [], "removed": []}
+
+
+def test_changed_tender_with_failed_detail_fetch_is_not_removed(tmp_path):
+    path = tmp_path / "fingerprints.db"
+    first_run(path, "T1", "T2")
+
+    store = open_run(path, 2000.0)
+    changed = listing_row("T1", closing="28-Mar-2099 09:00 AM")
+    assert store.check("Goa", changed) is None
+    changed["details"] = {"error": "timeout", "status": "failed"}
+    store.record("Goa", changed)
+    delta = store.finish(["Goa"])
+    assert keys(delta, "changed") == ["T1"]
+    assert keys(delta, "removed") == ["T2"]
+    store.close()
+
+    # The old hash is kept, so the next run tries the detail page again
+    store = open_run(path, 3000.0)
+    assert store.check("Goa", changed) is None
+    assert keys(store.finish(["Goa"]), "changed") == ["T1"]
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from scrapers.parsing import extract_details, lxml, parse_listing_page, parse_org_rows
+
+FIXTURES = Path(__file__).resolve().parent.parent / "scrapers" / "fixtures"
+BASE_URL = "https://eprocure.goa.gov.in"
+
+requires_lxml = pytest.mark.skipif(lxml is None, reason="lxml not installed")
+
+
+def fixture(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def pages(prefix):
+    return sorted(path.name for path in FIXTURES.glob(f"{prefix}*.html"))
+
+
+@requires_lxml
+@pytest.mark.parametrize("name", pages("detail_"))
+def test_detail_backends_agree(name):
+    html = fixture(name)
+    assert extract_details(html, "bs4") == extract_details(html, "lxml")
+
+
+@requires_lxml
+@pytest.mark.parametrize("name", pages("listing_"))
+def test_listing_backends_agree(name):
+    html = fixture(name)
+    assert parse_listing_page(html, BASE_URL, backend="bs4") == parse_listing_page(html, BASE_URL, backend="lxml")
+
+
+@requires_lxml
+@pytest.mark.parametrize("name", pages("org_list"))
+def test_org_list_backends_agree(name):
+    html = fixture(name)
+    assert parse_org_rows(html, backend="bs4") == parse_org_rows(html, backend="lxml")
+
+
+@pytest.mark.parametrize("backend", ["bs4", pytest.param("lxml", marks=requires_lxml)])
+def test_org_list_header_and_footer_rows_are_not_orgs(backend):
+    orgs = parse_org_rows(fixture("org_list_headers.html"), backend=backend)
+    assert [name for name, _ in orgs] == ["Public Works Department", "Goa Tourism Development Corporation"]
+    assert orgs[0][1].endswith("sp=S0000000000000000000001%3D%3D") and orgs[1][1] is None
+
+
+def test_detail_sections():
+    details = extract_details(fixture("detail_works.html"), "bs4")
+    assert details["basic_details"]["Tender ID"] == "2026_PWD_100002_1"
+    assert details["work_details"]["Tender Value in ₹"] == "1,97,52,645"
+    assert details["critical_dates"]["Bid Submission End Date"] == "07-Mar-2026 03:00 PM"
+    assert details["emd_details"]["EMD Amount in ₹"] == "3,95,100"
+    assert [cover["cover_no"] for cover in details["covers"]] == ["1", "2"]
+
+
+def test_listing_pagination():
+    rows, next_url = parse_listing_page(fixture("listing_page1.html"), BASE_URL, backend="bs4")
+    assert len(rows) == 2 and next_url.startswith(BASE_URL + "/nicgep/app?")
+    rows, next_url = parse_listing_page(fixture("listing_page2.html"), BASE_URL, backend="bs4")
+    assert len(rows) == 1 and next_url is None
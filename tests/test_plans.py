@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.catalog_data import raw_tender, write_catalog
+from tests.main_app import main, reset
+
+UID = "u1"
+
+
+def days_from_now(days):
+    return (datetime.utcnow() + timedelta(days=days)).isoformat()
+
+
+def pro_user(end_days, status="active"):
+    return {"plan": "pro", "isPro": True, "subscription_status": status, "subscription_end": days_from_now(end_days)}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "catalog", write_catalog(tmp_path / "tenders.json", [raw_tender("T1")]))
+    client = reset()
+    client.set_cookie("auth_token", f"demo_{UID}")
+    main.favorites_store.add(UID, "T1")
+    return client
+
+
+def favorite_tender(client):
+    [favorite] = client.get("/api/favorites/tenders").get_json()["favorites"]
+    return favorite["tender"]
+
+
+@pytest.mark.parametrize("user, sees_ids", [
+    (pro_user(end_days=30), True),
+    (pro_user(end_days=-1), False),  # Lapsed, not yet flipped by the hourly expiry job
+    (pro_user(end_days=30, status="expired"), False),
+    ({"plan": "free"}, False),
+])
+def test_favorites_and_tender_endpoints_apply_the_same_plan_rule(client, user, sees_ids):
+    main.db.docs[f"users/{UID}"] = user
+    tender = favorite_tender(client)
+    assert ("Tender ID" in tender["details"]["basic_details"]) is sees_ids
+    one = client.get(f"/api/tenders/T1?userId={UID}").get_json()
+    assert ("Tender ID" in one["details"]["basic_details"]) is sees_ids
+
+
+def test_user_counts_only_count_live_subscriptions():
+    reset()
+    main.db.docs.update({
+        "users/live": pro_user(end_days=30),
+        "users/lapsed": pro_user(end_days=-1),
+        "users/expired": pro_user(end_days=30, status="expired"),
+        "users/open_ended": {"plan": "pro"},
+        "users/free": {"plan": "free"},
+    })
+    assert main.reconcile_user_counts() == {"total": 5, "pro": 2}
+    assert main.user_counter.totals() == {"total": 5, "pro": 2}
+
+    main.update_user("lapsed", {"subscription_end": days_from_now(30)})  # Renewed
+    main.update_user("live", {"subscription_end": days_from_now(-1)})  # Lapsed by a write
+    main.update_user("new", pro_user(end_days=-1))
+    assert main.user_counter.totals() == {"total": 6, "pro": 2}
+    assert main.reconcile_user_counts() == {"total": 6, "pro": 2}
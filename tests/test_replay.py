@@ -0,0 +1,45 @@
+import html
+import re
+import urllib.request
+
+import pytest
+
+from scrapers.replay import ReplayPortal
+from scrapers.storage import page_path
+from tests.fixture_portal import SITE, record_fixture_portal
+
+
+@pytest.fixture
+def portal(tmp_path):
+    portal = ReplayPortal(record_fixture_portal(tmp_path), sessions=True).start()
+    yield portal
+    portal.stop()
+
+
+def get(portal, path, session=None):
+    """(JSESSIONID set by the response or None, body)"""
+    request = urllib.request.Request(portal.url + path)
+    if session:
+        request.add_header("Cookie", f"JSESSIONID={session}")
+    with urllib.request.urlopen(request) as response:
+        cookie = re.match(r"JSESSIONID=(\w+)", response.headers.get("Set-Cookie", ""))
+        return cookie and cookie.group(1), response.read().decode("utf-8")
+
+
+def first_org_link(body):
+    return html.unescape(re.search(r'href="([^"]*session=T[^"]*)"', body).group(1))
+
+
+def test_session_links_only_work_under_their_own_session(portal):
+    session, org_list = get(portal, page_path(SITE["org_url"]))
+    assert session
+    link = first_org_link(org_list)
+
+    again, listing = get(portal, link, session)
+    assert again is None and "StaleSession" not in listing and 'id="table"' in listing
+
+    other, _ = get(portal, page_path(SITE["org_url"]))
+    for cookie in (None, "0123456789abcdef", other):
+        _, page = get(portal, link, cookie)
+        assert "StaleSession" in page
+    assert portal.stats["stale"] == 3
@@ -0,0 +1,93 @@
+import pytest
+
+from scrapers.enrich import enrich_catalog, parse_tender_date
+from scrapers.tenderdb import TenderDB
+from search import MAX_LIMIT, TenderIndex
+from tests.catalog_data import catalog_data, raw_tender, write_catalog
+from tests.main_app import main, reset
+
+
+def rows_of(data):
+    enrich_catalog(data)
+    return [dict(tender, site=site["site"], organisation=org["organisation"])
+            for site in data for org in site["data"] for tender in org["tenders"]]
+
+
+ROWS = rows_of(catalog_data([
+    raw_tender("T0", "5,00,000", "Open Tender", "Works", "Panaji", "21-Mar-2026 09:00 AM", "Road widening"),
+    raw_tender("T1", "NA", "Limited", "Goods", "Margao", "10-Mar-2026 09:00 AM", "Supply of laptops"),
+    raw_tender("T2", "25,00,000", "Open Tender", "Services", "Vasco, 403802", "05-Apr-2026 05:00 PM", "Road survey"),
+    raw_tender("T3", "1,00,000", "Expression of Interest", "Works", "Panaji", "not a date", "Bridge repair"),
+    raw_tender("T4", "5,00,000", "Open Tender", "Goods", "Mapusa", "01-Mar-2026 11:00 AM", "Supply of roadside signs"),
+]))
+INDEX = TenderIndex(ROWS)
+
+
+def ids(positions):
+    return [ROWS[pos]["normalized"]["tender_id"] for pos in positions]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({}, ["T0", "T1", "T2", "T3", "T4"]),
+    ({"q": "road"}, ["T0", "T2", "T4"]),  # Last token matches as a prefix: 'roadside'
+    ({"q": "road works"}, []),  # Title text only; 'works' is the category
+    ({"q": "supply of"}, ["T1", "T4"]),
+    ({"q": "pwd"}, ["T0", "T1", "T2", "T3", "T4"]),  # Organisation
+    ({"q": "t3"}, ["T3"]),  # Tender ID
+    ({"q": "?!"}, []),
+    ({"category": "works"}, ["T0", "T3"]),
+    ({"category": "road"}, ["T0", "T2"]),  # Titles count as category text
+    ({"category": "roa"}, []),  # Whole tokens only outside `q`
+    ({"location": "403802"}, ["T2"]),
+    ({"location": "panaji", "category": "works", "tender_type": "eoi"}, ["T3"]),
+    ({"tender_type": "open"}, ["T0", "T2", "T4"]),
+    ({"tender_type": "expression of interest"}, ["T3"]),  # Raw Tender Type
+    ({"min_value": 100000, "max_value": 500000}, ["T0", "T3", "T4"]),  # Inclusive; 'NA' never matches
+    ({"min_value": 500001}, ["T2"]),
+    ({"closing_from": parse_tender_date("10-Mar-2026 09:00 AM"),
+      "closing_to": parse_tender_date("21-Mar-2026 09:00 AM")}, ["T1", "T0"]),
+])
+def test_filters(query, expected):
+    total, positions = INDEX.search(sort="closing" if "closing_from" in query else None, **query)
+    assert (total, ids(positions)) == (len(expected), expected)
+
+
+@pytest.mark.parametrize("sort, expected", [
+    ("value", ["T3", "T0", "T4", "T2", "T1"]),
+    ("-value", ["T2", "T0", "T4", "T3", "T1"]),  # Ties in catalog order, unvalued last either way
+    ("closing", ["T4", "T1", "T0", "T2", "T3"]),
+    ("-closing", ["T2", "T0", "T1", "T4", "T3"]),
+    ("published", ["T0", "T1", "T2", "T3", "T4"]),
+    ("unknown", ["T0", "T1", "T2", "T3", "T4"]),
+])
+def test_sort_filtered_and_unfiltered(sort, expected):
+    assert ids(INDEX.search(sort=sort)[1]) == expected
+    assert ids(INDEX.search(q="pwd", sort=sort)[1]) == expected
+
+
+@pytest.mark.parametrize("sort", [None, "value", "-value", "closing"])
+def test_pages_cover_the_results_once(sort):
+    everything = INDEX.search(sort=sort)[1]
+    for query in ({}, {"q": "pwd"}):
+        pages = [INDEX.search(sort=sort, page=page, limit=2, **query) for page in (1, 2, 3, 4)]
+        assert [total for total, _ in pages] == [5] * 4
+        assert [len(positions) for _, positions in pages] == [2, 2, 1, 0]
+        assert [pos for _, positions in pages for pos in positions] == everything
+
+
+def test_limit_is_clamped_to_max_limit():
+    index = TenderIndex(rows_of(catalog_data([raw_tender(f"T{n}") for n in range(MAX_LIMIT + 5)])))
+    for query in ({}, {"q": "road"}, {"sort": "closing"}):
+        total, positions = index.search(limit=10 * MAX_LIMIT, **query)
+        assert (total, len(positions)) == (MAX_LIMIT + 5, MAX_LIMIT)
+        assert index.search(limit=10 * MAX_LIMIT, page=2, **query)[1] == list(range(MAX_LIMIT, MAX_LIMIT + 5))
+        assert len(index.search(limit=0, **query)[1]) == 1
+        assert index.search(page=0, limit=3, **query)[1] == [0, 1, 2]
+
+
+def test_search_endpoint_clamps_the_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "tender_db", TenderDB(str(tmp_path / "missing.db")))
+    monkeypatch.setattr(main, "catalog", write_catalog(tmp_path / "tenders.json",
+                                                       [raw_tender(f"T{n}") for n in range(MAX_LIMIT + 5)]))
+    body = reset().get(f"/api/tenders/search?q=road&limit={10 * MAX_LIMIT}&page=2").get_json()
+    assert (body["total"], body["limit"], body["page"], len(body["results"])) == (MAX_LIMIT + 5, MAX_LIMIT, 2, 5)
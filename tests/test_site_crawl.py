@@ -0,0 +1,190 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright.async_api")
+
+from scrapers import scraper
+from scrapers.fetcher import SiteFetcher
+from scrapers.fingerprints import FingerprintStore
+from scrapers.frontier import CrawlBudget
+from scrapers.storage import ScrapeLog
+from scrapers.throttle import throttle
+from tests.fixture_portal import fixture
+
+SITE = {"name": "Goa", "org_url": "https://portal.example/app?page=orgs", "base_url": "https://portal.example"}
+
+
+def listing_row(tender_id, closing="21-Mar-2099 09:00 AM"):
+    return {
+        "title_and_ref": f"[Road works][REF/1][{tender_id}]",
+        "title_link": f"https://portal.example/app?tender={tender_id}",
+        "published_date": "01-Mar-2026 10:00 AM",
+        "closing_date": closing,
+    }
+
+
+def crawl_run(path, started, rows, budget):
+    """One run over a one-org site, fetching details the way process_site's workers do"""
+    store = FingerprintStore(str(path))
+    store.run_started = started
+    crawl = scraper.SiteCrawl(SITE, store)
+    for tender, stale in crawl.listed(1, "Works Department", rows, True, False):
+        details = {"basic_details": {"Tender ID": tender["title_and_ref"]}} if budget.take() else None
+        crawl.detailed(1, tender, details, stale)
+    delta = store.finish([SITE["name"]])
+    store.close()
+    return crawl, delta
+
+
+@pytest.fixture(autouse=True)
+def clean_site_results():
+    scraper.site_results.clear()
+    yield
+    scraper.site_results.clear()
+
+
+def test_budget_cut_mid_site_reports_no_removals(tmp_path):
+    path = tmp_path / "fingerprints.db"
+    ids = ["T1", "T2", "T3", "T4"]
+    crawl_run(path, 1000.0, [listing_row(i) for i in ids], CrawlBudget(requests=0, seconds=0))
+
+    # Every row changed; only two detail pages fit in this run's budget
+    budget = CrawlBudget(requests=2, seconds=0)
+    crawl, delta = crawl_run(path, 2000.0, [listing_row(i, "28-Mar-2099 09:00 AM") for i in ids], budget)
+
+    assert budget.exhausted and budget.denied == 2
+    assert sorted(entry["tender_key"] for entry in delta["changed"]) == ids
+    assert delta["added"] == [] and delta["removed"] == []
+    tenders = crawl.data()[0]["tenders"]
+    assert sum(1 for tender in tenders if "details" in tender) == 2
+
+
+def test_resume_after_crash_reports_no_removals(tmp_path):
+    path, log_path = tmp_path / "fingerprints.db", tmp_path / "scrape_log.ndjson"
+    other = dict(SITE, name="Delhi")
+    orgs = {"Works Department": ["T1", "T2"], "Health Department": ["T3"]}
+
+    def crawl(store, log, site, resumed=None, crash_after=None):
+        crawl = scraper.SiteCrawl(site, store, log)
+        for idx, (org_name, ids) in enumerate(orgs.items(), 1):
+            if resumed and org_name in resumed:
+                crawl.resume(idx, resumed[org_name])
+                continue
+            for tender, stale in crawl.listed(idx, org_name, [listing_row(i) for i in ids], True, False):
+                crawl.detailed(idx, tender, {"basic_details": {"Tender ID": tender["title_and_ref"]}}, stale)
+            if org_name == crash_after:
+                return
+
+    def open_run(started, resume=False):
+        store = FingerprintStore(str(path))
+        store.run_started = started
+        log = ScrapeLog(str(log_path))
+        recovered = log.recover()
+        log.open(resume=resume)
+        return store, log, recovered
+
+    store, log, _ = open_run(1000.0)
+    for site in (SITE, other):
+        crawl(store, log, site)
+    store.finish([SITE["name"], other["name"]])
+    log.run_done()
+    log.close()
+    store.close()
+
+    # The crashed run: Delhi finishes, Goa dies after its first org
+    store, log, _ = open_run(2000.0)
+    crawl(store, log, other)
+    log.site_done(other["name"])
+    crawl(store, log, SITE, crash_after="Works Department")
+    store.flush()
+    log.close()
+    store.close()
+
+    store, log, recovered = open_run(3000.0, resume=True)
+    assert recovered[other["name"]]["done"]
+    assert list(recovered[SITE["name"]]["orgs"]) == ["Works Department"]
+    scraper.resume_finished_site(other["name"], recovered[other["name"]], store)
+    crawl(store, log, SITE, resumed=recovered[SITE["name"]]["orgs"])
+    delta = store.finish([SITE["name"], other["name"]])
+    log.close()
+    store.close()
+
+    assert delta == {"added": [], "changed": [], "removed": []}
+
+
+def test_crashed_site_is_not_marked_done(tmp_path, monkeypatch):
+    other = dict(SITE, name="Delhi")
+    log = ScrapeLog(str(tmp_path / "scrape_log.ndjson")).open()
+    monkeypatch.setattr(scraper, "save_data", lambda data: None)
+
+    async def process_site(site, browser, fingerprints, log, resumed_orgs, budget, previous):
+        if site is other:
+            log.org(site["name"], {"organisation": "Health Department", "tenders": []})
+            return None  # What process_site returns when the crawl raised
+        return [{"organisation": "Works Department", "tenders": []}]
+
+    monkeypatch.setattr(scraper, "process_site", process_site)
+
+    async def run():
+        slots = asyncio.Semaphore(2)
+        return await asyncio.gather(*(scraper.run_site(site, None, slots, None, log, {}, CrawlBudget(), {})
+                                      for site in (SITE, other)))
+
+    assert asyncio.run(run()) == [True, False]
+    log.close()
+    recovered = ScrapeLog(log.path).recover()
+    assert recovered[SITE["name"]]["done"] and not recovered[other["name"]]["done"]
+    assert list(recovered[other["name"]]["orgs"]) == ["Health Department"]
+    assert scraper.site_results[other["name"]] == []
+
+
+MAINTENANCE_PAGE = "<html><body><h1>Site under maintenance</h1><p>Please try again later.</p></body></html>"
+
+
+def listing_fetcher(pages):
+    """An HTTP-only SiteFetcher whose responses are `pages` (url -> HTML), all sent with a 200"""
+    httpx = pytest.importorskip("httpx")
+    fetcher = SiteFetcher(None, SITE["base_url"], http_first=True)
+    fetcher.http = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, text=pages[str(request.url)])))
+    return fetcher
+
+
+def crawl_listing(fetcher, url):
+    async def crawl():
+        try:
+            return await scraper.crawl_org_listing(fetcher, url, SITE["base_url"], CrawlBudget(requests=0, seconds=0))
+        finally:
+            await fetcher.close()
+    return asyncio.run(crawl())
+
+
+@pytest.fixture
+def no_throttle(monkeypatch):
+    monkeypatch.setattr(throttle, "host_interval", 0.0)
+    monkeypatch.setattr(throttle, "host_floor", 0.0)
+    monkeypatch.setattr(throttle, "shared", None)
+    throttle.reset()
+    yield
+    throttle.reset()
+
+
+def test_listing_without_its_table_fails_the_fetch(no_throttle):
+    url = f"{SITE['base_url']}/app?page=listing"
+    rows, complete, cut = crawl_listing(listing_fetcher({url: fixture("listing_page2.html")}), url)
+    assert rows and complete and not cut
+
+    with pytest.raises(RuntimeError, match="no browser to fall back to"):
+        crawl_listing(listing_fetcher({url: MAINTENANCE_PAGE}), url)
+
+
+def test_listing_without_its_table_from_the_browser_is_not_an_empty_org():
+    class BrowserFetcher:
+        async def fetch(self, url, expect=None, **kwargs):
+            assert expect == scraper.LIST_TABLE
+            return MAINTENANCE_PAGE
+
+    with pytest.raises(RuntimeError, match="No listing table"):
+        asyncio.run(scraper.crawl_org_listing(BrowserFetcher(), SITE["org_url"], SITE["base_url"],
+                                              CrawlBudget(requests=0, seconds=0)))
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from scrapers.enrich import enrich_catalog, parse_tender_date
+from scrapers.tenderdb import TenderDB, write_db
+from search import TenderIndex
+from tests.catalog_data import catalog_data, raw_tender
+
+CATALOG = Path(__file__).resolve().parent.parent / "scrapers" / "tenders_all3.json"
+
+QUERIES = [
+    {},
+    {"q": "supply"},
+    {"q": "construction of ro"},
+    {"q": "pwd"},
+    {"q": "2026"},
+    {"q": "!!!"},
+    {"category": "works", "sort": "closing"},
+    {"category": "goods", "sort": "-closing", "limit": 7, "page": 2},
+    {"location": "delhi", "sort": "-published"},
+    {"location": "panaji", "tender_type": "open"},
+    {"tender_type": "open tender", "sort": "value"},
+    {"min_value": 1000000, "sort": "-value"},
+    {"max_value": 500000, "sort": "value", "limit": 500},
+    {"closing_from": parse_tender_date("01-Apr-2026 12:00 AM"), "sort": "closing"},
+    {"tender_type": "open", "closing_from": 0, "page": 5},
+    {"sort": "value"},
+    {"sort": "-value", "page": 3},
+    {"sort": "-value", "limit": 200, "page": 2},
+    {"sort": "closing", "limit": 50, "page": 6},
+    {"sort": "bogus", "page": 2},
+]
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    """The committed catalog plus a site of tied and unvalued tenders, in both backends"""
+    with open(CATALOG, encoding="utf-8") as f:
+        data = json.load(f)
+    data += catalog_data([
+        raw_tender("TIE1", "5,00,000", closing="01-Apr-2026 10:00 AM"),
+        raw_tender("TIE2", "NA", closing="01-Apr-2026 10:00 AM"),
+        raw_tender("TIE3", "5,00,000", closing="01-Apr-2026 10:00 AM"),
+        raw_tender("TIE4", "NA", closing="not a date"),
+        raw_tender("TIE5", "5,00,000", closing="not a date"),
+    ], site="Ties")
+    enrich_catalog(data)
+    path = str(tmp_path_factory.mktemp("tenderdb") / "tenders.db")
+    write_db(path, data)
+    rows = [dict(tender, site=site["site"], organisation=org["organisation"])
+            for site in data for org in site["data"] for tender in org["tenders"]]
+    return TenderIndex(rows), rows, TenderDB(path)
+
+
+@pytest.mark.parametrize("query", QUERIES, ids=lambda query: json.dumps(query))
+def test_tenderdb_matches_tender_index(backends, query):
+    index, rows, db = backends
+    total, positions = index.search(**query)
+    db_total, db_rows = db.search(**query)
+    assert db_total == total
+    assert [(row["site"], row["title_link"]) for row in db_rows] == \
+        [(rows[pos]["site"], rows[pos]["title_link"]) for pos in positions]
+
+
+def test_ties_keep_catalog_order_in_both_directions(backends):
+    index, rows, db = backends
+    for sort in ("value", "-value", "closing", "-closing"):
+        _, positions = index.search(location="panaji", sort=sort, limit=200)
+        ids = [rows[pos]["normalized"]["tender_id"] for pos in positions if rows[pos]["site"] == "Ties"]
+        keyed = {"value": ["TIE1", "TIE3", "TIE5"], "closing": ["TIE1", "TIE2", "TIE3"]}[sort.lstrip("-")]
+        assert ids == keyed + sorted({"TIE1", "TIE2", "TIE3", "TIE4", "TIE5"} - set(keyed))
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.auth import crypt, jwt
+
+import tokens
+from tokens import PublicKeyRefresher, VerifiedTokenCache
+from tests.test_cache import Clock
+
+PROJECT = "test-project"
+
+
+class Key:
+    """A locally generated signing key standing in for one of Firebase's"""
+
+    def __init__(self, kid):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+        self.public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode("ascii")
+        self.signer = crypt.RSASigner.from_string(private_pem, key_id=kid)
+
+    def token(self, uid, expires_in=3600):
+        now = int(time.time())
+        return jwt.encode(self.signer, {
+            "iss": f"https://securetoken.google.com/{PROJECT}", "aud": PROJECT,
+            "sub": uid, "iat": now, "exp": now + expires_in,
+        }).decode("ascii")
+
+
+@pytest.fixture(scope="module")
+def old_key():
+    return Key("old")
+
+
+@pytest.fixture(scope="module")
+def new_key():
+    return Key("new")
+
+
+@pytest.fixture
+def certs_server():
+    """Serves `server.certs` as the certs endpoint does, with a max-age"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = json.dumps(server.certs).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "public, max-age=600, must-revalidate")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.certs = {}
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/certs"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    """Calls to the Firebase Admin fallback; it answers with the token's unverified claims"""
+    calls = []
+
+    def verify_id_token(token):
+        calls.append(token)
+        claims = jwt.decode(token, verify=False)
+        return dict(claims, uid=claims["sub"])
+
+    monkeypatch.setattr(tokens.auth, "verify_id_token", verify_id_token)
+    return calls
+
+
+def verifier_with(key):
+    keys = PublicKeyRefresher()
+    keys.certs = {"old": key.public_pem}
+    verifier = VerifiedTokenCache(PROJECT, keys=keys)
+    verifier.cache.clock = Clock()
+    return verifier
+
+
+def test_cached_claims_expire_with_the_token(old_key, fallback):
+    verifier = verifier_with(old_key)
+    token = old_key.token("u1", expires_in=120)
+    assert verifier.cached(token) is None
+    assert verifier.verify(token)["uid"] == "u1"
+
+    verifier.cache.clock.now += 110
+    assert verifier.cached(token)["uid"] == "u1"
+    assert verifier.verify(token)["uid"] == "u1" and verifier.cache.hits == 2
+    verifier.cache.clock.now += 15  # Past the token's exp
+    assert verifier.cached(token) is None
+    assert fallback == []
+
+
+def test_expired_claims_are_never_cached(old_key, fallback, monkeypatch):
+    verifier = verifier_with(old_key)
+    token = old_key.token("u1", expires_in=60)
+    now = time.time()
+    monkeypatch.setattr(tokens.time, "time", lambda: now + 61)  # Verified just as it lapses
+    assert verifier.verify(token)["uid"] == "u1"
+    assert verifier.cached(token) is None and fallback == []
+
+
+def test_tokens_from_a_rotated_key_verify_locally_after_refresh(old_key, new_key, fallback, certs_server):
+    certs_server.certs = {"old": old_key.public_pem}
+    keys = PublicKeyRefresher(certs_server.url)
+    assert keys.fetch() == 600 and keys.certs == certs_server.certs
+    verifier = VerifiedTokenCache(PROJECT, keys=keys)
+
+    assert verifier.verify(old_key.token("u1"))["uid"] == "u1"
+    assert fallback == []
+    rotated = new_key.token("u2")
+    assert verifier.verify(rotated)["uid"] == "u2"  # Unknown kid: Firebase Admin verifies it
+    assert fallback == [rotated]
+
+    certs_server.certs = {"old": old_key.public_pem, "new": new_key.public_pem}
+    keys.fetch()
+    assert verifier.verify(new_key.token("u3"))["uid"] == "u3"
+    assert fallback == [rotated]
+
+
+def test_tokens_for_another_project_are_not_trusted_locally(old_key, fallback):
+    verifier = verifier_with(old_key)
+    verifier.project_id, verifier.issuer = "other", "https://securetoken.google.com/other"
+    token = old_key.token("u1")
+    verifier.verify(token)
+    assert fallback == [token]